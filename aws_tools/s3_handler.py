@@ -147,12 +147,14 @@ class S3Handler:
     #             CopySource='{0}/{1}'.format(self.bucket_name, key), MetadataDirective='REPLACE')
 
 
-    def upload_file(self, path, key, cache_time=600, content_type=None) -> None:
+    def upload_file(self, path, key, cache_time=600, content_type=None, content_encoding=None) -> None:
         """
         Upload file to S3 storage. Similar to the s3.upload_file, however, that
         does not work nicely with moto, whereas this function does.
         :param string path: file to upload
         :param string key: name of the object in the bucket
+        :param string content_encoding: e.g., 'gzip' for a precompressed file like 01-GEN.html.gz
+                                        (the content type is then that of 01-GEN.html)
         """
         from general_tools.file_utils import get_mime_type
         #from app_settings.app_settings import AppSettings
@@ -162,18 +164,20 @@ class S3Handler:
         with open(path, 'rb') as f:
             binary = f.read()
         if content_type is None:
-            mime_type = get_mime_type(path)
+            mime_type = get_mime_type(os.path.splitext(path)[0] if content_encoding else path)
             content_type = mime_type # Let browser figure out the encoding
             # content_type = f'{mime_type}; charset=utf-8' if 'usfm' in mime_type \
             #                 else mime_type # RJH added charset Oct2019
         # from app_settings.app_settings import AppSettings
         # AppSettings.logger.debug(f"Uploading {path} to S3 {key} with cache_time={cache_time} content_type='{content_type}'…")
         # AppSettings.logger.debug(f"Bucket is {self.bucket}")
+        extra_args = {'ContentEncoding': content_encoding} if content_encoding else {}
         self.bucket.put_object(
             Key=key,
             Body=binary,
             ContentType=content_type,
-            CacheControl=f'max-age={cache_time}'
+            CacheControl=f'max-age={cache_time}',
+            **extra_args
         )
         #AppSettings.logger.debug(f"put_response is {put_response}")
 
@@ -1,20 +1,32 @@
 import json
 import os
+import gzip
 import tempfile
 import traceback
 from shutil import copy
 from urllib.parse import urlparse, urlunparse, parse_qsl
 from abc import ABCMeta, abstractmethod
 from datetime import datetime
-from typing import Dict, Optional, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple, Any
+
+try:
+    import brotli # Optional -- only needed for the 'br' precompress option
+except ImportError:
+    brotli = None
 
 from rq_settings import prefix, debug_mode_flag
 from general_tools.url_utils import download_file
-from general_tools.file_utils import unzip, add_contents_to_zip, remove_tree, remove_file
+from general_tools.file_utils import unzip, add_contents_to_zip, remove_tree, remove_file, get_files
 from app_settings.app_settings import AppSettings
 from converters.convert_logger import ConvertLogger
 
 
+# Content-Encodings that the 'precompress' option can write alongside each HTML file
+PRECOMPRESS_SUFFIXES = {'gzip': '.gz', 'br': '.br'}
+PRECOMPRESS_EXTENSIONS = ['.html']
+
+
 class Converter(metaclass=ABCMeta):
     """
     """
@@ -29,7 +41,7 @@ class Converter(metaclass=ABCMeta):
         :param string repo_subject:
         :param string source_dir:
         :param string cdn_file_key: # NOTE: For S3 upload, not a complete URL
-        :param dict options:
+        :param dict options: e.g., 'precompress' (True or a list of Content-Encodings, see precompress_output)
         :param string identifier:
         """
         AppSettings.logger.debug(f"Converter.__init__(rs={repo_subject}, source_dir={source_dir}, cdn_file_key={cdn_file_key}, options={options}, id={identifier})")
@@ -114,6 +126,10 @@ class Converter(metaclass=ABCMeta):
                 # convert method called
                 AppSettings.logger.debug(f"Converting files from {self.files_dir}…")
                 if self.convert():
+                    if self.options.get('precompress'):
+                        encodings = self.options['precompress']
+                        self.precompress_output(['gzip'] if encodings is True
+                                                else [encodings] if isinstance(encodings, str) else encodings)
                     #AppSettings.logger.debug(f"Was able to convert {self.resource}")
                     # Zip the output dir to the output archive
                     #AppSettings.logger.debug(f"Converter adding files in {self.output_dir} to {self.output_zip_file}")
@@ -150,6 +166,27 @@ class Converter(metaclass=ABCMeta):
         return results
 
 
+    def precompress_output(self, encodings:List[str]) -> None:
+        """
+        Writes a compressed copy of each HTML file in the output folder
+            for each of the given Content-Encodings, e.g., 01-GEN.html.gz for 'gzip',
+            so that they can be served without being compressed on the fly.
+
+        The files are compressed in a thread pool (zlib and brotli release the GIL).
+        """
+        encodings = [encoding for encoding in encodings if encoding in PRECOMPRESS_SUFFIXES]
+        if 'br' in encodings and brotli is None:
+            AppSettings.logger.warning("Can't precompress with 'br' as brotli isn't installed")
+            encodings.remove('br')
+        filepaths = get_files(directory=self.output_dir, extensions=PRECOMPRESS_EXTENSIONS)
+        if not encodings or not filepaths:
+            return
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            sizes = list(executor.map(precompress_file, filepaths, [encodings]*len(filepaths)))
+        AppSettings.logger.debug(f"Precompressed {len(filepaths)} HTML files ({sum(size for size, _ in sizes):,} bytes)"
+                                 f" to {', '.join(encodings)} ({sum(compressed for _, compressed in sizes):,} bytes)")
+
+
     def upload_archive(self) -> None:
         """
         Uploads self.output_zip_file
@@ -161,3 +198,24 @@ class Converter(metaclass=ABCMeta):
         elif AppSettings.cdn_s3_handler():
             #AppSettings.logger.debug("converter.upload_archive() using S3 handler")
             AppSettings.cdn_s3_handler().upload_file(self.output_zip_file, self.cdn_file_key, cache_time=0)
+
+
+def precompress_file(filepath:str, encodings:List[str]) -> Tuple[int,int]:
+    """
+    Writes the compressed sibling(s) of the given file.
+
+    Returns the original size and the total compressed size.
+    """
+    with open(filepath, 'rb') as source_file:
+        data = source_file.read()
+    compressed_size = 0
+    for encoding in encodings:
+        if encoding == 'gzip':
+            compressed = gzip.compress(data, compresslevel=9, mtime=0) # so an unchanged page gives an unchanged file
+        else:
+            compressed = brotli.compress(data, mode=brotli.MODE_TEXT)
+        with open(filepath + PRECOMPRESS_SUFFIXES[encoding], 'wb') as compressed_file:
+            compressed_file.write(compressed)
+        compressed_size += len(compressed)
+    return len(data), compressed_size
+# end of precompress_file function
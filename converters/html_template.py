@@ -0,0 +1,235 @@
+"""
+Puts converted HTML into the page template (templates/template.html)
+    without building a BeautifulSoup tree of the whole converted book.
+
+The template is parsed (with BeautifulSoup) only once,
+    and split around the title and the (emptied) div#content.
+The converted HTML is then streamed through html.parser
+    and the inner HTML of its <body> is re-serialised
+    exactly as BeautifulSoup would have written it
+    (so the pages are unchanged from when each book was 'souped').
+"""
+from typing import Dict, List, Optional
+import os
+import re
+from html import escape
+from html.parser import HTMLParser
+from html.entities import codepoint2name
+
+from bs4 import BeautifulSoup
+
+
+TEMPLATE_FILEPATH = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'templates', 'template.html')
+TITLE_MARKER, CONTENT_MARKER = '$title', '$content'
+NOT_CONVERTED_HTML = 'ERROR! NOT CONVERTED!'
+
+# These are the rules of the BeautifulSoup (4.9) html.parser tree builder and 'minimal' formatter
+VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'keygen', 'link', 'menuitem', 'meta',
+             'param', 'source', 'track', 'wbr',
+             'basefont', 'bgsound', 'command', 'frame', 'image', 'isindex', 'nextid', 'spacer'}
+PRESERVE_WHITESPACE_TAGS = {'pre', 'textarea'}
+CDATA_CONTAINING_TAGS = {'script', 'style'} # Text in these isn't escaped
+LIST_ATTRIBUTES = {'*': {'class', 'accesskey', 'dropzone'},
+                   'a': {'rel', 'rev'}, 'link': {'rel', 'rev'},
+                   'td': {'headers'}, 'th': {'headers'},
+                   'form': {'accept-charset'}, 'object': {'archive'},
+                   'area': {'rel'}, 'icon': {'sizes'}, 'iframe': {'sandbox'}, 'output': {'for'}}
+ASCII_SPACES = '\x20\x0a\x09\x0c\x0d'
+ENTITY_CHARACTERS = {name: chr(codepoint) for codepoint, name in codepoint2name.items()}
+ENTITY_CHARACTERS['apos'] = "'"
+NONWHITESPACE_RE = re.compile(r'\S+')
+
+
+def quote_attribute_value(value:str) -> str:
+    value = escape(value, quote=False)
+    if '"' in value:
+        if "'" in value:
+            return '"' + value.replace('"', '&quot;') + '"'
+        return "'" + value + "'"
+    return '"' + value + '"'
+# end of quote_attribute_value function
+
+
+class BodyExtractor(HTMLParser):
+    """
+    Collects the (re-serialised) inner HTML of the first <body> element.
+
+    Tags still open when the body ends (or at the end of the document) are closed,
+        and end tags with no matching open tag are dropped.
+    """
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=False)
+        self.chunks:List[str] = []
+        self.open_tags:List[str] = [] # All of them, not just the ones inside the body
+        self.body_depth:Optional[int] = None # Number of open tags outside of the body contents
+        self.finished = False # Once the body has been closed
+        self.data:List[str] = []
+        self.preserve_whitespace_count = 0
+        self.already_closed_void_tags:List[str] = []
+        self.void_tag_unterminated = False # The last chunk is the start of an (as yet) empty void tag
+
+    def capturing(self) -> bool:
+        return self.body_depth is not None and not self.finished
+
+    def add_content(self, html:str) -> None:
+        if self.void_tag_unterminated:
+            self.chunks.append('>')
+            self.void_tag_unterminated = False
+        self.chunks.append(html)
+
+    def end_data(self) -> Optional[str]:
+        """
+        Returns the text collected since the last tag (if any),
+            with whitespace-only text reduced to a single space or newline.
+        """
+        if not self.data:
+            return None
+        text = ''.join(self.data)
+        self.data = []
+        if not self.preserve_whitespace_count and not text.strip(ASCII_SPACES):
+            text = '\n' if '\n' in text else ' '
+        return text
+
+    def flush_text(self) -> None:
+        text = self.end_data()
+        if text is not None and self.capturing():
+            self.add_content(text if self.open_tags[-1] in CDATA_CONTAINING_TAGS
+                             else escape(text, quote=False))
+
+    def add_special(self, prefix:str, data:str, suffix:str) -> None:
+        """
+        Adds a comment, declaration, etc.
+        """
+        self.flush_text()
+        self.data.append(data)
+        text = self.end_data()
+        if self.capturing():
+            self.add_content(prefix + text + suffix)
+
+    def handle_starttag(self, name:str, attrs:list, handle_void:bool=True) -> None:
+        if self.finished: return
+        self.flush_text()
+        if self.capturing():
+            attributes:Dict[str,str] = {}
+            for key, value in attrs:
+                attributes[key] = '' if value is None else value
+            list_attributes = LIST_ATTRIBUTES.get(name, ())
+            start_tag = '<' + name
+            for key, value in sorted(attributes.items()):
+                if key in LIST_ATTRIBUTES['*'] or key in list_attributes:
+                    value = ' '.join(NONWHITESPACE_RE.findall(value))
+                start_tag += ' ' + key + '=' + quote_attribute_value(value)
+            self.add_content(start_tag)
+            if name in VOID_TAGS:
+                self.void_tag_unterminated = True
+            else:
+                self.chunks.append('>')
+        elif name == 'body' and self.body_depth is None:
+            self.body_depth = len(self.open_tags) + 1
+        self.open_tags.append(name)
+        if name in PRESERVE_WHITESPACE_TAGS:
+            self.preserve_whitespace_count += 1
+        if name in VOID_TAGS and handle_void:
+            self.handle_endtag(name, check_already_closed=False)
+            self.already_closed_void_tags.append(name)
+
+    def handle_startendtag(self, name:str, attrs:list) -> None:
+        self.handle_starttag(name, attrs, handle_void=False)
+        self.handle_endtag(name)
+
+    def handle_endtag(self, name:str, check_already_closed:bool=True) -> None:
+        if self.finished: return
+        if check_already_closed and name in self.already_closed_void_tags:
+            # A redundant end tag, e.g., </br>
+            self.already_closed_void_tags.remove(name)
+            return
+        self.flush_text()
+        if name in self.open_tags:
+            while self.pop_tag() != name: pass
+
+    def pop_tag(self) -> str:
+        name = self.open_tags.pop()
+        if name in PRESERVE_WHITESPACE_TAGS:
+            self.preserve_whitespace_count -= 1
+        if self.capturing():
+            if len(self.open_tags) < self.body_depth:
+                self.finished = True
+            elif self.void_tag_unterminated:
+                self.chunks.append('/>')
+                self.void_tag_unterminated = False
+            else:
+                self.chunks.append(f'</{name}>')
+        return name
+
+    def handle_data(self, data:str) -> None:
+        self.data.append(data)
+
+    def handle_charref(self, name:str) -> None:
+        codepoint = int(name[1:], 16) if name[0] in 'xX' else int(name)
+        character = None
+        if codepoint < 256:
+            # Often these are really Windows-1252 characters, e.g., &#147;
+            try: character = bytes([codepoint]).decode('windows-1252')
+            except UnicodeDecodeError: pass
+        if not character:
+            try: character = chr(codepoint)
+            except (ValueError, OverflowError): pass
+        self.data.append(character or '\N{REPLACEMENT CHARACTER}')
+
+    def handle_entityref(self, name:str) -> None:
+        self.data.append(ENTITY_CHARACTERS.get(name, '&' + name))
+
+    def handle_comment(self, data:str) -> None:
+        self.add_special('<!--', data, '-->')
+
+    def handle_decl(self, data:str) -> None:
+        self.add_special('<!DOCTYPE ', data[len('DOCTYPE '):], '>\n')
+
+    def unknown_decl(self, data:str) -> None:
+        if data.upper().startswith('CDATA['):
+            self.add_special('<![CDATA[', data[len('CDATA['):], ']]>')
+        else:
+            self.add_special('<?', data, '?>')
+
+    def handle_pi(self, data:str) -> None:
+        self.add_special('<?', data, '>')
+
+    def close(self) -> None:
+        super().close()
+        if not self.finished:
+            self.flush_text()
+            while self.open_tags:
+                self.pop_tag()
+# end of BodyExtractor class
+
+
+def extract_body_html(html:str) -> Optional[str]:
+    """
+    Returns the inner HTML of the first <body> in the given HTML,
+        or None if there isn't one.
+    """
+    extractor = BodyExtractor()
+    extractor.feed(html)
+    extractor.close()
+    return None if extractor.body_depth is None else ''.join(extractor.chunks)
+# end of extract_body_html function
+
+
+class HtmlTemplate:
+    """
+    The page template, split at its title and content.
+    """
+    def __init__(self, template_filepath:str=TEMPLATE_FILEPATH) -> None:
+        with open(template_filepath) as template_file:
+            template_soup = BeautifulSoup(template_file.read(), 'html.parser')
+        template_soup.head.title.string = TITLE_MARKER
+        content_div = template_soup.find('div', id='content')
+        content_div.clear()
+        content_div.append(CONTENT_MARKER)
+        self.before_title, rest = str(template_soup).split(TITLE_MARKER, 1)
+        self.before_content, self.after_content = rest.split(CONTENT_MARKER, 1)
+
+    def fill(self, title:str, content_html:str) -> str:
+        return ''.join((self.before_title, escape(title, quote=False),
+                        self.before_content, content_html, self.after_content))
+# end of HtmlTemplate class
@@ -1,6 +1,5 @@
 import os
 import tempfile
-from bs4 import BeautifulSoup
 from shutil import copyfile
 import yaml
 import re
@@ -12,6 +11,7 @@ import markdown2
 from app_settings.app_settings import AppSettings
 from general_tools.file_utils import write_file, remove_tree, get_files
 from converters.converter import Converter
+from converters.html_template import HtmlTemplate, extract_body_html, NOT_CONVERTED_HTML
 from tx_usfm_tools.books import bookNames
 
 
@@ -42,10 +42,8 @@ class Tsv2HtmlConverter(Converter):
                 self.process_manifest(source_filepath)
                 break
 
-        current_dir = os.path.dirname(os.path.realpath(__file__))
-        with open(os.path.join(current_dir, 'templates', 'template.html')) as template_file:
-            # Simple HTML template which includes $title and $content fields
-            template_html = template_file.read()
+        # Simple HTML template which includes $title and $content fields
+        html_template = HtmlTemplate()
 
         # Convert tsv files and copy across other files
         num_successful_books = num_failed_books = 0
@@ -61,32 +59,18 @@ class Tsv2HtmlConverter(Converter):
                 # Do the actual TSV -> HTML conversion
                 converted_html = self.buildSingleHtml(source_filepath)
                 # AppSettings.logger.debug(f"Got converted html: {converted_html[:5000]}{' …' if len(converted_html)>5000 else ''}")
-                # Now what are we doing with the converted html ???
-                template_soup = BeautifulSoup(template_html, 'html.parser')
-                template_soup.head.title.string = self.repo_subject
-                converted_soup = BeautifulSoup(converted_html, 'html.parser')
-                content_div = template_soup.find('div', id='content')
-                content_div.clear()
-                if converted_soup and converted_soup.body:
-                    content_div.append(converted_soup.body)
-                    content_div.body.unwrap()
+                # Put the contents of the converted body into the template
+                body_html = extract_body_html(converted_html)
+                if body_html is not None:
                     num_successful_books += 1
                 else:
-                    content_div.append('ERROR! NOT CONVERTED!')
+                    body_html = NOT_CONVERTED_HTML
                     self.log.warning(f"TSV parsing or conversion error for {base_name}")
                     # AppSettings.logger.debug(f"Got converted html: {converted_html[:600]}{' …' if len(converted_html)>600 else ''}")
-                    if not converted_soup:
-                        AppSettings.logger.debug(f"No converted_soup")
-                    elif not converted_soup.body:
-                        AppSettings.logger.debug(f"No converted_soup.body")
-                    # from bs4.diagnose import diagnose
-                    # diagnose(converted_html)
                     num_failed_books += 1
                 html_filename = filebase + '.html'
                 output_filepath = os.path.join(self.output_dir, html_filename)
-                #print("template_soup type is", type(template_soup)) # <class 'bs4.BeautifulSoup'>
-                write_file(output_filepath, str(template_soup))
-                #print("Got converted x2 html:", str(template_soup)[:500])
+                write_file(output_filepath, html_template.fill(self.repo_subject, body_html))
                 self.log.info(f"Converted {os.path.basename(source_filepath)} to {os.path.basename(html_filename)}.")
             else:
                 # Directly copy over files that are not TSV files
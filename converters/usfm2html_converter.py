@@ -1,16 +1,47 @@
+from typing import Iterable, List, Optional, Tuple
 import os
 import tempfile
-from bs4 import BeautifulSoup
 from shutil import copyfile
+from contextlib import nullcontext
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
 
 from rq_settings import prefix, debug_mode_flag
 from app_settings.app_settings import AppSettings
-from general_tools.file_utils import write_file, remove_tree, get_files
+from general_tools.file_utils import write_file, get_files
+from general_tools.process_utils import get_worker_count
 from converters.converter import Converter
+from converters.html_template import HtmlTemplate, extract_body_html, NOT_CONVERTED_HTML
 from tx_usfm_tools.transform import UsfmTransform
+from tx_usfm_tools.jsonRenderer import JSONRenderer
+from tx_usfm_tools.structure_index import StructureIndex, STRUCTURE_INDEX_FILENAME
+
+
+VERSES_FOLDER = 'verses' # In the output: one JSON file of verse text per chapter, e.g., verses/41-MAT-001.json
 
 
 class Usfm2HtmlConverter(Converter):
+    # The USFM linter leaves its structure index in the source folder for us
+    EXCLUDED_FILES = Converter.EXCLUDED_FILES + [STRUCTURE_INDEX_FILENAME]
+
+    def __init__(self, *args, book_workers:Optional[int]=None, **kwargs) -> None:
+        """
+        :param int book_workers: The number of processes used to convert the books
+                                    (default is the 'book_workers' option, else 1,
+                                        which converts them all in this process)
+
+        The 'page_kb' option splits each book into pages of whole chapters
+            of up to about that many kilobytes (or one chapter per page if it's 0),
+            with the book page becoming an index of the chapters.
+
+        The 'book_workers' option (a number, or True for one per available CPU)
+            converts the books in a process pool,
+            and the 'chapter_workers' option does the same for the chapters of a single book.
+        They're off by default because the forked workers can't log to CloudWatch
+            (see AppSettings.logger).
+        """
+        super(Usfm2HtmlConverter, self).__init__(*args, **kwargs)
+        self.book_workers = get_worker_count(book_workers if book_workers else self.options.get('book_workers'))
 
     def convert(self):
         AppSettings.logger.debug("Processing the Bible USFM files …")
@@ -20,83 +51,45 @@ class Usfm2HtmlConverter(Converter):
         # convert_only_list = self.check_for_exclusive_convert()
         convert_only_list = [] # Not totally sure what the above line did
 
-        current_dir = os.path.dirname(os.path.realpath(__file__))
-        with open(os.path.join(current_dir, 'templates', 'template.html')) as template_file:
-            # Simple HTML template which includes $title and $content fields
-            template_html = template_file.read()
+        usfm_files = [filename for filename in sorted(files) if filename.endswith('.usfm')
+                        and not (convert_only_list and os.path.basename(filename) not in convert_only_list)]
+        # If asked for, a single (large) book gets its chapters spread across the available CPUs,
+        #   otherwise the books are spread across them
+        num_workers = min(self.book_workers, len(usfm_files))
+        chapter_workers = get_worker_count(self.options.get('chapter_workers')) if len(usfm_files) == 1 else 0
+        page_kb = self.options.get('page_kb')
+        # The books, chapters and verses found by the linter (if it was run)
+        structure_index = StructureIndex.load(os.path.join(self.files_dir, STRUCTURE_INDEX_FILENAME))
 
-        # Convert usfm files and copy across other files
+        # Convert usfm files (each output file is written as soon as that book is done)
+        #   and then log the results in book order
         num_successful_books = num_failed_books = 0
-        for filename in sorted(files):
-            if filename.endswith('.usfm'):
-                base_name = os.path.basename(filename)
-                if convert_only_list and (base_name not in convert_only_list):  # see if this is a file we are to convert
-                    continue
-
-                # Convert the USFM file
-                self.log.info(f"Converting Bible USFM file: {base_name} …") # Logger also issues DEBUG msg
-                # Copy just the single file to be converted into a single scratch folder
-                scratch_dir = tempfile.mkdtemp(prefix='tX_convert_usfm_scratch_')
-                delete_scratch_dir_flag = True # Set to False for debugging this code
-                copyfile(filename, os.path.join(scratch_dir, os.path.basename(filename)))
-                filebase = os.path.splitext(os.path.basename(filename))[0]
-                # Do the actual USFM -> HTML conversion
-                warning_list = UsfmTransform.buildSingleHtml(scratch_dir, scratch_dir, filebase)
-                if warning_list:
-                    for warning_msg in warning_list:
-                        self.log.warning(f"{filebase} - {warning_msg}")
-
-                # This code seems to be cleaning up or adjusting the converted HTML file
-                html_filename = filebase + '.html'
-                with open(os.path.join(scratch_dir, html_filename), 'rt', encoding='utf-8') as html_file:
-                    converted_html = html_file.read()
-                converted_html_length = len(converted_html)
-                # AppSettings.logger.debug(f"### Usfm2HtmlConverter got converted html of length {converted_html_length:,}")
-                # AppSettings.logger.debug(f"Got converted html: {converted_html[:500]}{' …' if len(converted_html)>500 else ''}")
-                if '</p></p></p>' in converted_html:
-                    AppSettings.logger.debug(f"Usfm2HtmlConverter got multiple consecutive paragraph closures in converted {html_filename}")
-                # Now what are we doing with the converted html ???
-                template_soup = BeautifulSoup(template_html, 'html.parser')
-                template_soup.head.title.string = self.repo_subject
-                converted_soup = BeautifulSoup(converted_html, 'html.parser')
-                content_div = template_soup.find('div', id='content')
-                content_div.clear()
-                if converted_soup and converted_soup.body:
-                    content_div.append(converted_soup.body)
-                    content_div.body.unwrap()
+        with ProcessPoolExecutor(max_workers=num_workers) if num_workers > 1 else nullcontext() as executor:
+            if executor:
+                get_results = [executor.submit(convert_usfm_file, filename, self.output_dir, self.repo_subject,
+                                                chapter_workers, structure_index, page_kb).result
+                                for filename in usfm_files]
+            else:
+                get_results = [partial(convert_usfm_file, filename, self.output_dir, self.repo_subject,
+                                                chapter_workers, structure_index, page_kb)
+                                for filename in usfm_files]
+            for filename, get_result in zip(usfm_files, get_results):
+                self.log.info(f"Converting Bible USFM file: {os.path.basename(filename)} …") # Logger also issues DEBUG msg
+                try:
+                    warnings, converted = get_result()
+                except Exception as e: # Only this book is lost
+                    AppSettings.logger.error(f"Usfm2HtmlConverter failed on {filename}: {e}")
+                    warnings, converted = [f"USFM parsing or conversion error for {os.path.basename(filename)}: {e}"], False
+                for warning_msg in warnings:
+                    self.log.warning(warning_msg)
+                if converted:
                     num_successful_books += 1
                 else:
-                    content_div.append("ERROR! NOT CONVERTED!")
-                    self.log.warning(f"USFM parsing or conversion error for {base_name}")
-                    AppSettings.logger.debug(f"Got converted html: {converted_html[:600]}{' …' if len(converted_html)>600 else ''}")
-                    if not converted_soup:
-                        AppSettings.logger.debug(f"No converted_soup")
-                    elif not converted_soup.body:
-                        AppSettings.logger.debug(f"No converted_soup.body")
-                    # from bs4.diagnose import diagnose
-                    # diagnose(converted_html)
                     num_failed_books += 1
-                output_filepath = os.path.join(self.output_dir, html_filename)
-                #print("template_soup type is", type(template_soup)) # <class 'bs4.BeautifulSoup'>
-                template_soup_string = str(template_soup)
-                write_file(output_filepath, template_soup_string)
-                template_soup_string_length = len(template_soup_string)
-                # AppSettings.logger.debug(f"### Usfm2HtmlConverter wrote souped-up html of length {template_soup_string_length:,} from {converted_html_length:,}")
-                if '</p></p></p>' in template_soup_string:
-                    AppSettings.logger.warning(f"Usfm2HtmlConverter got multiple consecutive paragraph closures in {html_filename}")
-                if template_soup_string_length < converted_html_length * 0.67: # What is the 33% or so that's lost ???
-                    AppSettings.logger.debug(f"### Usfm2HtmlConverter wrote souped-up html of length {template_soup_string_length:,} from {converted_html_length:,} = {template_soup_string_length*100.0/converted_html_length}%")
-                    self.log.warning(f"Usfm2HtmlConverter possibly lost converted html for {html_filename}")
-                    AppSettings.logger.info(f"Usfm2HtmlConverter {html_filename} was {converted_html_length:,} now {template_soup_string_length:,}")
-                    # AppSettings.logger.debug(f"Usfm2HtmlConverter {html_filename} was: {converted_html}")
-                    write_file(os.path.join(scratch_dir,filebase+'.converted.html'), template_soup_string)
-                    if prefix and debug_mode_flag:
-                        delete_scratch_dir_flag = False
-                #print("Got converted x2 html:", str(template_soup)[:500])
-                # self.log.info(f"Converted {os.path.basename(filename)} to {os.path.basename(html_filename)}.")
-                if delete_scratch_dir_flag:
-                    remove_tree(scratch_dir)
-            else:
+
+        # Copy across other files
+        for filename in sorted(files):
+            if not filename.endswith('.usfm'):
                 # Directly copy over files that are not USFM files
                 try:
                     output_filepath = os.path.join(self.output_dir, os.path.basename(filename))
@@ -110,3 +103,86 @@ class Usfm2HtmlConverter(Converter):
         return True
     # end of convert()
 # end of Usfm2HtmlConverter class
+
+
+_html_template:Optional[HtmlTemplate] = None # One per process
+
+def convert_usfm_file(filename:str, output_dir:str, title:str, chapter_workers:int=0,
+                        structure_index:Optional[StructureIndex]=None,
+                        page_kb:Optional[int]=None) -> Tuple[List[str],bool]:
+    """
+    Converts one USFM book and writes its HTML page(s) into the output folder
+        (with the verse text of each chapter as JSON in the verses folder)
+        without touching any converter state so that it can be run in a separate process.
+
+    If page_kb is given, the book is split into pages of whole chapters
+        (one chapter per page if it's zero) with a small index page as the book page.
+
+    Returns the list of warnings, and whether or not the book converted.
+    """
+    global _html_template
+    if _html_template is None:
+        # Simple HTML template which includes $title and $content fields
+        _html_template = HtmlTemplate()
+
+    warnings:List[str] = []
+    base_name = os.path.basename(filename)
+    filebase = os.path.splitext(base_name)[0]
+    try:
+        with open(filename, 'rt') as usfm_file: # Read the same way as books.loadBooks
+            usfm = usfm_file.read()
+    except (OSError, UnicodeError) as e:
+        warnings.append(f"Unable to read {base_name}: {e}")
+        write_file(os.path.join(output_dir, filebase + '.html'), _html_template.fill(title, NOT_CONVERTED_HTML))
+        return warnings, False
+    # Do the actual USFM -> HTML (and JSON) conversion (in memory)
+    json_renderer = JSONRenderer()
+    if page_kb is None:
+        converted_html, warning_list = UsfmTransform.renderSingleHtml(usfm,
+                                                       chapterWorkers=chapter_workers,
+                                                       structureIndex=structure_index,
+                                                       extraRenderers=(json_renderer,))
+        pages:Iterable[Tuple[str,str]] = [(filebase + '.html', converted_html)]
+    else:
+        pages, warning_list = UsfmTransform.renderSingleHtmlPages(usfm, filebase, page_kb * 1024,
+                                                       chapterWorkers=chapter_workers,
+                                                       structureIndex=structure_index,
+                                                       extraRenderers=(json_renderer,))
+    for warning_msg in warning_list:
+        warnings.append(f"{filebase} - {warning_msg}")
+    for chapter_number_string, chapter_json in json_renderer.iterChapterJSON():
+        write_file(os.path.join(output_dir, VERSES_FOLDER, f'{filebase}-{chapter_number_string}.json'), chapter_json)
+
+    converted = True
+    for html_filename, converted_html in pages:
+        # This code seems to be cleaning up or adjusting the converted HTML file
+        converted_html_length = len(converted_html)
+        # AppSettings.logger.debug(f"### Usfm2HtmlConverter got converted html of length {converted_html_length:,}")
+        # AppSettings.logger.debug(f"Got converted html: {converted_html[:500]}{' …' if len(converted_html)>500 else ''}")
+        if '</p></p></p>' in converted_html:
+            AppSettings.logger.debug(f"Usfm2HtmlConverter got multiple consecutive paragraph closures in converted {html_filename}")
+        # Put the contents of the converted body into the template
+        body_html = extract_body_html(converted_html)
+        if body_html is None:
+            converted = False
+            body_html = NOT_CONVERTED_HTML
+            warnings.append(f"USFM parsing or conversion error for {base_name}")
+            AppSettings.logger.debug(f"Got converted html: {converted_html[:600]}{' …' if len(converted_html)>600 else ''}")
+        output_filepath = os.path.join(output_dir, html_filename)
+        page_html = _html_template.fill(title, body_html)
+        write_file(output_filepath, page_html)
+        page_html_length = len(page_html)
+        if '</p></p></p>' in page_html:
+            AppSettings.logger.warning(f"Usfm2HtmlConverter got multiple consecutive paragraph closures in {html_filename}")
+        if page_html_length < converted_html_length * 0.67: # What is the 33% or so that's lost ???
+            AppSettings.logger.debug(f"### Usfm2HtmlConverter wrote souped-up html of length {page_html_length:,} from {converted_html_length:,} = {page_html_length*100.0/converted_html_length}%")
+            warnings.append(f"Usfm2HtmlConverter possibly lost converted html for {html_filename}")
+            AppSettings.logger.info(f"Usfm2HtmlConverter {html_filename} was {converted_html_length:,} now {page_html_length:,}")
+            # AppSettings.logger.debug(f"Usfm2HtmlConverter {html_filename} was: {converted_html}")
+            if prefix and debug_mode_flag: # Leave both versions on disk for debugging
+                debug_dir = tempfile.mkdtemp(prefix='tX_convert_usfm_debug_')
+                write_file(os.path.join(debug_dir, html_filename), converted_html)
+                write_file(os.path.join(debug_dir, os.path.splitext(html_filename)[0]+'.converted.html'), page_html)
+                AppSettings.logger.debug(f"Usfm2HtmlConverter left {html_filename} in '{debug_dir}' for debugging")
+    return warnings, converted
+# end of convert_usfm_file function
@@ -0,0 +1,176 @@
+"""
+Local index of the tD languages (langnames.json)
+
+Jobs only need to look up language codes,
+    so rather than downloading the 7000+ languages from tD in every process,
+    the index is loaded from a cached copy of langnames.json
+    (or from the snapshot bundled in door43_tools/resources if there's no cached copy yet).
+
+When the cached copy is older than LANGNAMES_TTL_SECONDS (default one week),
+    a fresh copy is downloaded in a background thread for next time,
+    so the job never waits for the network.
+Set LANGNAMES_CACHE_FILEPATH to change where the cached copy is kept.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+import os
+import re
+import json
+import gzip
+import time
+import tempfile
+import threading
+
+from general_tools import url_utils
+from app_settings.app_settings import AppSettings
+
+
+LANGNAMES_URL = 'http://td.unfoldingword.org/exports/langnames.json'
+BUNDLED_LANGNAMES_FILEPATH = os.path.join(os.path.dirname(os.path.realpath(__file__)),
+                                          'resources', 'langnames.json.gz')
+DEFAULT_CACHE_FILEPATH = os.path.join(tempfile.gettempdir(), 'tX_langnames.json')
+DEFAULT_TTL_SECONDS = 7 * 24 * 60 * 60
+
+# e.g. ab, abc, pt-br, es-419, sr-latn, abc-x-abcdefg, -x-abcdefg
+LANGUAGE_CODE_RE = re.compile(r'(?:[a-z]{2,3}(?:-[a-z0-9]{2,4}|-x-\w+)?|-x-\w+)$')
+
+# Each language is kept as a tuple of these langnames.json fields (rather than as a dict)
+LANGUAGE_FIELDS = ('lc', 'ln', 'ld', 'ang', 'lr', 'gw', 'pk', 'alt', 'cc')
+
+
+class LanguageIndex:
+    """
+    The languages by lowercase language code.
+    """
+    def __init__(self, languages:List[Dict[str,Any]], source:str='') -> None:
+        self.source = source
+        self.loadedAt = time.time()
+        self.languages:Dict[str,Tuple] = {language['lc'].lower():tuple(language.get(field) for field in LANGUAGE_FIELDS)
+                                                    for language in languages}
+
+    def __len__(self) -> int:
+        return len(self.languages)
+
+    @staticmethod
+    def is_valid_format(language_code:str) -> bool:
+        return LANGUAGE_CODE_RE.match(language_code.lower()) is not None
+
+    def get_language(self, language_code:str) -> Optional[Dict[str,Any]]:
+        """
+        Returns the langnames.json entry for the code, or None if there isn't one.
+        """
+        language = self.languages.get(language_code.lower())
+        return None if language is None else dict(zip(LANGUAGE_FIELDS, language))
+
+    def get_base_language(self, language_code:str) -> Optional[Dict[str,Any]]:
+        """
+        Returns the entry for the code or, if it's not listed,
+            for its base language (e.g., en for en-x-demo or pt-br).
+        """
+        language = self.get_language(language_code)
+        if language is None and '-' in language_code.strip('-'):
+            language = self.get_language(language_code.split('-', 1)[0])
+        return language
+
+    def get_languages(self) -> List[Dict[str,Any]]:
+        return [dict(zip(LANGUAGE_FIELDS, language)) for language in self.languages.values()]
+
+    def validate_language_code(self, language_code:str) -> Optional[str]:
+        """
+        Returns the lowercase language code if it's a known language, else None.
+        """
+        language_code = language_code.lower()
+        if LANGUAGE_CODE_RE.match(language_code) and language_code in self.languages:
+            return language_code
+        return None
+# end of LanguageIndex class
+
+
+def get_cache_filepath() -> str:
+    return os.getenv('LANGNAMES_CACHE_FILEPATH', DEFAULT_CACHE_FILEPATH)
+
+
+def get_ttl_seconds() -> float:
+    return float(os.getenv('LANGNAMES_TTL_SECONDS', DEFAULT_TTL_SECONDS))
+
+
+def load_languages(filepath:str) -> Optional[List[Dict[str,Any]]]:
+    """
+    Loads a (possibly gzipped) langnames.json file.
+
+    Returns None if it's missing or doesn't look like a list of languages.
+    """
+    try:
+        opener = gzip.open if filepath.endswith('.gz') else open
+        with opener(filepath, 'rt', encoding='utf-8') as langnames_file:
+            languages = json.load(langnames_file)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        AppSettings.logger.warning(f"Unable to load languages from {filepath}: {e}")
+        return None
+    if not isinstance(languages, list) or not all(isinstance(language, dict) and 'lc' in language
+                                                  for language in languages):
+        AppSettings.logger.warning(f"Ignoring unexpected languages file {filepath}")
+        return None
+    return languages
+# end of load_languages function
+
+
+def refresh_language_cache(cache_filepath:Optional[str]=None) -> bool:
+    """
+    Downloads langnames.json from tD into the cache file.
+
+    Returns True if it was updated.
+    """
+    cache_filepath = cache_filepath if cache_filepath else get_cache_filepath()
+    try:
+        languages = json.loads(url_utils.get_url(LANGNAMES_URL))
+    except Exception as e:
+        AppSettings.logger.warning(f"Unable to download languages from {LANGNAMES_URL}: {e}")
+        return False
+    if not isinstance(languages, list) or not languages:
+        AppSettings.logger.warning(f"Ignoring unexpected languages from {LANGNAMES_URL}")
+        return False
+    # Write to a temporary file first so that other processes never see a partial file
+    try:
+        file_descriptor, temp_filepath = tempfile.mkstemp(dir=os.path.dirname(cache_filepath) or '.', suffix='.tmp')
+        with os.fdopen(file_descriptor, 'wt', encoding='utf-8') as temp_file:
+            json.dump(languages, temp_file, ensure_ascii=False, separators=(',',':'))
+        os.replace(temp_filepath, cache_filepath)
+    except OSError as e:
+        AppSettings.logger.warning(f"Unable to save languages to {cache_filepath}: {e}")
+        return False
+    return True
+# end of refresh_language_cache function
+
+
+_languageIndex:Optional[LanguageIndex] = None
+_refreshThread:Optional[threading.Thread] = None
+
+def get_language_index() -> LanguageIndex:
+    """
+    Returns the shared index, reloading it from disk once it's older than the TTL
+        (and starting a background download if the cached copy is also out of date).
+    """
+    global _languageIndex, _refreshThread
+    ttl_seconds = get_ttl_seconds()
+    if _languageIndex is not None and time.time() - _languageIndex.loadedAt < ttl_seconds:
+        return _languageIndex
+
+    cache_filepath = get_cache_filepath()
+    languages = load_languages(cache_filepath)
+    if languages:
+        _languageIndex = LanguageIndex(languages, cache_filepath)
+    elif _languageIndex is None:
+        _languageIndex = LanguageIndex(load_languages(BUNDLED_LANGNAMES_FILEPATH) or [], BUNDLED_LANGNAMES_FILEPATH)
+    else: # No cached copy yet so keep using what we have
+        _languageIndex.loadedAt = time.time()
+
+    try: cache_age = time.time() - os.path.getmtime(cache_filepath)
+    except OSError: cache_age = None
+    if (cache_age is None or cache_age >= ttl_seconds) and not os.getenv('TEST_MODE', '') \
+    and (_refreshThread is None or not _refreshThread.is_alive()):
+        _refreshThread = threading.Thread(target=refresh_language_cache, args=(cache_filepath,), daemon=True)
+        _refreshThread.start()
+    return _languageIndex
+# end of get_language_index function
@@ -1,4 +1,4 @@
-import re
+from door43_tools.language_index import LANGUAGE_CODE_RE
 # from urllib.parse import urlparse
 # from decimal import Decimal
 # from datetime import datetime
@@ -179,16 +179,8 @@ class PageMetrics:
         :return:
         """
         language_code = language_code.lower()
-        lang_code_pattern = re.compile("^[a-z]{2,3}(-[a-z0-9]{2,4})?$")  # e.g. ab, abc, pt-br, es-419, sr-latn
-        valid_lang_code = lang_code_pattern.match(language_code)
-        if not valid_lang_code:
-            extended_lang_code_pattern = re.compile(r'^[a-z]{2,3}(-x-[\w\d]+)?$')  # e.g. abc-x-abcdefg
-            valid_lang_code = extended_lang_code_pattern.match(language_code)
-            if not valid_lang_code:
-                extended_lang_code_pattern2 = re.compile(r'^(-x-[\w\d]+)$')  # e.g. -x-abcdefg
-                valid_lang_code = extended_lang_code_pattern2.match(language_code)
-                if not valid_lang_code:
-                    language_code = None
+        if not LANGUAGE_CODE_RE.match(language_code): # e.g. ab, abc, pt-br, es-419, sr-latn, abc-x-abcdefg, -x-abcdefg
+            language_code = None
         return language_code
 
     # @staticmethod
@@ -1,6 +1,4 @@
-import json
-
-from general_tools import url_utils
+from door43_tools.language_index import get_language_index
 
 
 class TdLanguage:
@@ -29,13 +27,11 @@ class TdLanguage:
     @staticmethod
     def get_languages():
         """
-        Gets the list of Languages. Retrieves the list from tD if needed.
+        Gets the list of Languages. Loads them from the local language index if needed.
         :return: list<TdLanguage>
         """
         if not TdLanguage.language_list:
-            lang_file = 'http://td.unfoldingword.org/exports/langnames.json'
-            langs = json.loads(url_utils.get_url(lang_file))
-            for lang in langs:
+            for lang in get_language_index().get_languages():
                 TdLanguage.language_list[lang['lc']] = TdLanguage(lang)
         return TdLanguage.language_list
 
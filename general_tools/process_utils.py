@@ -0,0 +1,29 @@
+from typing import Union
+import os
+
+
+def get_available_cpu_count() -> int:
+    """
+    Returns the number of CPUs that this process can actually run on
+        (os.cpu_count() gives all the host's CPUs, even in a container).
+    """
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError: # Not on all platforms, e.g., macOS
+        return os.cpu_count() or 1
+
+
+def get_worker_count(requested:Union[bool,int,None]) -> int:
+    """
+    Returns the number of worker processes to use (1 meaning do it all in this process)
+        given the number requested (or True for one per available CPU).
+
+    Never gives more than the number of available CPUs.
+    """
+    available = get_available_cpu_count()
+    if requested is True:
+        return available
+    try:
+        return max(1, min(int(requested or 1), available))
+    except (TypeError, ValueError): # e.g., a bad job option
+        return 1
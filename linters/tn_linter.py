@@ -10,6 +10,7 @@ from linters.markdown_linter import MarkdownLinter
 from linters.linter import Linter
 from linters.py_markdown_linter.lint import MarkdownLinter as PyMarkdownLinter
 from linters.py_markdown_linter.config import LintConfig
+from tx_usfm_tools.word_index import WordIndex, getWordIndex, splitQuote
 
 
 class TnLinter(MarkdownLinter):
@@ -107,10 +108,19 @@ class TnTsvLinter(Linter):
     link_marker_re = re.compile(r'\]\(([^\n()]+)\)')
     EXPECTED_TAB_COUNT = 4 # So there's one more column than this
         # NOTE: The preprocessor removes unneeded columns while fixing links
+    TSV_HEADER = 'Book	Chapter	Verse	OrigQuote	OccurrenceNote'
+    # Also accept the unpreprocessed columns (which include the Occurrence)
+    FULL_TSV_HEADER = 'Book	Chapter	Verse	ID	SupportReference	OrigQuote	Occurrence	GLQuote	OccurrenceNote'
+    FULL_TAB_COUNT = 8
 
 
-    # def __init__(self, *args, **kwargs) -> None:
-    #     super(TnTsvLinter, self).__init__(*args, **kwargs)
+    def __init__(self, *args, original_language_dir:Optional[str]=None, **kwargs) -> None:
+        """
+        :param string original_language_dir: If set (or if ORIGINAL_LANGUAGE_USFM_DIR is),
+                                                the OrigQuotes are checked against the USFM books in it
+        """
+        super(TnTsvLinter, self).__init__(*args, **kwargs)
+        self.word_index:Optional[WordIndex] = getWordIndex(original_language_dir)
 
 
     def lint(self) -> bool:
@@ -155,6 +165,8 @@ class TnTsvLinter(Linter):
             tsv_filepath = os.path.join(source_dir, filename)
             started = False
             expectedB = filename[-7:-4]
+            expected_tab_count = TnTsvLinter.EXPECTED_TAB_COUNT
+            need_to_check_quotes = self.word_index is not None and self.word_index.hasBook(expectedB)
             lastC = lastV = C = V = '0'
             with open(tsv_filepath, 'rt') as tsv_file:
                 for tsv_line in tsv_file:
@@ -162,16 +174,22 @@ class TnTsvLinter(Linter):
                     tab_count = tsv_line.count('\t')
                     if not started:
                         # AppSettings.logger.debug(f"TSV header line is '{tsv_line}'")
-                        if tsv_line != 'Book	Chapter	Verse	OrigQuote	OccurrenceNote':
+                        if tsv_line == TnTsvLinter.FULL_TSV_HEADER:
+                            expected_tab_count = TnTsvLinter.FULL_TAB_COUNT
+                        elif tsv_line != TnTsvLinter.TSV_HEADER:
                             self.log.warning(f"Unexpected TSV header line: '{tsv_line}' in {filename}")
                             error_count += 1
                         started = True
-                    elif tab_count != TnTsvLinter.EXPECTED_TAB_COUNT:
-                        self.log.warning(f"Bad {expectedB} line near {C}:{V} with {tab_count} tabs (expected {TnTsvLinter.EXPECTED_TAB_COUNT})")
-                        B = C = V = _OrigQuote = OccurrenceNote = None
+                    elif tab_count != expected_tab_count:
+                        self.log.warning(f"Bad {expectedB} line near {C}:{V} with {tab_count} tabs (expected {expected_tab_count})")
+                        B = C = V = OrigQuote = OccurrenceNote = None
                         error_count += 1
                     else:
-                        B, C, V, _OrigQuote, OccurrenceNote = tsv_line.split('\t')
+                        if expected_tab_count == TnTsvLinter.FULL_TAB_COUNT:
+                            B, C, V, _ID, _SupportReference, OrigQuote, Occurrence, _GLQuote, OccurrenceNote = tsv_line.split('\t')
+                        else:
+                            B, C, V, OrigQuote, OccurrenceNote = tsv_line.split('\t')
+                            Occurrence = '1' # Not known so check that it's there at all
                         if B != expectedB:
                             self.log.warning(f"Unexpected '{B}' in '{tsv_line}' in {filename}")
                         if not C:
@@ -197,10 +215,10 @@ class TnTsvLinter(Linter):
                         else: # just started a new chapter
                             if not V.isdigit() and V != 'intro':
                                 self.log.warning(f"Bad '{V}' verse number in start of chapter {C} in {filename}")
-                        # if OrigQuote and need_to_check_quotes:
-                        #     try: self.check_original_language_quotes(B,C,V,OrigQuote)
-                        #     except Exception as e:
-                        #         self.log.warning(f"{B} {C}:{V} Unable to check original language quotes: {e}")
+                        if OrigQuote and need_to_check_quotes:
+                            try: self.check_original_language_quotes(B,C,V,OrigQuote,Occurrence)
+                            except Exception as e:
+                                self.log.warning(f"{B} {C}:{V} Unable to check original language quotes: {e}")
                         if OccurrenceNote:
                             left_count, right_count = OccurrenceNote.count('['), OccurrenceNote.count(']')
                             if left_count != right_count:
@@ -221,6 +239,31 @@ class TnTsvLinter(Linter):
     # end of TnTsvLinter.lint()
 
 
+    def check_original_language_quotes(self, B:str, C:str, V:str, OrigQuote:str, Occurrence:str) -> None:
+        """
+        Checks that the quote occurs (at least Occurrence times) in the original language verse
+        """
+        if not C.isdigit() or not V.isdigit() or Occurrence == '0': # 0 means not in the verse
+            return
+        if not Occurrence.lstrip('-').isdigit():
+            self.log.warning(f"{B} {C}:{V} Bad '{Occurrence}' occurrence number for '{OrigQuote}'")
+            return
+        quote_parts = splitQuote(OrigQuote)
+        if not quote_parts:
+            return
+        verse_words = self.word_index.getVerse(B, int(C), int(V))
+        if verse_words is None:
+            self.log.warning(f"{B} {C}:{V} Unable to find original language verse for '{OrigQuote}'")
+            return
+        occurrence = max(int(Occurrence), 1) # -1 means every occurrence
+        count = verse_words.countOccurrences(quote_parts)
+        if not count:
+            self.log.warning(f"{B} {C}:{V} Unable to find '{OrigQuote}' in original language verse")
+        elif count < occurrence:
+            self.log.warning(f"{B} {C}:{V} Only found {count} of {occurrence} occurrences of '{OrigQuote}' in original language verse")
+    # end of TnTsvLinter.check_original_language_quotes function
+
+
     def check_markdown(self, mdLinter:PyMarkdownLinter, markdown_string:str, reference:str) -> None:
         """
         Checks the header progressions in the markdown string
@@ -1,9 +1,17 @@
-from typing import Tuple, Optional
+from typing import List, Tuple, Optional
 import os
+import re
 import traceback
+from itertools import chain
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor
 from linters.linter import Linter
-from door43_tools.page_metrics import PageMetrics
+from general_tools.process_utils import get_worker_count
+from door43_tools.language_index import get_language_index
 from tx_usfm_tools import verifyUSFM, books
+from tx_usfm_tools.chapters import read_chapters, split_chapters
+from tx_usfm_tools.structure_index import BookStructure, StructureIndex, STRUCTURE_INDEX_FILENAME
+from tx_usfm_tools.references import ReferenceChecker
 from app_settings.app_settings import AppSettings
 
 
@@ -18,15 +26,35 @@ SHOULD_ALWAYS_HAVE_TEXT_MARKERS = ( # Put longest markers ahead of shorter ones
                             's1','s2','s3','s4', # Can't use 's' yet coz we have empty s5 fields
                             'zaln-s', 'w',
                             )
+# Matches whichever of the above comes first in the list (just like a loop of startswith() would)
+SHOULD_ALWAYS_HAVE_TEXT_MARKER_RE = re.compile(r'\\(?:' + '|'.join(re.escape(marker)
+                                            for marker in SHOULD_ALWAYS_HAVE_TEXT_MARKERS) + ')')
+MARKER_LINE_RE = re.compile(r'^\\.*', re.MULTILINE) # Lines that start with a backslash
 
 
 
 class UsfmLinter(Linter):
 
 
-    def __init__(self, single_file:Optional[str]=None, *args, **kwargs) -> None:
+    def __init__(self, single_file:Optional[str]=None, book_workers:Optional[int]=None,
+                                        streaming:bool=False, *args, **kwargs) -> None:
+        """
+        book_workers is the number of processes used to verify the books
+            (default is 1, which verifies them all in this process,
+                and True is one per available CPU).
+        The pool is opt-in because the forked workers can't log to CloudWatch
+            (see AppSettings.logger).
+        If streaming is set, each book is read and verified a chapter at a time instead
+            (see stream_file).
+
+        The chapters and verses found are collected in self.structure_index
+            which is saved in the source folder for the converter to use.
+        """
         self.single_file = single_file
+        self.book_workers = get_worker_count(book_workers)
+        self.streaming = streaming
         self.found_books = []
+        self.structure_index = StructureIndex()
         super(UsfmLinter, self).__init__(*args, **kwargs)
 
 
@@ -40,10 +68,8 @@ class UsfmLinter(Linter):
         """
 
         lang_code = self.rc.resource.language.identifier
-        valid_lang_code = PageMetrics().validate_language_code(lang_code)
-        if not valid_lang_code:
-            self.log.warning(f"Invalid language code: {lang_code}")
 
+        book_list = [] # (file_path, sub_path, filename, versification) 4-tuples in the order that they're reported
         for root, _dirs, files in os.walk(self.source_dir):
             for filename in sorted(files):
                 if os.path.splitext(filename)[1].lower() != '.usfm':  # only usfm files
@@ -55,27 +81,156 @@ class UsfmLinter(Linter):
                 AppSettings.logger.debug(f"Linting {filename} …")
                 file_path = os.path.join(root, filename)
                 sub_path = '.' + file_path[len(self.source_dir):]
-                self.parse_file(file_path, sub_path, filename)
+                book_list.append((file_path, sub_path, filename, self.get_versification(filename)))
+
+        # Each book is checked independently (in parallel if asked to)
+        #   and then the results are added in book order
+        num_workers = 1 if self.streaming else min(self.book_workers, len(book_list))
+        with ProcessPoolExecutor(max_workers=num_workers) if num_workers > 1 else nullcontext() as executor:
+            # The workers are all forked when the first book is submitted,
+            #   i.e., before get_language_index() might start its refresh thread
+            futures = [executor.submit(check_usfm_file, file_path, sub_path, filename, lang_code, versification)
+                                for file_path, sub_path, filename, versification in book_list] if executor else None
+
+            language_index = get_language_index() # Local copy of the tD languages (no download needed)
+            if not language_index.is_valid_format(lang_code):
+                self.log.warning(f"Invalid language code: {lang_code}")
+            elif not lang_code.lower().startswith('-x-') and not language_index.get_base_language(lang_code):
+                # Private-use codes (-x-…) aren't listed so can't be checked
+                self.log.warning(f"Unknown language code: {lang_code}")
+
+            if self.streaming:
+                for file_path, sub_path, filename, versification in book_list:
+                    self.stream_file(file_path, sub_path, filename, lang_code, versification)
+            elif executor:
+                results = [future.result() for future in futures]
+            else:
+                results = [check_usfm_file(file_path, sub_path, filename, lang_code, versification)
+                                        for file_path, sub_path, filename, versification in book_list]
+        if not self.streaming:
+            for (_file_path, sub_path, _filename, _versification), (warnings, found_book_code, structure) in zip(book_list, results):
+                self.add_book_results(sub_path, warnings, found_book_code, structure)
 
         if not self.found_books:
             self.log.warning("No translations found")
+        elif self.structure_index: # Saved for the converter
+            try: self.structure_index.save(os.path.join(self.source_dir, STRUCTURE_INDEX_FILENAME))
+            except OSError as e:
+                AppSettings.logger.warning(f"Unable to save USFM structure index: {e}")
 
         return True
 
 
-    def parse_file(self, file_path:str, sub_path:str, file_name:str) -> None:
+    def get_versification(self, file_name:str) -> Optional[str]:
+        """
+        Returns the versification from the manifest project for this book
+            (or from the first project if there's no project for it).
+        """
+        if not self.rc:
+            return None
+        book_code, _book_full_name = self.get_book_ids(file_name)
+        project = self.rc.project(book_code.lower()) if book_code else None
+        if project is None:
+            project = self.rc.projects[0]
+        return project.versification
 
+
+    def add_book_results(self, sub_path:str, warnings:List[str], found_book_code:Optional[str],
+                                structure:Optional[BookStructure]=None) -> None:
+        """
+        Does the cross-book checks and logs the warnings for one book.
+        """
+        if found_book_code:
+            if found_book_code in self.found_books:
+                self.log.warning(f"File '{sub_path}' has same code {found_book_code!r} as previous file")
+            self.found_books.append(found_book_code)
+            if structure is not None:
+                structure.bookCode = found_book_code
+                self.structure_index.addBook(structure)
+        for warning in warnings:
+            self.log.warning(warning)
+    # end of add_book_results function
+
+
+    def stream_file(self, file_path:str, sub_path:str, file_name:str,
+                                lang_code:str, versification:Optional[str]=None) -> None:
+        """
+        Checks one USFM book a chapter at a time as it's read in,
+            logging the warnings as they're found,
+            so the memory used doesn't grow with the size of the book.
+
+        The warnings are the same as from parse_file,
+            but the line checks are interleaved chapter by chapter
+            and any duplicate book code warning comes last.
+        """
         book_code, book_full_name = self.get_book_ids(file_name)
+        structure = BookStructure(file_name)
+        verifier = verifyUSFM.UsfmVerifier(book_code, lang_code, versification, structure)
+        line_checker = MarkerLineChecker()
+        line_problems:List[str] = [] # from lines that have been read but not logged yet
+        reference_checker = ReferenceChecker(book_code, versification)
+
+        def read_lines(book_file):
+            started = False
+            for line in book_file:
+                if not started: # Skip leading whitespace (like lstrip())
+                    line = line.lstrip()
+                    if not line: continue
+                    started = True
+                if line.startswith('\\'):
+                    problem = line_checker.check(line.rstrip('\n'))
+                    if problem:
+                        line_problems.append(problem)
+                yield line
+
+        def log_line_problems(line_book_code):
+            for problem in line_problems:
+                self.log.warning(f"{line_book_code} {problem}")
+            line_problems.clear()
+
+        def check_references(part):
+            for warning in reference_checker.check(part):
+                self.log.warning(warning)
+
+        def verify_parts(parts):
+            for part in parts:
+                structure.addPart(part)
+                yield part
+                log_line_problems(verifier.ID) # after the part is verified so the book code is known
+                reference_checker.bookCode = verifier.ID or book_code
+                check_references(part)
 
         try:
-            f = open(file_path, 'rt')
-            book_text = f.read().lstrip()
-            if book_text:
-                self.parse_usfm_text(sub_path, file_name, book_text, book_full_name, book_code)
-            else:
-                self.log.warning(f"USFM book '{file_name}' seems empty")
+            with open(file_path, 'rt') as book_file:
+                parts = (part for part in read_chapters(read_lines(book_file)) if part)
+                first_part = next(parts, None)
+                if first_part is None:
+                    self.log.warning(f"USFM book '{file_name}' seems empty")
+                    return
+                try:
+                    for error in verifier.verifyParts(verify_parts(chain([first_part], parts)), book_full_name):
+                        self.log.warning(error)
+                    log_line_problems(verifier.ID)
+                except (OSError, UnicodeError):
+                    raise
+                except Exception as e: # for debugging
+                    self.log.warning(f"Failed to verify book '{file_name}', exception: {e}")
+                    print(f"Failed to verify USFM book '{file_name}', exception: {e}: {traceback.format_exc()}")
+                    for part in parts: # Finish the line and reference checks
+                        check_references(part)
+                    log_line_problems(book_code)
+                    return
         except Exception as e:
             self.log.warning(f"Failed to open USFM book '{file_name}', exception: {e}")
+            return
+        self.add_book_results(sub_path, [], verifier.ID, structure)
+    # end of stream_file function
+
+
+    def parse_file(self, file_path:str, sub_path:str, file_name:str) -> None:
+        lang_code = self.rc.resource.language.identifier if self.rc else None
+        self.add_book_results(sub_path, *check_usfm_file(file_path, sub_path, file_name, lang_code,
+                                                        self.get_versification(file_name)))
     # end of parse_file function
 
 
@@ -129,46 +284,99 @@ class UsfmLinter(Linter):
                                 book_text:str, book_full_name:str, book_code:str) -> None:
         """
         """
-        if not book_text:
-            self.log.warning(f"{book_code} - No USFM text found")
-            return
-
-        try:
-            lang_code = self.rc.resource.language.identifier
-            errors, book_code = verifyUSFM.verify_contents_quiet(book_text, book_full_name, book_code, lang_code)
-
-            # if found_book_code:
-            #     book_code = found_book_code
-
-            if book_code:
-                if book_code in self.found_books:
-                    self.log.warning(f"File '{sub_path}' has same code {book_code!r} as previous file")
-                self.found_books.append(book_code)
-
-            if errors:
-                for error in errors:
-                    self.log.warning(error)
-
-        except Exception as e: # for debugging
-            self.log.warning(f"Failed to verify book '{file_name}', exception: {e}")
-            print(f"Failed to verify USFM book '{file_name}', exception: {e}: {traceback.format_exc()}")
-
-        # RJH added checks for USFM lines without content (Dec 2019)
-        # TODO: Ideally this should go in
-        C = V = '0'
-        for line in book_text.split('\n'):
-            if line.startswith('\\'):
-                if line.startswith('\\c '): C, V = line[3:], '0'
-                elif line.startswith('\\v '):
-                    ixSpace = line.find(' ', 3) # Find the end of the verse number
-                    V = '?' if ixSpace==-1 else line[3:ixSpace]
-                for marker in SHOULD_ALWAYS_HAVE_TEXT_MARKERS:
-                    if line.startswith(f'\\{marker}'):
-                        if len(line) <= len(marker) + 1: # 1 for backslash
-                            self.log.warning(f"{book_code} {C}:{V} '{line}' line has no content")
-                        elif len(line) < len(marker) + 5: # 1 for backslash and space + 3
-                            # Shortest line is '\h Job', '\usfm 3.0'
-                            self.log.warning(f"{book_code} {C}:{V} '{line}' line seems too short")
-                        break
+        lang_code = self.rc.resource.language.identifier if self.rc else None
+        self.add_book_results(sub_path, *check_usfm_text(file_name, book_text, book_full_name, book_code, lang_code,
+                                                        self.get_versification(file_name)))
     # end of parse_usfm_text function
 # end of UsfmLinter class
+
+
+
+def check_usfm_file(file_path:str, sub_path:str, file_name:str, lang_code:str,
+                    versification:Optional[str]=None) -> Tuple[List[str],Optional[str],Optional[BookStructure]]:
+    """
+    Checks one USFM book without touching any linter state
+        so that it can be run in a separate process.
+
+    Returns the list of warnings, the book code found (or None), and the book structure (or None).
+    """
+    book_code, book_full_name = UsfmLinter.get_book_ids(file_name)
+
+    try:
+        with open(file_path, 'rt') as f:
+            book_text = f.read().lstrip()
+        if book_text:
+            return check_usfm_text(file_name, book_text, book_full_name, book_code, lang_code, versification)
+        return [f"USFM book '{file_name}' seems empty"], None, None
+    except Exception as e:
+        return [f"Failed to open USFM book '{file_name}', exception: {e}"], None, None
+# end of check_usfm_file function
+
+
+def check_usfm_text(file_name:str, book_text:str, book_full_name:str, book_code:str, lang_code:str,
+                    versification:Optional[str]=None) -> Tuple[List[str],Optional[str],Optional[BookStructure]]:
+    """
+    Returns the list of warnings, the book code found (or None), and the book structure (or None).
+    """
+    if not book_text:
+        return [f"{book_code} - No USFM text found"], None, None
+
+    warnings:List[str] = []
+    found_book_code = structure = None
+    try:
+        structure = BookStructure(file_name)
+        header, chapters = split_chapters(book_text)
+        for part in chain([header], chapters):
+            structure.addPart(part)
+        errors, book_code = verifyUSFM.UsfmVerifier(book_code, lang_code, versification, structure) \
+                                        .verify(book_text, book_full_name)
+        found_book_code = book_code
+        warnings.extend(errors)
+
+    except Exception as e: # for debugging
+        warnings.append(f"Failed to verify book '{file_name}', exception: {e}")
+        print(f"Failed to verify USFM book '{file_name}', exception: {e}: {traceback.format_exc()}")
+        structure = None
+
+    # RJH added checks for USFM lines without content (Dec 2019)
+    # TODO: Ideally this should go in
+    line_checker = MarkerLineChecker()
+    for line_match in MARKER_LINE_RE.finditer(book_text):
+        problem = line_checker.check(line_match.group())
+        if problem:
+            warnings.append(f"{book_code} {problem}")
+
+    # Check the chapter:verse references in footnotes and cross-references
+    warnings.extend(ReferenceChecker(found_book_code or book_code, versification).check(book_text))
+    return warnings, found_book_code, structure
+# end of check_usfm_text function
+
+
+
+class MarkerLineChecker:
+    """
+    Checks lines that start with a marker for missing content,
+        keeping track of the chapter and verse as it goes.
+    """
+    def __init__(self) -> None:
+        self.C = self.V = '0'
+
+    def check(self, line:str) -> Optional[str]:
+        """
+        Given the next line starting with a backslash (without the newline),
+            returns the problem (prefixed by the chapter and verse) or None.
+        """
+        if line.startswith('\\c '): self.C, self.V = line[3:], '0'
+        elif line.startswith('\\v '):
+            ixSpace = line.find(' ', 3) # Find the end of the verse number
+            self.V = '?' if ixSpace==-1 else line[3:ixSpace]
+        marker_match = SHOULD_ALWAYS_HAVE_TEXT_MARKER_RE.match(line)
+        if marker_match:
+            marker_length = marker_match.end() # including the backslash
+            if len(line) <= marker_length:
+                return f"{self.C}:{self.V} '{line}' line has no content"
+            if len(line) < marker_length + 4: # space + 3
+                # Shortest line is '\h Job', '\usfm 3.0'
+                return f"{self.C}:{self.V} '{line}' line seems too short"
+        return None
+# end of MarkerLineChecker class
@@ -0,0 +1,99 @@
+"""
+Synthetic USFM generator for the tx_usfm_tools benchmarks
+
+Books are sized from the usfm_verses.verses table
+    (so a whole synthetic Bible has the real 1,189 chapters and 31,102 verses)
+    and the text is generated from a fixed seed so every run sees identical input.
+
+Three styles are available:
+    plain:   headings, paragraphs, section breaks and some poetry
+    notes:   plain plus footnotes and cross-references
+    aligned: notes plus \\zaln-s/\\zaln-e milestones and \\w word attributes on every word
+"""
+from typing import List, Optional
+import random
+
+from tx_usfm_tools.usfm_verses import verses
+
+
+STYLES = ('plain', 'notes', 'aligned')
+
+WORDS = ('the', 'and', 'of', 'to', 'he', 'said', 'God', 'people', 'in', 'his', 'that', 'was',
+         'for', 'Lord', 'they', 'land', 'with', 'all', 'them', 'king', 'house', 'son', 'day',
+         'went', 'came', 'before', 'Israel', 'servant', 'heart', 'word', 'water', 'bread')
+ORIGINAL_WORDS = ('λόγος', 'θεός', 'καί', 'ἐν', 'αὐτός', 'λέγω', 'εἰμί', 'κύριος', 'ὁ', 'πᾶς')
+CROSS_REFERENCE_TARGETS = ('Gen 1:1', 'Exo 20:2', 'Psa 23:1', 'Isa 53:5', 'Mat 5:3',
+                           'John 3:16', 'Rom 8:28', 'Heb 11:1', 'Rev 21:4')
+
+
+def book_codes() -> List[str]:
+    """
+    The 66 canonical book codes in order.
+    """
+    return [book_code for book_code in verses if verses[book_code]['chapters']]
+
+
+def make_book(book_code:str, style:str='plain', seed:int=0) -> str:
+    """
+    Returns the complete USFM text for one synthetic book.
+    """
+    assert style in STYLES
+    book_info = verses[book_code]
+    book_name = book_info['en_name']
+    rand = random.Random(f'{book_code}-{style}-{seed}')
+
+    lines = [f'\\id {book_code} EN_SYN Synthetic benchmark text',
+             '\\usfm 3.0',
+             '\\ide UTF-8',
+             f'\\h {book_name}',
+             f'\\toc1 The Book of {book_name}',
+             f'\\toc2 {book_name}',
+             f'\\toc3 {book_code.title()}',
+             f'\\mt {book_name}',
+             ]
+    for chapter_number, num_verses in enumerate(book_info['verses'], start=1):
+        lines.append(f'\\c {chapter_number}')
+        lines.append('\\p')
+        poetry = rand.random() < 0.2
+        for verse_number in range(1, num_verses+1):
+            if verse_number > 1 and verse_number % 8 == 1:
+                lines.append('\\s5')
+                lines.append('\\p')
+            verse_text = make_verse_text(rand, style)
+            if style != 'plain':
+                if verse_number % 5 == 0:
+                    verse_text += f' \\f + \\fr {chapter_number}:{verse_number} \\ft Some ancient copies have \\fqa {rand.choice(WORDS)} {rand.choice(WORDS)}\\fqa* .\\f*'
+                if verse_number % 7 == 0:
+                    verse_text += f' \\x + \\xo {chapter_number}:{verse_number} \\xt {rand.choice(CROSS_REFERENCE_TARGETS)}; {rand.choice(CROSS_REFERENCE_TARGETS)}\\x*'
+            if poetry:
+                lines.append(f'\\q{1 if verse_number % 2 else 2} \\v {verse_number} {verse_text}')
+            else:
+                lines.append(f'\\v {verse_number} {verse_text}')
+    return '\n'.join(lines) + '\n'
+# end of make_book function
+
+
+def make_verse_text(rand:random.Random, style:str) -> str:
+    num_words = rand.randint(8, 30)
+    words = [rand.choice(WORDS) for _ in range(num_words)]
+    if style != 'aligned':
+        return ' '.join(words) + '.'
+    aligned_words = []
+    for word in words:
+        original_word = rand.choice(ORIGINAL_WORDS)
+        aligned_words.append(f'\\zaln-s |x-strong="G{rand.randint(1,5624):05}" x-lemma="{original_word}"'
+                             f' x-morph="Gr,N,,,,,NMS," x-occurrence="1" x-occurrences="1" x-content="{original_word}"\\*'
+                             f'\\w {word}|x-occurrence="1" x-occurrences="1"\\w*'
+                             '\\zaln-e\\*')
+    return ' '.join(aligned_words) + '.'
+# end of make_verse_text function
+
+
+def make_bible(style:str='plain', book_list:Optional[List[str]]=None, seed:int=0) -> List[tuple]:
+    """
+    Returns a list of (filename, usfm_text) 2-tuples,
+        using the usual NN-BBB.usfm filenames.
+    """
+    return [(f"{verses[book_code]['usfm_number']}-{book_code}.usfm", make_book(book_code, style, seed))
+            for book_code in (book_list if book_list else book_codes())]
+# end of make_bible function
@@ -0,0 +1,234 @@
+"""
+Benchmarks for tx_usfm_tools
+
+Times each stage separately over each corpus:
+    parse:   parseUsfm.parseString (after the alignment pre-pass, as the renderer does it)
+    verify:  verifyUSFM.verify_contents_quiet
+    render:  singlehtmlRenderer.SingleHTMLRenderer.render
+    convert: converters.usfm2html_converter.Usfm2HtmlConverter.convert
+
+and writes the results as JSON so that runs can be compared, e.g.,
+    python3 -m tests.benchmarks.usfm_tools_benchmark --output before.json
+    (make changes)
+    python3 -m tests.benchmarks.usfm_tools_benchmark --output after.json --compare before.json
+
+Note: This needs the same environment variables as the tests
+    (see checkEnvVariables in the Makefile) because of AppSettings.
+"""
+from typing import Dict, List, Optional, Tuple, Any
+import os
+import sys
+import json
+import time
+import platform
+import tempfile
+import tracemalloc
+import subprocess
+from argparse import ArgumentParser
+from datetime import datetime
+from shutil import rmtree
+
+from general_tools.file_utils import unzip, write_file, get_files, read_file
+from tx_usfm_tools.parseUsfm import parseString
+from tx_usfm_tools.alignment import strip_alignment
+from tx_usfm_tools.verifyUSFM import verify_contents_quiet
+from tx_usfm_tools.singlehtmlRenderer import SingleHTMLRenderer
+from tx_usfm_tools.books import bookID
+from converters.usfm2html_converter import Usfm2HtmlConverter
+from tests.benchmarks.synthetic_usfm import STYLES, make_bible
+
+
+TESTS_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+REAL_SAMPLES = { # corpus name: zip file (relative to the tests folder)
+    'en_ulb': 'linter_tests/resources/en_ulb.zip',
+    'eight_bible_books': 'converter_tests/resources/eight_bible_books.zip',
+    'kpb_mat': 'converter_tests/resources/kpb_mat_text_udb.zip',
+    'php': 'converter_tests/resources/51-PHP.zip',
+}
+STAGES = ('parse', 'verify', 'render', 'convert')
+
+Corpus = List[Tuple[str,str]] # (filename, usfm_text) 2-tuples
+
+
+def load_real_sample(zip_filepath:str) -> Corpus:
+    unzip_dir = tempfile.mkdtemp(prefix='tX_benchmark_sample_')
+    try:
+        unzip(zip_filepath, unzip_dir)
+        return [(os.path.basename(filepath), read_file(filepath))
+                for filepath in sorted(get_files(directory=unzip_dir, extensions=['.usfm']))]
+    finally:
+        rmtree(unzip_dir)
+# end of load_real_sample function
+
+
+def load_corpora(corpus_names:List[str], book_list:Optional[List[str]]) -> Dict[str,Corpus]:
+    corpora = {}
+    for corpus_name in corpus_names:
+        if corpus_name.startswith('synthetic-'):
+            corpora[corpus_name] = make_bible(corpus_name[len('synthetic-'):], book_list)
+        else:
+            corpora[corpus_name] = load_real_sample(os.path.join(TESTS_DIR, REAL_SAMPLES[corpus_name]))
+    return corpora
+# end of load_corpora function
+
+
+def run_parse(corpus:Corpus) -> int:
+    num_tokens = 0
+    for _filename, usfm in corpus:
+        num_tokens += len(parseString(strip_alignment(usfm)[0]))
+    return num_tokens
+
+
+def run_verify(corpus:Corpus) -> int:
+    num_errors = 0
+    for filename, usfm in corpus:
+        book_code = bookID(usfm) or filename[3:6]
+        errors, _book_code = verify_contents_quiet(usfm, filename, book_code, 'en')
+        num_errors += len(errors)
+    return num_errors
+
+
+def run_render(corpus:Corpus) -> int:
+    num_warnings = 0
+    work_dir = tempfile.mkdtemp(prefix='tX_benchmark_render_')
+    try:
+        for filename, usfm in corpus: # One book at a time like the converter does
+            book_dir = os.path.join(work_dir, os.path.splitext(filename)[0])
+            write_file(os.path.join(book_dir, filename), usfm)
+            warning_list = SingleHTMLRenderer(book_dir, os.path.join(book_dir, 'out.html')).render()
+            num_warnings += len(warning_list)
+    finally:
+        rmtree(work_dir)
+    return num_warnings
+
+
+def run_convert(corpus:Corpus) -> int:
+    work_dir = tempfile.mkdtemp(prefix='tX_benchmark_convert_')
+    try:
+        for filename, usfm in corpus:
+            write_file(os.path.join(work_dir, filename), usfm)
+        converter = Usfm2HtmlConverter('Bible', work_dir)
+        try:
+            converter.files_dir = work_dir # As done by Converter.run()
+            converter.convert()
+            return len(converter.log.logs['warning'])
+        finally:
+            converter.close()
+    finally:
+        rmtree(work_dir)
+# end of run_convert function
+
+
+STAGE_FUNCTIONS = {'parse':run_parse, 'verify':run_verify, 'render':run_render, 'convert':run_convert}
+
+
+def time_stage(stage:str, corpus:Corpus, repeat:int, measure_memory:bool) -> Dict[str,Any]:
+    """
+    Returns the best of the repeated timings,
+        plus the peak traced memory from one extra (slower) run if requested.
+    """
+    stage_function = STAGE_FUNCTIONS[stage]
+    timings = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        count = stage_function(corpus)
+        timings.append(time.perf_counter() - start_time)
+    result = {'seconds': min(timings),
+              'all_seconds': timings,
+              'count': count, # tokens for parse, errors for verify, warnings for render/convert
+              }
+    if measure_memory:
+        tracemalloc.start()
+        try:
+            stage_function(corpus)
+            result['peak_memory_bytes'] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return result
+# end of time_stage function
+
+
+def get_git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       cwd=TESTS_DIR, stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(corpus_names:List[str], stages:List[str], book_list:Optional[List[str]]=None,
+                   repeat:int=1, measure_memory:bool=True) -> Dict[str,Any]:
+    corpora = load_corpora(corpus_names, book_list)
+    results = []
+    for corpus_name, corpus in corpora.items():
+        num_bytes = sum(len(usfm.encode('utf-8')) for _filename, usfm in corpus)
+        num_tokens = None
+        for stage in stages:
+            print(f"  Running {stage} on {corpus_name} ({len(corpus)} books, {num_bytes:,} bytes)…", file=sys.stderr)
+            result = time_stage(stage, corpus, repeat, measure_memory)
+            if stage == 'parse':
+                num_tokens = result['count']
+            result.update({'corpus': corpus_name, 'stage': stage,
+                           'books': len(corpus), 'bytes': num_bytes,
+                           'bytes_per_second': num_bytes / result['seconds'] if result['seconds'] else None,
+                           })
+            if num_tokens is not None:
+                result['tokens'] = num_tokens
+                result['tokens_per_second'] = num_tokens / result['seconds'] if result['seconds'] else None
+            results.append(result)
+    return {'created': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+            'git_commit': get_git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'repeat': repeat,
+            'results': results,
+            }
+# end of run_benchmarks function
+
+
+def compare_results(old:Dict[str,Any], new:Dict[str,Any]) -> List[str]:
+    """
+    Returns a list of printable lines, one for each (corpus, stage) in both runs.
+    """
+    old_results = {(result['corpus'],result['stage']):result for result in old['results']}
+    lines = []
+    for result in new['results']:
+        key = (result['corpus'], result['stage'])
+        if key not in old_results: continue
+        old_seconds, new_seconds = old_results[key]['seconds'], result['seconds']
+        line = f"{key[0]:>20} {key[1]:>8}: {old_seconds:9.3f}s -> {new_seconds:9.3f}s" \
+               f" ({old_seconds/new_seconds if new_seconds else float('inf'):.2f}x faster)"
+        if 'peak_memory_bytes' in result and 'peak_memory_bytes' in old_results[key]:
+            line += f", peak memory {old_results[key]['peak_memory_bytes']:,} -> {result['peak_memory_bytes']:,} bytes"
+        lines.append(line)
+    return lines
+# end of compare_results function
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Benchmark the tx_usfm_tools parser, verifier, renderer and converter")
+    parser.add_argument('--corpus', nargs='+',
+                        choices=[f'synthetic-{style}' for style in STYLES] + list(REAL_SAMPLES),
+                        default=[f'synthetic-{style}' for style in STYLES] + ['en_ulb'],
+                        help="Which corpora to use (default is all synthetic ones plus en_ulb)")
+    parser.add_argument('--books', nargs='+', help="Only generate these synthetic books, e.g., GEN PSA JUD")
+    parser.add_argument('--stage', nargs='+', choices=STAGES, default=list(STAGES))
+    parser.add_argument('--repeat', type=int, default=1, help="Number of timed runs (best is reported)")
+    parser.add_argument('--no-memory', action='store_true', help="Skip the (slow) traced peak memory runs")
+    parser.add_argument('--output', help="JSON filepath to write the results to (default is stdout)")
+    parser.add_argument('--compare', help="JSON filepath of an earlier run to compare against")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.corpus, args.stage, args.books, args.repeat, not args.no_memory)
+    if args.output:
+        write_file(args.output, results, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+    if args.compare:
+        for line in compare_results(json.loads(read_file(args.compare)), results):
+            print(line, file=sys.stderr)
+# end of main function
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+import unittest
+
+from bs4 import BeautifulSoup
+
+from converters.html_template import HtmlTemplate, extract_body_html
+
+
+# Each of these should come out just as BeautifulSoup would write it
+TEST_HTML = (
+    '<html><head><title>t</title></head><body><h1 class="bookname">Jude</h1>\n<p class=" a  b">One &amp; two &lt; &#147;three&#x2014;&hellip;&nbsp;&foo;</p></body></html>',
+    '<body><p id=x data-q=\'a"b\' z="a\'b&quot;c" checked>attributes</p></body>',
+    '<body><div><p>unclosed<span>more</div>  \n  <br>after</br><br/><br>x<img src=a></img>  </body> trailing',
+    '<body><![CDATA[x]]><?php x?><!DOCTYPE html><!--  --><!-- note --><pre>  \n </pre>   <script>if (a<b && c) x;</script></body>',
+    '<body><p>a</q>b</p></body>',
+    '<p>before</p><body a=1>in<body>nested</body>out</body>after',
+    '<body><p>unterminated <b>bold',
+    '<body/>',
+)
+
+
+def soup_body_html(html):
+    """
+    Returns the body contents the way that the converters used to get them.
+    """
+    converted_soup = BeautifulSoup(html, 'html.parser')
+    content_div = BeautifulSoup('<div id="content"></div>', 'html.parser').div
+    content_div.append(converted_soup.body)
+    content_div.body.unwrap()
+    return content_div.decode_contents()
+
+
+class HtmlTemplateTest(unittest.TestCase):
+
+    def test_extract_body_html(self):
+        for html in TEST_HTML:
+            self.assertEqual(extract_body_html(html), soup_body_html(html), html)
+        self.assertIsNone(extract_body_html('<p>No body</p>'))
+
+    def test_deep_nesting(self):
+        html = '<body>' + '<span>' * 2000 + 'deep' + '</span>' * 2000 + '</body>'
+        self.assertEqual(extract_body_html(html), html[6:-7])
+
+    def test_fill(self):
+        template = HtmlTemplate()
+        self.assertEqual(template.fill('Notes & <More>', '<p>Text</p>'),
+                         '<!DOCTYPE html>\n\n<html lang="en">\n<head>\n<meta charset="utf-8"/>\n'
+                         '<title>Notes &amp; &lt;More&gt;</title>\n</head>\n<body>\n'
+                         '<div id="content"><p>Text</p></div>\n</body>\n</html>\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,14 +1,28 @@
 import os
+import gzip
+import json
 import tempfile
 import unittest
 import shutil
 from contextlib import closing
 
-from converters.usfm2html_converter import Usfm2HtmlConverter
-from general_tools.file_utils import remove_tree, unzip, remove_file
+from converters.converter import brotli
+from unittest import mock
+from converters.usfm2html_converter import Usfm2HtmlConverter, VERSES_FOLDER, convert_usfm_file
+from general_tools.file_utils import remove_tree, unzip, remove_file, get_files
+from tests.benchmarks.synthetic_usfm import make_book
 from app_settings.app_settings import AppSettings
 
 
+def convert_usfm_file_except_jude(filename, *args):
+    """
+    Fails on Jude (as a module function so that it can be run in a process pool).
+    """
+    if filename.endswith('JUD.usfm'):
+        raise ValueError('Bad Jude')
+    return convert_usfm_file(filename, *args)
+
+
 class TestUsfmHtmlConverter(unittest.TestCase):
 
     resources_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'resources')
@@ -211,6 +225,152 @@ class TestUsfmHtmlConverter(unittest.TestCase):
         print("results6", results)
         self.assertTrue(results['success'])
 
+    @mock.patch('general_tools.process_utils.get_available_cpu_count', return_value=4)
+    def test_book_workers(self, _mock_cpu_count):
+        """
+        Converting the books in parallel gives the same files and the same log
+        """
+        with closing(Usfm2HtmlConverter('Bible', self.temp_dir, options={'book_workers':True})) as tx:
+            self.assertEqual(tx.book_workers, 4) # One per available CPU
+        zip_file = os.path.join(self.resources_dir, 'eight_bible_books.zip')
+        self.in_dir = tempfile.mkdtemp(prefix='udb_in_', dir=self.temp_dir)
+        unzip(zip_file, self.in_dir)
+        outputs = []
+        for options in ({}, {'book_workers':3}):
+            with closing(Usfm2HtmlConverter('Bible', self.in_dir, options=options)) as tx:
+                self.assertEqual(tx.book_workers, options.get('book_workers', 1)) # Off by default
+                tx.files_dir = self.in_dir # As done by Converter.run()
+                self.assertTrue(tx.convert())
+                pages = {}
+                for filepath in sorted(get_files(directory=tx.output_dir)):
+                    with open(filepath, 'rt') as output_file:
+                        pages[os.path.relpath(filepath, tx.output_dir)] = output_file.read()
+                outputs.append((pages, tx.log.logs))
+        self.assertIn('67-REV.html', outputs[0][0])
+        self.assertIn(os.path.join(VERSES_FOLDER, '67-REV-022.json'), outputs[0][0])
+        self.assertEqual(outputs[1], outputs[0])
+
+    @mock.patch('general_tools.process_utils.get_available_cpu_count', return_value=4)
+    def test_chapter_workers(self, _mock_cpu_count):
+        """
+        The chapters of a single book are only rendered in parallel if asked to
+        """
+        self.in_dir = tempfile.mkdtemp(prefix='udb_in_', dir=self.temp_dir)
+        with open(os.path.join(self.in_dir, '41-MAT.usfm'), 'wt') as usfm_file:
+            usfm_file.write(make_book('MAT', 'notes'))
+        outputs = []
+        for options, chapter_workers in (({}, 1), ({'chapter_workers':3}, 3), ({'chapter_workers':True}, 4)):
+            with mock.patch('converters.usfm2html_converter.convert_usfm_file', wraps=convert_usfm_file) as mock_convert, \
+                    closing(Usfm2HtmlConverter('Bible', self.in_dir, options=options)) as tx:
+                tx.files_dir = self.in_dir # As done by Converter.run()
+                self.assertTrue(tx.convert())
+                self.assertEqual(mock_convert.call_args[0][3], chapter_workers)
+                with open(os.path.join(tx.output_dir, '41-MAT.html'), 'rt') as html_file:
+                    outputs.append(html_file.read())
+        self.assertEqual(outputs[1], outputs[0])
+        self.assertEqual(outputs[2], outputs[0])
+
+    def test_verses_json(self):
+        """
+        The verse text of each chapter is also written as JSON
+        """
+        zip_file = os.path.join(self.resources_dir, 'eight_bible_books.zip')
+        self.in_dir = tempfile.mkdtemp(prefix='udb_in_', dir=self.temp_dir)
+        unzip(zip_file, self.in_dir)
+        with closing(Usfm2HtmlConverter('Bible', self.in_dir, book_workers=1)) as tx:
+            tx.files_dir = self.in_dir # As done by Converter.run()
+            self.assertTrue(tx.convert())
+            with open(os.path.join(tx.output_dir, VERSES_FOLDER, '67-REV-022.json'), 'rt') as json_file:
+                chapter = json.load(json_file)
+        self.assertEqual((chapter['book'], chapter['chapter']), ('REV', '22'))
+        self.assertEqual(list(chapter['verses'])[:3], ['1', '2', '3'])
+        self.assertTrue(chapter['verses']['1'].startswith('Then the angel showed me the river'))
+        self.assertTrue(chapter['verses']['1'].endswith('where God and the Lamb were sitting.'))
+
+    def test_chapter_pages(self):
+        """
+        The page_kb option splits each book into chapter pages with an index page for the book
+        """
+        zip_file = os.path.join(self.resources_dir, 'eight_bible_books.zip')
+        self.in_dir = tempfile.mkdtemp(prefix='udb_in_', dir=self.temp_dir)
+        unzip(zip_file, self.in_dir)
+        with closing(Usfm2HtmlConverter('Bible', self.in_dir, options={'page_kb':0}, book_workers=1)) as tx:
+            tx.files_dir = self.in_dir # As done by Converter.run()
+            self.assertTrue(tx.convert())
+            filenames = os.listdir(tx.output_dir)
+            self.assertEqual({name for name in filenames if name.startswith('67-REV')},
+                             {'67-REV.html'} | {f'67-REV-{c:03}.html' for c in range(1, 23)})
+            with open(os.path.join(tx.output_dir, '67-REV.html'), 'rt') as html_file:
+                index_html = html_file.read()
+            self.assertIn('<a href="67-REV-022.html#066-ch-022">', index_html)
+            self.assertNotIn('class="v-num"', index_html)
+            with open(os.path.join(tx.output_dir, '67-REV-003.html'), 'rt') as html_file:
+                chapter_html = html_file.read()
+            self.assertIn('<div id="content">', chapter_html)
+            self.assertIn('id="066-ch-003"', chapter_html)
+            self.assertNotIn('id="066-ch-004"', chapter_html)
+
+    def test_precompress(self):
+        """
+        The precompress option writes compressed copies of the HTML files
+        """
+        zip_file = os.path.join(self.resources_dir, 'eight_bible_books.zip')
+        self.in_dir = tempfile.mkdtemp(prefix='udb_in_', dir=self.temp_dir)
+        unzip(zip_file, self.in_dir)
+        with closing(Usfm2HtmlConverter('Bible', self.in_dir, options={'precompress':['gzip', 'br']})) as tx:
+            self.assertTrue(tx.run()['success'])
+            filenames = os.listdir(tx.output_dir)
+            html_filenames = [filename for filename in filenames if filename.endswith('.html')]
+            self.assertIn('67-REV.html', html_filenames)
+            for html_filename in html_filenames:
+                self.assertIn(html_filename + '.gz', filenames)
+                self.assertEqual(html_filename + '.br' in filenames, brotli is not None)
+            with open(os.path.join(tx.output_dir, '67-REV.html'), 'rb') as html_file, \
+                    gzip.open(os.path.join(tx.output_dir, '67-REV.html.gz'), 'rb') as gz_file:
+                self.assertEqual(gz_file.read(), html_file.read())
+            self.assertNotIn(os.path.join(VERSES_FOLDER, '67-REV-001.json.gz'),
+                             get_files(directory=tx.output_dir, relative_paths=True))
+
+    @mock.patch('general_tools.process_utils.get_available_cpu_count', return_value=4)
+    def test_unreadable_book(self, _mock_cpu_count):
+        """
+        A book that can't be read (e.g., not UTF-8) fails without stopping the others
+        """
+        self.in_dir = tempfile.mkdtemp(prefix='udb_in_', dir=self.temp_dir)
+        with open(os.path.join(self.in_dir, '41-MAT.usfm'), 'wt', encoding='latin-1') as usfm_file:
+            usfm_file.write('\\id MAT\n\\h Mathieu\n\\c 1\n\\p\n\\v 1 Généalogie de Jésus-Christ\n')
+        with open(os.path.join(self.in_dir, '66-JUD.usfm'), 'wt', encoding='utf-8') as usfm_file:
+            usfm_file.write('\\id JUD\n\\h Jude\n\\c 1\n\\p\n\\v 1 Jude, serviteur de Jésus-Christ\n')
+        for book_workers in (1, 2):
+            with closing(Usfm2HtmlConverter('Bible', self.in_dir, book_workers=book_workers)) as tx:
+                tx.files_dir = self.in_dir # As done by Converter.run()
+                self.assertTrue(tx.convert())
+                mat_warnings = [msg for msg in tx.log.logs['warning'] if 'MAT' in msg]
+                self.assertEqual(len(mat_warnings), 1)
+                self.assertTrue(mat_warnings[0].startswith('Unable to read 41-MAT.usfm: '))
+                self.assertIn('Finished processing 1 Bible USFM files.', tx.log.logs['info'])
+                with open(os.path.join(tx.output_dir, '66-JUD.html'), 'rt') as html_file:
+                    self.assertIn('serviteur de Jésus-Christ', html_file.read())
+                self.assertTrue(os.path.isfile(os.path.join(tx.output_dir, '41-MAT.html')))
+
+    @mock.patch('general_tools.process_utils.get_available_cpu_count', return_value=4)
+    def test_book_exception(self, _mock_cpu_count):
+        """
+        An unexpected error in one book (even in a worker process) doesn't lose the others
+        """
+        zip_file = os.path.join(self.resources_dir, 'eight_bible_books.zip')
+        self.in_dir = tempfile.mkdtemp(prefix='udb_in_', dir=self.temp_dir)
+        unzip(zip_file, self.in_dir)
+        for book_workers in (1, 3):
+            with mock.patch('converters.usfm2html_converter.convert_usfm_file', convert_usfm_file_except_jude), \
+                    closing(Usfm2HtmlConverter('Bible', self.in_dir, book_workers=book_workers)) as tx:
+                tx.files_dir = self.in_dir # As done by Converter.run()
+                self.assertTrue(tx.convert())
+                self.assertIn('USFM parsing or conversion error for 66-JUD.usfm: Bad Jude',
+                              tx.log.logs['warning'])
+                self.assertIn('Finished processing 7 Bible USFM files.', tx.log.logs['info'])
+                self.assertIn('67-REV.html', os.listdir(tx.output_dir))
+
     def test_bad_source(self):
         """This tests giving a bad source to the converter"""
         with closing(Usfm2HtmlConverter('bad_subject', 'bad_resource')) as tx:
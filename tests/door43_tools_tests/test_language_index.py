@@ -0,0 +1,88 @@
+import os
+import json
+import tempfile
+import unittest
+from shutil import rmtree
+
+import mock
+
+from door43_tools import language_index
+from door43_tools.language_index import LanguageIndex, get_language_index, refresh_language_cache, \
+                                        load_languages, BUNDLED_LANGNAMES_FILEPATH
+from door43_tools.td_language import TdLanguage
+
+
+LANGUAGES = [
+    {'gw': False, 'ld': 'ltr', 'ang': 'Afar', 'lc': 'aa', 'ln': 'Afaraf', 'lr': 'Africa', 'pk': 6},
+    {'gw': True, 'ld': 'ltr', 'ang': 'Serbian', 'lc': 'sr-Latn', 'ln': 'srpski', 'lr': 'Europe', 'pk': 2},
+]
+
+
+class LanguageIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        """Runs before each test."""
+        self.temp_dir = tempfile.mkdtemp(prefix='tX_test_language_index_')
+        self.cache_filepath = os.path.join(self.temp_dir, 'langnames.json')
+        self.env_patcher = mock.patch.dict(os.environ, {'LANGNAMES_CACHE_FILEPATH': self.cache_filepath})
+        self.env_patcher.start()
+        language_index._languageIndex = None
+
+    def tearDown(self):
+        """Runs after each test."""
+        self.env_patcher.stop()
+        language_index._languageIndex = None
+        TdLanguage.language_list = {}
+        rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_bundled_snapshot(self):
+        index = get_language_index()
+        self.assertEqual(index.source, BUNDLED_LANGNAMES_FILEPATH)
+        self.assertGreater(len(index), 7000)
+        self.assertIs(get_language_index(), index)
+        self.assertEqual(index.get_language('en')['ln'], 'English')
+        self.assertEqual(index.validate_language_code('SR-latn'), 'sr-latn')
+        self.assertEqual(index.validate_language_code('-x-antambahoaka'), '-x-antambahoaka')
+        self.assertIsNone(index.validate_language_code('zzz'))
+        self.assertIsNone(index.validate_language_code('english'))
+        self.assertIsNone(index.get_language('en-x-demo'))
+        self.assertEqual(index.get_base_language('en-x-demo')['lc'], 'en')
+        self.assertEqual(index.get_base_language('es-419')['lc'], 'es-419')
+        self.assertIsNone(index.get_base_language('zzz-x-demo'))
+        self.assertIsNone(index.get_base_language('-x-demo'))
+
+    def test_code_format(self):
+        for language_code in ('ab', 'abc', 'pt-br', 'es-419', 'sr-Latn', 'abc-x-abcdefg', '-x-abcdefg'):
+            self.assertTrue(LanguageIndex.is_valid_format(language_code), language_code)
+        for language_code in ('a', 'abcd', 'en-', 'en-abcde', 'en-x-', 'x-abc', 'en us'):
+            self.assertFalse(LanguageIndex.is_valid_format(language_code), language_code)
+
+    def test_cached_copy(self):
+        with open(self.cache_filepath, 'wt') as cache_file:
+            json.dump(LANGUAGES, cache_file)
+        index = get_language_index()
+        self.assertEqual(len(index), 2)
+        self.assertEqual(index.get_language('sr-latn')['lc'], 'sr-Latn')
+        self.assertIsNone(index.get_language('en'))
+        self.assertEqual(TdLanguage.get_language('aa').ln, 'Afaraf')
+        self.assertEqual(sorted(TdLanguage.get_languages()), ['aa', 'sr-Latn'])
+
+    def test_reloads_after_ttl(self):
+        with mock.patch.dict(os.environ, {'LANGNAMES_TTL_SECONDS': '0'}):
+            self.assertGreater(len(get_language_index()), 7000)
+            with open(self.cache_filepath, 'wt') as cache_file:
+                json.dump(LANGUAGES, cache_file)
+            self.assertEqual(len(get_language_index()), 2)
+
+    @mock.patch('general_tools.url_utils.get_url')
+    def test_refresh(self, mock_get_url):
+        mock_get_url.return_value = json.dumps(LANGUAGES)
+        self.assertTrue(refresh_language_cache())
+        self.assertEqual(load_languages(self.cache_filepath), LANGUAGES)
+        mock_get_url.return_value = '{"not": "a list"}'
+        self.assertFalse(refresh_language_cache())
+        self.assertEqual(load_languages(self.cache_filepath), LANGUAGES)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,27 @@
+import os
+import unittest
+from unittest import mock
+
+from general_tools.process_utils import get_available_cpu_count, get_worker_count
+
+
+class ProcessUtilsTests(unittest.TestCase):
+
+    def test_available_cpu_count(self):
+        self.assertGreaterEqual(get_available_cpu_count(), 1)
+        self.assertLessEqual(get_available_cpu_count(), os.cpu_count())
+
+    @mock.patch('general_tools.process_utils.get_available_cpu_count', return_value=4)
+    def test_worker_count(self, _mock_cpu_count):
+        self.assertEqual(get_worker_count(None), 1)
+        self.assertEqual(get_worker_count(0), 1)
+        self.assertEqual(get_worker_count(False), 1)
+        self.assertEqual(get_worker_count(3), 3)
+        self.assertEqual(get_worker_count('2'), 2)
+        self.assertEqual(get_worker_count(16), 4)
+        self.assertEqual(get_worker_count(True), 4)
+        self.assertEqual(get_worker_count('all'), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
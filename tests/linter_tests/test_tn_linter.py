@@ -8,6 +8,7 @@ from general_tools import file_utils
 from general_tools.file_utils import add_contents_to_zip, read_file, write_file, unzip
 from tests.linter_tests.linter_unittest import LinterTestCase
 from linters.tn_linter import TnLinter, TnTsvLinter
+from tests.tx_usfm_tools_tests.test_word_index import UGNT_3JN, UHB_RUT
 
 
 class TestTnLinter(LinterTestCase):
@@ -182,6 +183,33 @@ class TestTnTsvLinter(LinterTestCase):
         """Runs after each test."""
         shutil.rmtree(self.temp_dir, ignore_errors=True)
 
+    def test_original_language_quotes(self):
+        usfm_dir = os.path.join(self.temp_dir, 'original')
+        write_file(os.path.join(usfm_dir, '65-3JN.usfm'), UGNT_3JN)
+        write_file(os.path.join(usfm_dir, '08-RUT.usfm'), UHB_RUT)
+        source_dir = os.path.join(self.temp_dir, 'en_tn')
+        write_file(os.path.join(source_dir, 'en_tn_65-3JN.tsv'),
+                   f'{TnTsvLinter.FULL_TSV_HEADER}\n'
+                   '3JN\tfront\tintro\tabcd\t\t\t0\t\t# Introduction\n'
+                   '3JN\t1\t1\tr2lu\t\tὁ πρεσβύτερος\t1\tThe elder\tJohn\n'
+                   '3JN\t1\t2\tt4ct\t\tπερὶ πάντων\t2\tabove all\tNote\n'
+                   '3JN\t1\t2\tu8fj\t\tσου … ψυχή\t1\tyour soul\tNote\n'
+                   '3JN\t1\t2\tv3de\t\tΓαΐῳ\t1\tGaius\tNote\n'
+                   '3JN\t1\t3\tw2vc\t\tἐχάρην\t1\tI rejoiced\tNote\n')
+        write_file(os.path.join(source_dir, 'en_tn_08-RUT.tsv'),
+                   f'{TnTsvLinter.TSV_HEADER}\n'
+                   'RUT\t1\t2\tאֱֽלִימֶ֡לֶךְ־עַל\tElimelech\n'
+                   'RUT\t1\t2\tשְׁפֹ֣ט\tto judge\n')
+        with mock.patch.dict(os.environ, {'ORIGINAL_LANGUAGE_INDEX_CACHE_DIR': os.path.join(self.temp_dir, 'cache')}):
+            linter = TnTsvLinter(repo_subject='TSV_Translation_Notes', source_dir=source_dir, original_language_dir=usfm_dir)
+            linter.run()
+        self.assertEqual([warning for warning in linter.log.warnings if 'original language' in warning],
+                         ["RUT 1:2 Unable to find 'שְׁפֹ֣ט' in original language verse",
+                          "3JN 1:2 Only found 1 of 2 occurrences of 'περὶ πάντων' in original language verse",
+                          "3JN 1:2 Unable to find 'Γαΐῳ' in original language verse",
+                          "3JN 1:3 Unable to find original language verse for 'ἐχάρην'"])
+        self.assertTrue(os.listdir(os.path.join(self.temp_dir, 'cache')))
+
     # Removed coz of extra parameters Nov 2019 RJH
     # def test_lint(self):
     #     # given
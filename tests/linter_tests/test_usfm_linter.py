@@ -3,9 +3,11 @@ import tempfile
 import shutil
 import time
 import unittest
+from unittest import mock
 from tests.linter_tests.linter_unittest import LinterTestCase
 from general_tools import file_utils
 from linters.usfm_linter import UsfmLinter
+from tx_usfm_tools.structure_index import StructureIndex, STRUCTURE_INDEX_FILENAME
 from general_tools.file_utils import write_file, read_file, unzip
 from resource_container.ResourceContainer import RC
 from app_settings.app_settings import AppSettings
@@ -33,6 +35,17 @@ class TestUsfmLinter(LinterTestCase):
         linter = self.run_linter(out_dir)
         self.verify_results_counts(expected_warnings, linter)
 
+    def test_PhpLanguageCodes(self):
+        for language_code, expected_warnings in (('en-x-demo', []), ('-x-demo', []),
+                                        ('zzz', ['Unknown language code: zzz']),
+                                        ('zzz-x-demo', ['Unknown language code: zzz-x-demo'])):
+            out_dir = self.copy_resource(self.php_repo_path)
+            manifest_path = os.path.join(out_dir, 'manifest.json')
+            write_file(manifest_path, read_file(manifest_path).replace('"id": "es"', f'"id": "{language_code}"'))
+            linter = self.run_linter(out_dir)
+            self.assertEqual(linter.log.warnings, expected_warnings)
+            shutil.rmtree(out_dir)
+
     def test_PhpValidWithFootnoteAndRefsTags(self):
         out_dir = self.copy_resource(self.php_repo_path)
         replace = read_file(os.path.join(self.resources_dir, 'footnote_n_refs_example.txt'))
@@ -493,6 +506,58 @@ class TestUsfmLinter(LinterTestCase):
         linter.parse_usfm_text(sub_path, file_name, book_text, book_full_name, book_code)
         self.verify_results_counts(expected_warnings, linter)
 
+    def test_PhpShortMarkerLines(self):
+        out_dir = self.copy_resource(self.php_repo_path)
+        self.replace_tag(out_dir, self.php_file_name, 'h', '\\h Fi\n')
+        self.replace_verse(out_dir, self.php_file_name, chapter=2, start_vs=1, end_vs=2,
+                           replace='\\s1\n\\v 1 Por lo tanto, si hay algún ánimo en Cristo.\n')
+        linter = self.run_linter(out_dir)
+        self.assertEqual([warning for warning in linter.log.warnings if ' line ' in warning],
+                         ["PHP 0:0 '\\h Fi' line seems too short", "PHP 2:0 '\\s1' line has no content"])
+
+    @mock.patch('general_tools.process_utils.get_available_cpu_count', return_value=4)
+    def test_parallel_matches_sequential(self, _mock_cpu_count):
+        check_files = ['50-EPH.usfm','51-PHP.usfm','52-COL.usfm','57-TIT.usfm','65-3JN.usfm']
+        out_dir = self.unzip_resource_only('en_ulb.zip', check_files)
+        self.replace_chapter(out_dir, '51-PHP.usfm', start_ch=3, end_ch=5, replace='')  # remove c3-4
+        self.append_text(out_dir, '57-TIT.usfm', '\\v 16\n\\s1\n')
+        shutil.copy(os.path.join(out_dir, '52-COL.usfm'), os.path.join(out_dir, '53-COL.usfm'))
+        linter = UsfmLinter(repo_subject='Bible', source_dir=out_dir)
+        self.assertEqual(linter.book_workers, 1) # Off by default
+        linter.run()
+        parallel_linter = UsfmLinter(repo_subject='Bible', source_dir=out_dir, book_workers=3)
+        self.assertEqual(parallel_linter.book_workers, 3)
+        parallel_linter.run()
+        self.assertTrue(linter.log.warnings)
+        self.assertIn(f"File '.{os.path.sep}53-COL.usfm' has same code 'COL' as previous file", linter.log.warnings)
+        self.assertEqual(parallel_linter.log.warnings, linter.log.warnings)
+        self.assertEqual(parallel_linter.found_books, ['EPH','PHP','COL','COL','TIT','3JN'])
+
+    def test_streaming_matches_whole_books(self):
+        check_files = ['51-PHP.usfm','57-TIT.usfm','65-3JN.usfm']
+        out_dir = self.unzip_resource_only('en_ulb.zip', check_files)
+        self.replace_chapter(out_dir, '51-PHP.usfm', start_ch=3, end_ch=5, replace='')  # remove c3-4
+        self.replace_tag(out_dir, '51-PHP.usfm', 'h', '\\h Ph\n')
+        self.append_text(out_dir, '57-TIT.usfm', '\\v 16\n\\s1\n')
+        self.append_text(out_dir, '65-3JN.usfm', '\\x - \\xo 1:15 \\xt 2 John 1:14\\x*\n')
+        shutil.copy(os.path.join(out_dir, '65-3JN.usfm'), os.path.join(out_dir, '66-3JN.usfm'))
+        write_file(os.path.join(out_dir, '67-JUD.usfm'), '\n  \n')
+        linter = UsfmLinter(repo_subject='Bible', source_dir=out_dir, book_workers=1)
+        linter.run()
+        streaming_linter = UsfmLinter(repo_subject='Bible', source_dir=out_dir, streaming=True)
+        streaming_linter.run()
+        self.assertIn("PHP 0:0 '\\h Ph' line seems too short", linter.log.warnings)
+        self.assertIn("USFM book '67-JUD.usfm' seems empty", linter.log.warnings)
+        self.assertIn("3JN 1:15 - Cross-reference to nonexistent verse: '2 John 1:14'", linter.log.warnings)
+        self.assertEqual(sorted(streaming_linter.log.warnings), sorted(linter.log.warnings))
+        self.assertEqual(streaming_linter.found_books, linter.found_books)
+        self.assertEqual([book.toDict() for book in streaming_linter.structure_index],
+                         [book.toDict() for book in linter.structure_index])
+        structure_index = StructureIndex.load(os.path.join(out_dir, STRUCTURE_INDEX_FILENAME))
+        self.assertEqual([book.filename for book in structure_index], ['51-PHP.usfm','57-TIT.usfm','65-3JN.usfm'])
+        self.assertEqual(sorted(structure_index.getBook('PHP').verseRanges), [1, 2])
+        self.assertEqual(structure_index.getBook('TIT').verseRanges[3], [[1, 16]])
+
     @unittest.skip("Skip test_EnUlbValid test for time reasons - leave for standalone testing")
     def test_EnUlbValid(self):
         out_dir = self.unzip_resource('en_ulb.zip')
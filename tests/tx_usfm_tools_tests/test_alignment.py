@@ -0,0 +1,76 @@
+import os
+import tempfile
+import unittest
+
+from general_tools.file_utils import write_file, read_file, remove_tree
+from tx_usfm_tools.alignment import strip_alignment, has_alignment_markup
+from tx_usfm_tools.singlehtmlRenderer import SingleHTMLRenderer
+from tx_usfm_tools import verifyUSFM
+
+
+ALIGNED_VERSE = '\\v 1 \\zaln-s |x-strong="G39720" x-lemma="Παῦλος" x-morph="Gr,N,,,,,NMS," x-occurrence="1" x-occurrences="1" x-content="Παῦλος"\\*\\w Paul|x-occurrence="1" x-occurrences="1"\\w*\\zaln-e\\*,\n' \
+                '\\zaln-s |x-strong="G14010" x-lemma="δοῦλος" x-occurrence="1" x-occurrences="1" x-content="δοῦλος"\\*\\w a|x-occurrence="1" x-occurrences="1"\\w*\n' \
+                '\\w servant|x-occurrence="1" x-occurrences="1"\\w*\\zaln-e\\* of God \\f + \\ft a \\+w note|x-occurrence="1"\\+w*\\f*\n'
+PLAIN_VERSE = '\\v 1 Paul,\na\nservant of God \\f + \\ft a note\\f*\n'
+HEADER = '\\id TIT EN_ULT\n\\ide UTF-8\n\\h Titus\n\\toc1 Titus\n\\toc2 Titus\n\\toc3 Tit\n\\mt Titus\n\n\\c 1\n\\p\n'
+
+
+class TestAlignment(unittest.TestCase):
+
+    def setUp(self):
+        """Runs before each test."""
+        self.temp_dir = tempfile.mkdtemp(prefix='tX_test_alignment_')
+
+    def tearDown(self):
+        """Runs after each test."""
+        remove_tree(self.temp_dir)
+
+    def test_unaligned_unchanged(self):
+        usfm = HEADER + PLAIN_VERSE
+        self.assertFalse(has_alignment_markup(usfm))
+        stripped, offset_map = strip_alignment(usfm)
+        self.assertIs(stripped, usfm)
+        self.assertTrue(offset_map.is_identity())
+
+    def test_strip_alignment(self):
+        stripped, _offset_map = strip_alignment(HEADER + ALIGNED_VERSE)
+        self.assertEqual(stripped, HEADER + PLAIN_VERSE)
+        self.assertLess(len(stripped) * 3, len(HEADER + ALIGNED_VERSE))
+
+    def test_offset_map(self):
+        aligned = HEADER + ALIGNED_VERSE
+        stripped, offset_map = strip_alignment(aligned)
+        self.assertFalse(offset_map.is_identity())
+        for ix, char in enumerate(stripped):
+            self.assertEqual(aligned[offset_map.original_offset(ix)], char)
+        servant_ix = stripped.index('servant')
+        self.assertEqual(offset_map.original_offset(servant_ix), aligned.index('servant'))
+
+    def test_rendered_html_matches_unaligned(self):
+        aligned_html = self.render('aligned', HEADER + ALIGNED_VERSE)
+        plain_html = self.render('plain', HEADER + PLAIN_VERSE)
+        self.assertEqual(aligned_html, plain_html)
+        self.assertNotIn('x-occurrence', aligned_html)
+
+    def test_verify_ignores_alignment(self):
+        aligned_errors, aligned_id = verifyUSFM.verify_contents_quiet(HEADER + ALIGNED_VERSE, '57-TIT', 'TIT', 'en')
+        plain_errors, plain_id = verifyUSFM.verify_contents_quiet(HEADER + PLAIN_VERSE, '57-TIT', 'TIT', 'en')
+        self.assertEqual(aligned_id, plain_id)
+        self.assertEqual(aligned_errors, plain_errors)
+        for error in aligned_errors:
+            self.assertNotIn('Unknown USFM token', error)
+
+    #
+    # helpers
+    #
+
+    def render(self, name, usfm):
+        usfm_dir = os.path.join(self.temp_dir, name)
+        write_file(os.path.join(usfm_dir, '57-TIT.usfm'), usfm)
+        html_filepath = os.path.join(self.temp_dir, f'{name}.html')
+        SingleHTMLRenderer(usfm_dir, html_filepath).render()
+        return read_file(html_filepath)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+
+from tx_usfm_tools.usfm_verses import verses
+from tx_usfm_tools.verifyUSFM import verify_contents_quiet
+from tx_usfm_tools.chapters import split_chapters, last_verse_number
+from tests.benchmarks.synthetic_usfm import STYLES, book_codes, make_book, make_bible
+from tests.benchmarks.usfm_tools_benchmark import run_benchmarks, compare_results
+
+
+class TestBenchmark(unittest.TestCase):
+
+    def test_synthetic_books_are_valid(self):
+        for style in STYLES:
+            usfm = make_book('JUD', style)
+            errors, book_code = verify_contents_quiet(usfm, '65-JUD.usfm', 'JUD', 'en')
+            self.assertEqual(errors, [], style)
+            self.assertEqual(book_code, 'JUD')
+
+    def test_synthetic_books_are_sized_from_verses_table(self):
+        self.assertEqual(len(book_codes()), 66)
+        _header, chapters = split_chapters(make_book('RUT', 'notes'))
+        self.assertEqual(len(chapters), verses['RUT']['chapters'])
+        self.assertEqual([int(last_verse_number(chapter)) for chapter in chapters], verses['RUT']['verses'])
+
+    def test_synthetic_books_are_repeatable(self):
+        self.assertEqual(make_bible('aligned', ['2JN', '3JN']), make_bible('aligned', ['2JN', '3JN']))
+        self.assertNotEqual(make_book('2JN', 'plain', seed=1), make_book('2JN', 'plain', seed=2))
+
+    def test_run_benchmarks(self):
+        results = run_benchmarks(['synthetic-notes'], ['parse', 'verify', 'render'], ['3JN'])
+        self.assertEqual([result['stage'] for result in results['results']], ['parse', 'verify', 'render'])
+        for result in results['results']:
+            self.assertEqual(result['books'], 1)
+            self.assertGreater(result['tokens'], 0)
+            self.assertGreater(result['tokens_per_second'], 0)
+            self.assertGreater(result['peak_memory_bytes'], 0)
+        self.assertEqual(results['results'][1]['count'], 0) # no verify errors
+        self.assertEqual(len(compare_results(results, results)), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
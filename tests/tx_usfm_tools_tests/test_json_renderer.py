@@ -0,0 +1,46 @@
+import json
+import unittest
+
+from tx_usfm_tools.jsonRenderer import JSONRenderer
+from tx_usfm_tools.transform import UsfmTransform
+
+
+USFM = '\\id ROM EN_ULB\n\\h Romans\n\\mt Romans\n\\ip Some introduction\n' \
+        '\\c 1\n\\s1 A heading\n\\p\n\\v 1 Paul, a servant of \\nd Christ\\nd*. He\n\\q1 was called\n' \
+        '\\q2 to be an apostle \\f + \\fr 1:1 \\ft Or \\fqa set\\fqa* apart.\\f* and\\x + \\xo 1:1 \\xt Acts 9:15\\x*.\n' \
+        "\\v 2 God's~gospel \\add was\\add* promised\n" \
+        '\\c 2\n\\p\n\\v 1 Therefore\n'
+
+
+class TestJSONRenderer(unittest.TestCase):
+
+    def test_verses(self):
+        renderer = JSONRenderer()
+        renderer.booksUsfm = {'ROM': USFM}
+        self.assertEqual(renderer.run(), set())
+        self.assertEqual(renderer.getChapters(), [
+            {'book': 'ROM', 'chapter': '1',
+             'verses': {'1': 'Paul, a servant of Christ. He was called to be an apostle and.',
+                        '2': "God's\N{NO-BREAK SPACE}gospel was promised"},
+             'footnotes': {'1': ['Or set apart.']}},
+            {'book': 'ROM', 'chapter': '2', 'verses': {'1': 'Therefore'}, 'footnotes': {}}])
+        chapter_numbers, chapter_jsons = zip(*renderer.iterChapterJSON())
+        self.assertEqual(chapter_numbers, ('001', '002'))
+        self.assertEqual(chapter_jsons[1], '{"book":"ROM","chapter":"2","verses":{"1":"Therefore"},"footnotes":{}}')
+        self.assertEqual(json.loads(chapter_jsons[0]), renderer.getChapters()[0])
+
+    def test_extra_renderer(self):
+        """
+        Given the same tokens as the HTML renderer
+        """
+        renderer = JSONRenderer()
+        standalone_renderer = JSONRenderer()
+        standalone_renderer.booksUsfm = {'ROM': USFM}
+        standalone_renderer.run()
+        html, warnings = UsfmTransform.renderSingleHtml(USFM, extraRenderers=(renderer,))
+        self.assertEqual(html, UsfmTransform.renderSingleHtml(USFM)[0])
+        self.assertEqual(renderer.getChapters(), standalone_renderer.getChapters())
+
+
+if __name__ == '__main__':
+    unittest.main()
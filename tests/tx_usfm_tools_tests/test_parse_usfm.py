@@ -0,0 +1,49 @@
+import unittest
+
+from tx_usfm_tools.parseUsfm import parseString, LineIndex
+from tx_usfm_tools import verifyUSFM
+
+
+HEADER = '\\id TIT EN_ULT\n\\ide UTF-8\n\\h Titus\n\\toc1 Titus\n\\toc2 Titus\n\\toc3 Tit\n\\mt Titus\n\n'
+
+
+class TestParseUsfm(unittest.TestCase):
+
+    def test_token_positions(self):
+        usfm = '\\id TIT\n\\c 1\n\\p\n\\v 1 Paul, \\f + \\ft a note\\f*\n  \\v 2 a\xa0servant\n'
+        tokens = parseString(usfm)
+        self.assertEqual([(token.type, token.offset, token.line) for token in tokens],
+                         [('id', 0, 1), ('c', 8, 2), ('p', 13, 3), ('v', 16, 4), ('text', 21, 4),
+                          ('f', 27, 4), ('ft', 32, 4), ('f*', 42, 4), ('v', 48, 5), ('text', 53, 5)])
+        for token in tokens:
+            self.assertTrue(usfm.startswith('\\' if token.type != 'text' else token.value[0], token.offset))
+
+    def test_token_positions_after_escapes(self):
+        usfm = '\\id TIT\n\\p \\ odd\n\\v 1 text\\'
+        tokens = parseString(usfm)
+        self.assertEqual(tokens[-2].type, 'text')
+        self.assertEqual(tokens[-3].type, 'v')
+        self.assertEqual(usfm[tokens[-3].offset:tokens[-3].offset+4], '\\v 1')
+        self.assertEqual(tokens[-3].line, 3)
+
+    def test_line_index(self):
+        line_index = LineIndex('ab\ncd\n\nef')
+        self.assertEqual(line_index.lineColumn(0), (1, 1))
+        self.assertEqual(line_index.lineColumn(2), (1, 3))
+        self.assertEqual(line_index.lineColumn(3), (2, 1))
+        self.assertEqual(line_index.lineColumn(6), (3, 1))
+        self.assertEqual(line_index.lineColumn(8), (4, 2))
+
+    def test_marker_errors_have_positions(self):
+        usfm = HEADER + '\\c 1\n\\p\n\\v 1 Paul, a servant\n\\v2 of God.\n'
+        errors, _book_code = verifyUSFM.verify_contents_quiet(usfm, 'TIT', 'TIT', 'en')
+        self.assertIn("TIT 1:2 - Missing space before verse number: '\\v2 of G' at line 12, column 1", errors)
+
+    def test_marker_errors_have_original_positions_when_aligned(self):
+        usfm = HEADER + '\\c 1\n\\p\n\\v 1 \\w Paul|x-occurrence="1" x-occurrences="1"\\w*,\\v 2 of God.\n'
+        errors, _book_code = verifyUSFM.verify_contents_quiet(usfm, 'TIT', 'TIT', 'en')
+        self.assertIn("TIT 1:2 - Missing space before verse marker: ',\\v 2 of' at line 11, column 51", errors)
+
+
+if __name__ == '__main__':
+    unittest.main()
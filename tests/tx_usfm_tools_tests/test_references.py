@@ -0,0 +1,58 @@
+import unittest
+
+from tx_usfm_tools.references import Reference, findBookCode, parseReferences, ReferenceChecker, BOOK_FILEBASES
+from tx_usfm_tools.singlehtmlRenderer import SingleHTMLRenderer
+from tx_usfm_tools.chapters import split_chapters
+
+
+USFM = '\\id JUD\n\\c 1\n\\p\n' \
+       '\\v 1 One\\f + \\fr 1:1 \\ft A note.\\f*\n' \
+       '\\v 2 Two\\f + \\fr 1:27 \\ft A bad note.\\f*\n' \
+       '\\v 3 Three\\x - \\xo 1.3: \\xt Acts 9:15; 22:21; Galatians 1:15-16\\x*\n' \
+       '\\v 4 Four\\x - \\xo 1:4 \\xt Acts 29:1; 1 Corinthians 2:3-17; Jude 1:25\\x*\n' \
+       '\\v 5 Five\\x - \\xo 2:5 \\xt Tobit 1:1; Gal 1:25; Jude 1:30\\x*\n'
+
+
+class TestReferences(unittest.TestCase):
+
+    def test_parse_references(self):
+        self.assertEqual(list(parseReferences('Acts 9:15; 22:21-22; see also; 1 Cor 2:3')),
+                         [Reference('Acts 9:15', 'ACT', 9, 15, 15),
+                          Reference('22:21-22', 'ACT', 22, 21, 22),
+                          None,
+                          Reference('1 Cor 2:3', '1CO', 2, 3, 3)])
+        self.assertEqual(list(parseReferences('3:16', 'JHN')), [Reference('3:16', 'JHN', 3, 16, 16)])
+        self.assertEqual(findBookCode('Corinthians'), '1CO')
+        self.assertIsNone(findBookCode('Corinthians', exact=True))
+        self.assertEqual(findBookCode('2 Timothy', exact=True), '2TI')
+        self.assertEqual(findBookCode('1Cor.', exact=True), '1CO')
+        self.assertEqual(findBookCode('acts', exact=True), 'ACT')
+        self.assertIsNone(findBookCode('Tobit'))
+        self.assertEqual([BOOK_FILEBASES[bookCode] for bookCode in ('GEN', 'MAL', 'MAT', 'REV')],
+                         ['01-GEN', '39-MAL', '41-MAT', '67-REV'])
+
+    def test_check_book(self):
+        expected = ["JUD 1:2 - Footnote origin isn't a valid verse: '1:27'",
+                    "JUD 1:4 - Cross-reference to nonexistent verse: 'Acts 29:1'",
+                    "JUD 1:4 - Cross-reference to nonexistent verse: '1 Corinthians 2:3-17'",
+                    "JUD 1:5 - Cross-reference origin isn't a valid verse: '2:5'",
+                    "JUD 1:5 - Cross-reference to nonexistent verse: 'Gal 1:25'",
+                    "JUD 1:5 - Cross-reference to nonexistent verse: 'Jude 1:30'"]
+        self.assertEqual(ReferenceChecker('JUD').check(USFM), expected)
+        # Chapter by chapter gives the same warnings
+        checker = ReferenceChecker('JUD')
+        header, chapters = split_chapters(USFM)
+        self.assertEqual([warning for part in [header] + chapters for warning in checker.check(part)], expected)
+
+    def test_cross_reference_links(self):
+        renderer = SingleHTMLRenderer(None, None)
+        self.assertEqual(renderer.livenCrossReferences('Acts 9:15; 22:21; 22:99; Tobit 1:1; Acts 29:1'),
+                         '<a href="45-ACT.html#044-ch-009-v-015">Acts 9:15</a>;'
+                         '<a href="45-ACT.html#044-ch-022-v-021"> 22:21</a>;'
+                         '<a href="45-ACT.html#044-ch-022"> 22:99</a>;'
+                         '<a href=""> Tobit 1:1</a>;'
+                         '<a href=""> Acts 29:1</a>')
+
+
+if __name__ == '__main__':
+    unittest.main()
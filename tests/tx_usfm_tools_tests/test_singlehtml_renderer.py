@@ -0,0 +1,171 @@
+import os
+import io
+import re
+import tempfile
+import unittest
+
+from general_tools.file_utils import write_file, read_file, remove_tree
+from tx_usfm_tools.singlehtmlRenderer import SingleHTMLRenderer, PARALLEL_CHAPTERS_MIN_LENGTH
+from tx_usfm_tools.chapters import split_chapters, last_verse_number, count_cross_references
+from tx_usfm_tools.structure_index import BookStructure, StructureIndex
+from tx_usfm_tools.transform import UsfmTransform
+from tx_usfm_tools.books import loadBooks
+
+
+HEADER = '\\id ROM EN_ULB\n\\ide UTF-8\n\\h Romans\n\\toc1 Romans\n\\toc2 Romans\n\\toc3 Rom\n\\mt Romans\n\\cl Chapter\n\\ip Some introduction\n'
+
+
+def make_chapter(chapter_number, with_cross_references, unclosed_cross_reference=False):
+    chapter = f'\\c {chapter_number}\n\\p\n'
+    for verse_number in range(1, 31):
+        chapter += f'\\v {verse_number} Paul, a servant of Christ Jesus, called to be an apostle'
+        if verse_number % 5 == 0:
+            chapter += f' \\f + \\fr {chapter_number}:{verse_number} \\ft Or \\fqa set apart\\fqa*\\f*'
+        if with_cross_references and verse_number % 7 == 0:
+            chapter += ' \\x + \\xo 1:1 \\xt Acts 9:15; Galatians 1:15\\x*'
+        chapter += '\n'
+        if verse_number == 20:
+            chapter += '\\li1 one item\n\\li2 another item\n\\q1 a poetry line\n'
+    if unclosed_cross_reference:
+        chapter += '\\v 31 Extra \\x + \\xt Mark 1:1'
+    return chapter
+
+
+class TestSingleHTMLRenderer(unittest.TestCase):
+
+    def setUp(self):
+        """Runs before each test."""
+        self.temp_dir = tempfile.mkdtemp(prefix='tX_test_singlehtml_')
+
+    def tearDown(self):
+        """Runs after each test."""
+        remove_tree(self.temp_dir)
+
+    def test_split_chapters(self):
+        usfm = HEADER + make_chapter(1, False) + make_chapter(2, False)
+        header, chapters = split_chapters(usfm)
+        self.assertEqual(header, HEADER)
+        self.assertEqual(len(chapters), 2)
+        self.assertTrue(chapters[1].startswith('\\c 2\n'))
+        self.assertEqual(header + ''.join(chapters), usfm)
+        self.assertEqual(last_verse_number(chapters[0]), '30')
+        self.assertEqual(split_chapters(HEADER), (HEADER, []))
+
+    def test_parallel_chapters_plain(self):
+        usfm = HEADER + ''.join(make_chapter(c, False) for c in range(1, 25))
+        self.assertGreater(len(usfm), PARALLEL_CHAPTERS_MIN_LENGTH)
+        self.assertEqual(self.render(usfm, chapterWorkers=3), self.render(usfm))
+
+    def test_parallel_chapters_cross_references(self):
+        usfm = HEADER + ''.join(make_chapter(c, True, unclosed_cross_reference=(c==5))
+                                    for c in range(1, 25))
+        self.assertGreater(len(usfm), PARALLEL_CHAPTERS_MIN_LENGTH)
+        html = self.render(usfm, chapterWorkers=3)
+        self.assertEqual(html, self.render(usfm))
+        self.assertIn('xr-045-016-', html)
+
+    def test_parallel_chapters_no_rerendering(self):
+        # Cross-references are numbered through the whole book, so that's predicted for each chapter
+        for unclosedChapter, rerenderedChapters in ((None, 0), (5, 1)):
+            usfm = HEADER + ''.join(make_chapter(c, True, unclosed_cross_reference=(c==unclosedChapter))
+                                        for c in range(1, 25))
+            self.assertEqual(count_cross_references(usfm), 24*4 + (unclosedChapter is not None))
+            usfm_dir = os.path.join(self.temp_dir, 'in')
+            write_file(os.path.join(usfm_dir, '46-ROM.usfm'), usfm)
+            renderer = SingleHTMLRenderer(usfm_dir, os.path.join(self.temp_dir, 'out.html'), chapterWorkers=3)
+            renderer.render()
+            self.assertEqual(renderer.rerenderedChapters, rerenderedChapters)
+            self.assertEqual(read_file(os.path.join(self.temp_dir, 'out.html')), self.render(usfm))
+
+    def test_parallel_chapters_structure_index(self):
+        usfm = HEADER + ''.join(make_chapter(c, True) for c in range(1, 25))
+        structure = BookStructure('46-ROM.usfm', 'ROM')
+        header, chapters = split_chapters(usfm)
+        for part in [header] + chapters:
+            structure.addPart(part)
+        structureIndex = StructureIndex()
+        structureIndex.addBook(structure)
+        html = self.render(usfm)
+        self.assertEqual(self.render(usfm, chapterWorkers=3, structureIndex=structureIndex), html)
+        structure.chapterOffsets[5] += 1 # Doesn't match the text so isn't used
+        self.assertEqual(self.render(usfm, chapterWorkers=2, structureIndex=structureIndex), html)
+
+    def test_in_memory(self):
+        usfm = HEADER + ''.join(make_chapter(c, True) for c in range(1, 4))
+        html = self.render(usfm)
+        self.assertEqual(UsfmTransform.renderSingleHtml('\n ' + usfm), (html, set()))
+        with io.StringIO() as output_stream:
+            self.assertEqual(UsfmTransform.renderSingleHtml(usfm, output_stream), (None, set()))
+            self.assertEqual(output_stream.getvalue(), html)
+        # Not a book so nothing is rendered (the same as buildSingleHtml ignoring the file)
+        self.assertEqual(UsfmTransform.renderSingleHtml('\\id XYZ\n')[0], '\n    </body>\n</html>\n')
+
+    def test_footnote_order_and_escaping(self):
+        usfm = HEADER + '\\c 1\n\\p\n\\v 1 Paul~Saul' \
+                + ''.join(f' word\\f + \\ft Note~{n}\\f*' for n in range(1, 11)) + '\n'
+        html = UsfmTransform.renderSingleHtml(usfm)[0]
+        self.assertNotIn('~', html)
+        self.assertIn('Paul&nbsp;Saul', html)
+        footnotes = html[html.index('<div class="footnotes">'):]
+        self.assertEqual([int(footnotes[match.end():].split('<', 1)[0].split('&nbsp;')[1])
+                          for match in re.finditer(r'Note', footnotes)], list(range(1, 11)))
+
+    def test_chapter_pages(self):
+        usfm = HEADER + ''.join(make_chapter(c, True, unclosed_cross_reference=(c==5))
+                                    for c in range(1, 25))
+        html = self.render(usfm)
+        for chapterWorkers in (0, 3):
+            pages, warning_list = SingleHTMLRenderer(None, None, chapterWorkers=chapterWorkers) \
+                                        .renderStringPages(usfm, '46-ROM')
+            pages = list(pages)
+            self.assertEqual([filename for filename, _page in pages],
+                             ['46-ROM.html'] + [f'46-ROM-{c:03}.html' for c in range(1, 25)])
+            index = pages[0][1]
+            self.assertIn('Some introduction', index)
+            self.assertIn('<a href="46-ROM-007.html#045-ch-007">Chapter 7</a>', index)
+            self.assertNotIn('class="c-num"', index)
+            # Each chapter page has its own notes, and together they make up the whole book
+            body = ''
+            for c, (_filename, page) in enumerate(pages[1:], start=1):
+                self.assertTrue(page.endswith('\n    </body>\n</html>\n'))
+                self.assertEqual(page.count('class="c-num"'), 1)
+                self.assertIn(f'id="fn-045-{c:03}-005-1"', page)
+                body += page[page.index('</h1>\n')+6:-len('\n    </body>\n</html>\n')]
+            self.assertEqual(index[:index.index('\n\n<ul class="chapter-pages">')] + body
+                                + '\n    </body>\n</html>\n', html)
+        # Pages of whole chapters up to the given size
+        pages = list(SingleHTMLRenderer(None, None).renderStringPages(usfm, '46-ROM', 20_000)[0])
+        self.assertEqual(len(pages), 13) # Two chapters on each page
+        self.assertIn('<a href="46-ROM-005.html#045-ch-006">Chapter 6</a>', pages[0][1])
+        # A book too small to split is left as one page
+        self.assertEqual(list(SingleHTMLRenderer(None, None).renderStringPages(usfm, '46-ROM', 1_000_000)[0]),
+                         [('46-ROM.html', html)])
+
+    def test_load_books(self):
+        usfm = HEADER + make_chapter(1, False)
+        usfm_dir = os.path.join(self.temp_dir, 'in')
+        write_file(os.path.join(usfm_dir, '46-ROM.usfm'), '\n' * 1000 + usfm)
+        write_file(os.path.join(usfm_dir, '66-JUD.usfm'), '\\id JUD\n\\c 1\n\\p\n\\v 1 Jude\n')
+        write_file(os.path.join(usfm_dir, 'notes.txt'), 'Not a book\n')
+        books = loadBooks(usfm_dir)
+        self.assertEqual(sorted(books), ['JUD', 'ROM'])
+        self.assertEqual(books['ROM'], usfm)
+        # The text is only read when it's needed
+        write_file(os.path.join(usfm_dir, '66-JUD.usfm'), '\\id JUD\n\\c 1\n\\p\n\\v 1 Jude changed\n')
+        self.assertTrue(books['JUD'].endswith('Jude changed\n'))
+
+    #
+    # helpers
+    #
+
+    def render(self, usfm, chapterWorkers=0, structureIndex=None):
+        usfm_dir = os.path.join(self.temp_dir, f'in{chapterWorkers}')
+        write_file(os.path.join(usfm_dir, '46-ROM.usfm'), usfm)
+        html_filepath = os.path.join(self.temp_dir, f'out{chapterWorkers}.html')
+        SingleHTMLRenderer(usfm_dir, html_filepath, chapterWorkers=chapterWorkers,
+                                structureIndex=structureIndex).render()
+        return read_file(html_filepath)
+
+
+if __name__ == '__main__':
+    unittest.main()
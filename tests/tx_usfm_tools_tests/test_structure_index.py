@@ -0,0 +1,88 @@
+import os
+import tempfile
+import unittest
+from shutil import rmtree
+
+from tx_usfm_tools.structure_index import BookStructure, StructureIndex
+from tx_usfm_tools.verifyUSFM import UsfmVerifier
+from tx_usfm_tools.chapters import split_chapters
+from tx_usfm_tools.singlehtmlRenderer import SingleHTMLRenderer
+from tests.benchmarks.synthetic_usfm import make_book
+
+
+def make_structure(filename, usfm):
+    structure = BookStructure(filename)
+    header, chapters = split_chapters(usfm)
+    for part in [header] + chapters:
+        structure.addPart(part)
+    _errors, structure.bookCode = UsfmVerifier(structure=structure).verify(usfm, filename)
+    return structure
+
+
+class TestStructureIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(prefix='tX_test_structure_index_')
+
+    def tearDown(self):
+        rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_verse_ranges(self):
+        usfm = '\\id JUD\n\\c 1\n\\p\n\\v 1 One\n\\v 2-3 Two\n\\v 5 Five — ŋ\n\\v 6 Six\n\\c 2\n\\p\n\\v 1 One\n'
+        structure = make_structure('65-JUD.usfm', usfm)
+        self.assertEqual(structure.bookCode, 'JUD')
+        self.assertEqual(structure.verseRanges, {1: [[1,3], [5,6]], 2: [[1,1]]})
+        self.assertTrue(structure.hasVerse(1, 2))
+        self.assertFalse(structure.hasVerse(1, 4))
+        self.assertFalse(structure.hasVerse(3, 1))
+        self.assertEqual(list(structure.chapterOffsets), [8, usfm.encode('utf-8').index(b'\\c 2')])
+        self.assertEqual(structure.numBytes, len(usfm.encode('utf-8')))
+
+    def test_split_chapters(self):
+        usfm = make_book('RUT', 'aligned')
+        structure = make_structure('08-RUT.usfm', usfm)
+        self.assertEqual(structure.splitChapters(usfm), split_chapters(usfm))
+        self.assertIsNone(structure.splitChapters(usfm + '\n'))
+        self.assertIsNone(structure.splitChapters(usfm.replace('\\c 2\n', '\n\\c 2'))) # Same length
+
+    def test_save_and_load(self):
+        index = StructureIndex()
+        index.addBook(make_structure('08-RUT.usfm', make_book('RUT', 'plain')))
+        index.addBook(make_structure('65-JUD.usfm', make_book('JUD', 'plain')))
+        index.addBook(BookStructure('99-RUT.usfm', 'RUT')) # Duplicate code is ignored
+        filepath = os.path.join(self.temp_dir, 'index.json')
+        index.save(filepath)
+        loaded = StructureIndex.load(filepath)
+        self.assertEqual([book.toDict() for book in loaded], [book.toDict() for book in index])
+        self.assertEqual(loaded.getBook('RUT').filename, '08-RUT.usfm')
+        self.assertEqual(len(loaded.getBook('RUT').verseRanges), 4)
+        self.assertIsNone(StructureIndex.load(os.path.join(self.temp_dir, 'missing.json')))
+        with open(filepath, 'wt') as index_file:
+            index_file.write('{"version":1,"books":[{"file":"x.usfm"}]}')
+        self.assertIsNone(StructureIndex.load(filepath))
+
+    def test_cross_reference_links(self):
+        index = StructureIndex()
+        index.addBook(make_structure('41-MAT.usfm', make_book('MAT', 'plain')))
+        renderer = SingleHTMLRenderer(None, None)
+        self.assertEqual(renderer.livenCrossReferences('Matthew 2:3'),
+                         '<a href="41-MAT.html#040-ch-002-v-003">Matthew 2:3</a>')
+        renderer.structureIndex = index
+        self.assertEqual(renderer.livenCrossReferences('Matthew 2:3; Matthew 2:99; Ruth 1:2'),
+                         '<a href="41-MAT.html#040-ch-002-v-003">Matthew 2:3</a>;'
+                         '<a href="41-MAT.html#040-ch-002"> Matthew 2:99</a>;'
+                         '<a href="08-RUT.html#008-ch-001-v-002"> Ruth 1:2</a>')
+
+    def test_cross_reference_missing_chapter(self):
+        # Only the chapters actually in the file are linked (even if the versification has more)
+        header, chapters = split_chapters(make_book('MAT', 'plain'))
+        index = StructureIndex()
+        index.addBook(make_structure('41-MAT.usfm', header + ''.join(chapters[:3])))
+        renderer = SingleHTMLRenderer(None, None, structureIndex=index)
+        self.assertEqual(renderer.livenCrossReferences('Matthew 3:1; 5:1'),
+                         '<a href="41-MAT.html#040-ch-003-v-001">Matthew 3:1</a>;'
+                         '<a href=""> 5:1</a>')
+
+
+if __name__ == '__main__':
+    unittest.main()
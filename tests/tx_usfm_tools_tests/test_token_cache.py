@@ -0,0 +1,85 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from general_tools.file_utils import remove_tree
+from tx_usfm_tools import token_cache, verifyUSFM
+from tx_usfm_tools.parseUsfm import parseString
+from tx_usfm_tools.token_cache import TokenCache
+
+
+USFM = '\\id TIT EN_ULT\n\\ide UTF-8\n\\h Titus\n\\toc1 Titus\n\\toc2 Titus\n\\toc3 Tit\n\\mt Titus\n\n' \
+       '\\c 1\n\\p\n\\v 1 Paul, a servant \\f + \\ft a note\\f*\n\\v 2 of \\add God\\add* \\ \\zzz\n'
+
+
+class TestTokenCache(unittest.TestCase):
+
+    def setUp(self):
+        """Runs before each test."""
+        self.temp_dir = tempfile.mkdtemp(prefix='tX_test_token_cache_')
+
+    def tearDown(self):
+        """Runs after each test."""
+        remove_tree(self.temp_dir)
+
+    def test_round_trip(self):
+        cache = TokenCache(self.temp_dir)
+        first_tokens = cache.parseString(USFM)
+        second_tokens = cache.parseString(USFM)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertEqual(self.describe(first_tokens), self.describe(parseString(USFM)))
+        self.assertEqual(self.describe(second_tokens), self.describe(first_tokens))
+
+    def test_different_text_or_parser_version_misses(self):
+        cache = TokenCache(self.temp_dir)
+        cache.parseString(USFM)
+        cache.parseString(USFM + '\\v 3 more\n')
+        self.assertEqual((cache.hits, cache.misses), (0, 2))
+        cache.parserVersion += '-changed'
+        cache.parseString(USFM)
+        self.assertEqual((cache.hits, cache.misses), (0, 3))
+
+    def test_corrupt_file_is_reparsed(self):
+        cache = TokenCache(self.temp_dir)
+        cache.parseString(USFM)
+        filepath = cache.getFilepath(cache.getKey(USFM))
+        with open(filepath, 'wb') as cache_file:
+            cache_file.write(token_cache.CACHE_FORMAT + b'rubbish')
+        self.assertEqual(self.describe(cache.parseString(USFM)), self.describe(parseString(USFM)))
+        self.assertEqual(cache.misses, 2)
+
+    def test_least_recently_used_eviction(self):
+        cache = TokenCache(self.temp_dir)
+        texts = [USFM + f'\\v {n} more text\n' for n in range(3, 7)]
+        for n, text in enumerate(texts):
+            cache.parseString(text)
+            filepath = cache.getFilepath(cache.getKey(text))
+            os.utime(filepath, (1000+n, 1000+n)) # Oldest first
+        entry_size = os.path.getsize(filepath)
+        cache.parseString(texts[0]) # Now the most recently used one
+        cache.maxBytes = entry_size * 2 + entry_size // 2
+        cache.evict()
+        self.assertEqual(sorted(os.listdir(self.temp_dir)),
+                         sorted(os.path.basename(cache.getFilepath(cache.getKey(text))) for text in (texts[0], texts[3])))
+
+    def test_enabled_by_environment(self):
+        with mock.patch.dict(os.environ, {'USFM_TOKEN_CACHE_DIR': self.temp_dir}):
+            first_errors = verifyUSFM.verify_contents_quiet(USFM, 'TIT', 'TIT', 'en')
+            second_errors = verifyUSFM.verify_contents_quiet(USFM, 'TIT', 'TIT', 'en')
+            self.assertEqual(token_cache.getTokenCache().hits, 1)
+        self.assertEqual(first_errors, second_errors)
+        self.assertEqual(first_errors, verifyUSFM.verify_contents_quiet(USFM, 'TIT', 'TIT', 'en'))
+        self.assertIsNone(token_cache.getTokenCache())
+
+    #
+    # helpers
+    #
+
+    @staticmethod
+    def describe(tokens):
+        return [(type(token), token.type, token.value, token.offset, token.line) for token in tokens]
+
+
+if __name__ == '__main__':
+    unittest.main()
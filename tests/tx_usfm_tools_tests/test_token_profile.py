@@ -0,0 +1,63 @@
+import os
+import unittest
+from unittest import mock
+
+from tx_usfm_tools import token_profile
+from tx_usfm_tools.token_profile import TokenProfile, getStatsName, newProfile
+from tx_usfm_tools.singlehtmlRenderer import SingleHTMLRenderer
+from tx_usfm_tools.verifyUSFM import UsfmVerifier
+
+
+USFM = '\\id JUD EN_ULB\n\\h Jude\n\\mt Jude\n\\c 1\n\\p\n\\v 1 Jude, a \\zz servant\n\\v 2 May mercy \\zz be \\zz multiplied\n'
+
+
+class TestTokenProfile(unittest.TestCase):
+
+    def tearDown(self):
+        token_profile.setStatsClient(None, '')
+
+    def test_disabled(self):
+        with mock.patch.dict(os.environ, {'USFM_PROFILE': ''}):
+            self.assertIsNone(newProfile('render'))
+            renderer = SingleHTMLRenderer(None, None)
+            renderer.booksUsfm = {'JUD': USFM}
+            renderer.renderHtml()
+            self.assertIsNone(renderer.profile)
+        # Unknown markers are counted rather than listed
+        self.assertEqual(renderer.unknowns, {'zz': 3})
+
+    def test_profile(self):
+        profile = TokenProfile('render')
+        profile.add('v', 0.5)
+        profile.add('v', 0.25)
+        other = TokenProfile('render')
+        other.add('add*', 1.0)
+        profile.update(other)
+        self.assertEqual(profile.counts, {'v': 2, 'add*': 1})
+        self.assertEqual(profile.seconds, {'v': 0.75, 'add*': 1.0})
+        self.assertEqual(profile.summary('JUD'),
+                         'USFM render profile for JUD: 3 tokens in 1750.0ms — slowest: add* 1×=1000.0ms, v 2×=750.0ms')
+        self.assertEqual([getStatsName(tokenType) for tokenType in ('add*', '+xt', '\\\\', 'v')],
+                         ['add_end', 'plus_xt', '__', 'v'])
+
+    def test_render_and_verify(self):
+        stats_client = mock.Mock()
+        token_profile.setStatsClient(stats_client, 'tx.test')
+        with mock.patch.dict(os.environ, {'USFM_PROFILE': '1'}), \
+                self.assertLogs(level='DEBUG') as logs:
+            renderer = SingleHTMLRenderer(None, None)
+            renderer.booksUsfm = {'JUD': USFM}
+            renderer.renderHtml()
+            UsfmVerifier('JUD').verify(USFM, '66-JUD.usfm')
+        summaries = [message for message in logs.output if ' profile for ' in message]
+        self.assertEqual(len(summaries), 2)
+        self.assertIn('USFM render profile for JUD: 15 tokens in', summaries[0])
+        self.assertIn('USFM verify profile for JUD: 15 tokens in', summaries[1])
+        timings = {call.args[0]: call.args[1] for call in stats_client.timing.call_args_list}
+        self.assertEqual(timings['tx.test.render.v.count'], 2)
+        self.assertEqual(timings['tx.test.verify.unknown.count'], 3)
+        self.assertIn('tx.test.render.text.ms', timings)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import io
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from tx_usfm_tools import verifyUSFM
+from tx_usfm_tools.parseUsfm import TOKEN_CLASSES
+from tx_usfm_tools.verifyUSFM import UsfmVerifier, verify_contents_quiet
+from tx_usfm_tools.chapters import split_chapters, read_chapters
+from tests.benchmarks.synthetic_usfm import make_book
+
+
+class TestVerifyUsfm(unittest.TestCase):
+
+    def test_verifier_owns_its_state(self):
+        good_usfm = make_book('JUD', 'plain')
+        bad_usfm = make_book('2JN', 'notes').replace('\\v 3 ', '\\v 5 ')
+        first_verifier, second_verifier = UsfmVerifier('JUD', 'en'), UsfmVerifier('2JN', 'en')
+        self.assertEqual(first_verifier.verify(good_usfm, 'JUD'), ([], 'JUD'))
+        errors, book_code = second_verifier.verify(bad_usfm, '2JN')
+        self.assertEqual(book_code, '2JN')
+        self.assertIn('2JN 1:4 - Verse out of order: after 2JN 1:5', errors)
+        self.assertEqual(first_verifier.errors, [])
+        self.assertEqual(first_verifier.chapter, 1)
+        self.assertEqual(second_verifier.verse, 13)
+
+    def test_concurrent_verification(self):
+        books = []
+        for book_code in ('RUT', 'JUD', '2JN', '3JN', 'PHM', 'OBA'):
+            books.append((book_code, make_book(book_code, 'notes')))
+            books.append((book_code, make_book(book_code, 'plain').replace('\\v 2 ', '\\v2 ')))
+        expected = [verify_contents_quiet(usfm, book_code, book_code, 'en') for book_code, usfm in books]
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(lambda book: verify_contents_quiet(book[1], book[0], book[0], 'en'), books))
+        self.assertEqual(results, expected)
+        self.assertEqual(expected[0], ([], 'RUT'))
+        self.assertTrue(expected[1][0][1].startswith('RUT 1:2 - Missing space before verse number'))
+
+    def test_starts_with_text(self):
+        errors, book_code = verify_contents_quiet('Some text\n\\id JUD\n', 'JUD', 'JUD', 'en')
+        self.assertEqual(book_code, 'JUD')
+        self.assertIn('JUD - No preceding Token', errors)
+
+    def test_verify_chapter_by_chapter(self):
+        usfm = make_book('PHM', 'notes').replace('\\v 3 ', '\\v3 ').replace('\n\\c 1\n', ' \\c 1\n') \
+                    .replace('\\v 25 ', '\\v 24 ')
+        header, chapters = split_chapters(usfm)
+        parts = list(read_chapters(io.StringIO(usfm)))
+        self.assertEqual(parts, [header] + chapters)
+        errors, book_code = UsfmVerifier('PHM', 'en').verify(usfm, 'PHM')
+        verifier = UsfmVerifier('PHM', 'en')
+        self.assertEqual(list(verifier.verifyParts(iter(parts), 'PHM')), errors)
+        self.assertEqual(verifier.ID, book_code)
+        self.assertEqual(errors, ["PHM 1 - Missing new line before chapter marker: 'mon \\c 1' at line 8, column 10",
+                                  "PHM 1:2 - Unknown USFM token: '\\v3'",
+                                  "PHM 1:3 - Missing space before verse number: '\\v3 peop' at line 12, column 1",
+                                  'PHM 1:24 - Duplicated verse number',
+                                  'PHM 1:24 - Should have 25 verses'])
+
+    def test_token_tables(self):
+        for marker, tokenClass in TOKEN_CLASSES.items():
+            token = tokenClass()
+            categories = verifyUSFM.TOKEN_CATEGORIES[tokenClass]
+            self.assertEqual(bool(categories & verifyUSFM.FOOTNOTE), verifyUSFM.isFootnote(token), marker)
+            self.assertEqual(bool(categories & verifyUSFM.TEXT_CARRYING), verifyUSFM.isTextCarryingToken(token), marker)
+            self.assertEqual(bool(categories & verifyUSFM.TEXT), token.isTEXT(), marker)
+        self.assertIs(verifyUSFM.TAKE_HANDLERS[TOKEN_CLASSES['c']], verifyUSFM.takeChapterToken)
+        self.assertIs(verifyUSFM.TAKE_HANDLERS[TOKEN_CLASSES['pi2']], verifyUSFM.TAKE_HANDLERS[TOKEN_CLASSES['p']])
+        self.assertIs(verifyUSFM.TAKE_HANDLERS[TOKEN_CLASSES['\\\\']], verifyUSFM.TAKE_HANDLERS[TOKEN_CLASSES['unknown']])
+        self.assertIsNone(verifyUSFM.TAKE_HANDLERS[TOKEN_CLASSES['s5']])
+
+
+if __name__ == '__main__':
+    unittest.main()
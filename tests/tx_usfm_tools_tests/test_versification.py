@@ -0,0 +1,57 @@
+import os
+import tempfile
+import unittest
+from shutil import rmtree
+
+from tx_usfm_tools.versification import Versification, getVersification, loadVrsFile, registerVersification
+from tx_usfm_tools.verifyUSFM import verify_contents_quiet
+from tests.benchmarks.synthetic_usfm import make_book
+
+
+class TestVersification(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(prefix='tX_test_versification_')
+
+    def tearDown(self):
+        rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_built_in(self):
+        kjv = getVersification('KJV')
+        self.assertIs(getVersification(None), kjv)
+        self.assertIs(getVersification('no-such-scheme'), kjv)
+        self.assertEqual(getVersification('ufw').nVerses('GEN', 50), 26)
+        self.assertEqual(kjv.nChapters('PSA'), 150)
+        self.assertEqual(kjv.nVerses('PSA', 119), 176)
+        self.assertEqual(kjv.nVerses('PSA', 151), 0)
+        self.assertEqual(kjv.nVerses('XYZ', 1), 0)
+        self.assertEqual(kjv.nChapters('FRT'), 0)
+        self.assertEqual(kjv.getWrongLastVerses('REV', [(11,19), (12,17), (12,18), (13,17), (23,1)]), [3, 4])
+        self.assertEqual(kjv.getWrongLastVerses('3JN', [(1,14)]), [])
+        self.assertTrue(kjv.hasChapter('PSA', 150))
+        self.assertFalse(kjv.hasChapter('PSA', 0))
+        self.assertTrue(kjv.hasVerse('PSA', 119, 176))
+        self.assertFalse(kjv.hasVerse('PSA', 119, 177))
+        self.assertFalse(kjv.hasVerse('PSA', 151, 1))
+        self.assertFalse(kjv.hasVerse('XYZ', 1, 1))
+
+    def test_load_vrs_file(self):
+        filepath = os.path.join(self.temp_dir, 'test.vrs')
+        with open(filepath, 'wt') as vrs_file:
+            vrs_file.write("# Test versification\nJUD 1:26\nMAL 1:14 2:17 3:24\nMAL 3:19-24 = MAL 4:1-6\n")
+        versification = loadVrsFile('test', filepath)
+        self.assertEqual(versification.nChapters('MAL'), 3)
+        self.assertEqual(versification.nVerses('MAL', 3), 24)
+        self.assertEqual(versification.nVerses('JUD', 1), 26)
+        self.assertEqual(versification.nChapters('GEN'), 0)
+
+    def test_verify_with_alternate_versification(self):
+        registerVersification(Versification('test-jud', {'JUD': [26]}))
+        usfm = make_book('JUD', 'plain')
+        self.assertEqual(verify_contents_quiet(usfm, 'JUD', 'JUD', 'en'), ([], 'JUD'))
+        errors, _book_code = verify_contents_quiet(usfm, 'JUD', 'JUD', 'en', 'test-jud')
+        self.assertEqual(errors, ['JUD 1:25 - Should have 26 verses'])
+
+
+if __name__ == '__main__':
+    unittest.main()
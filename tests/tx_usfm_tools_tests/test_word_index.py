@@ -0,0 +1,84 @@
+import os
+import tempfile
+import unittest
+from shutil import rmtree
+
+from tx_usfm_tools.word_index import WordIndex, indexBook, splitQuote
+
+
+UGNT_3JN = '\\id 3JN\n\\h 3 John\n\\c 1\n\\p\n' \
+           '\\v 1 \\w ὁ|lemma="ὁ" strong="G35880" x-morph="Gr,EA,,,,NMS,"\\w* ' \
+           '\\w πρεσβύτερος|lemma="πρεσβύτερος" strong="G42450"\\w* ' \
+           '\\k-s | x-tw="rc://*/tw/dict/bible/kt/love"\\*\\w Γαΐῳ|strong="G10500"\\w*\\k-e\\* ' \
+           '\\w τῷ|strong="G35880"\\w* \\w ἀγαπητῷ|strong="G00270"\\w*,\\f + \\ft Not ὁ πρεσβύτερος.\\f*\n' \
+           '\\v 2 \\w ἀγαπητέ|strong="G00270"\\w*, \\w περὶ|strong="G40120"\\w* \\w πάντων|strong="G39560"\\w* ' \
+           '\\w εὔχομαί|strong="G21720"\\w* \\w σε|strong="G46710"\\w* \\w εὐοδοῦσθαι|strong="G21370"\\w* ' \
+           '\\w καὶ|strong="G25320"\\w* \\w ὑγιαίνειν|strong="G51980"\\w*, \\w καθὼς|strong="G25310"\\w* ' \
+           '\\w εὐοδοῦταί|strong="G21370"\\w* \\w σου|strong="G46710"\\w* \\w ἡ|strong="G35880"\\w* ' \
+           '\\w ψυχή|strong="G55900"\\w*.\n'
+
+UHB_RUT = '\\id RUT\n\\c 1\n\\p\n' \
+          '\\v 1 \\w וַ/יְהִ֗י|lemma="הָיָה" strong="c:H1961"\\w* \\w בִּ/ימֵי֙|strong="b:H3117"\\w* ' \
+          '\\w שְׁפֹ֣ט|strong="H8199"\\w* \\w הַ/שֹּׁפְטִ֔ים|strong="d:H8199"\\w*\n' \
+          '\\v 2 \\w וְ/שֵׁ֣ם|strong="c:H8034"\\w* \\w הָ/אִ֣ישׁ|strong="d:H0376"\\w* \\w אֱֽלִימֶ֡לֶךְ|strong="H0458"\\w*' \
+          '־\\w עַל|strong="H5921"\\w*׃\n'
+
+
+class TestWordIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(prefix='tX_test_word_index_')
+        self.usfm_dir = os.path.join(self.temp_dir, 'usfm')
+        self.cache_dir = os.path.join(self.temp_dir, 'cache')
+        os.makedirs(os.path.join(self.usfm_dir, 'hbo_uhb'))
+        os.makedirs(os.path.join(self.usfm_dir, 'el-x-koine_ugnt'))
+        with open(os.path.join(self.usfm_dir, 'el-x-koine_ugnt', '65-3JN.usfm'), 'wt', encoding='utf-8') as usfm_file:
+            usfm_file.write(UGNT_3JN)
+        with open(os.path.join(self.usfm_dir, 'hbo_uhb', '08-RUT.usfm'), 'wt', encoding='utf-8') as usfm_file:
+            usfm_file.write(UHB_RUT)
+
+    def tearDown(self):
+        rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_index_book(self):
+        verses = indexBook(UGNT_3JN)
+        self.assertEqual(sorted(verses), [(1,1), (1,2)])
+        self.assertEqual(verses[(1,1)], ['ὁ', 'πρεσβύτερος', 'γαΐῳ', 'τῷ', 'ἀγαπητῷ'])
+        self.assertEqual(indexBook(UHB_RUT)[(1,2)], ['וְשֵׁ֣ם', 'הָאִ֣ישׁ', 'אֱֽלִימֶ֡לֶךְ', 'עַל'])
+
+    def test_split_quote(self):
+        self.assertEqual(splitQuote('Γαΐῳ τῷ … ἀγαπητῷ'), [('γαΐῳ', 'τῷ'), ('ἀγαπητῷ',)])
+        self.assertEqual(splitQuote('אֱֽלִימֶ֡לֶךְ־עַל & וְשֵׁ֣ם'), [('אֱֽלִימֶ֡לֶךְ', 'עַל'), ('וְשֵׁ֣ם',)])
+        self.assertEqual(splitQuote(' … '), [])
+
+    def test_occurrences(self):
+        index = WordIndex(self.usfm_dir, self.cache_dir)
+        self.assertTrue(index.hasBook('3jn'))
+        self.assertFalse(index.hasBook('GEN'))
+        verse = index.getVerse('3JN', 1, 2)
+        self.assertEqual(verse.countOccurrences(splitQuote('εὐοδοῦσθαι καὶ ὑγιαίνειν')), 1)
+        self.assertEqual(verse.countOccurrences(splitQuote('περὶ … σου ἡ ψυχή')), 1)
+        self.assertEqual(verse.countOccurrences(splitQuote('σου … περὶ')), 0)
+        self.assertEqual(verse.countOccurrences(splitQuote('ὁ πρεσβύτερος')), 0)
+        self.assertEqual(index.getVerse('3JN', 1, 1).countOccurrences(splitQuote('ὁ πρεσβύτερος')), 1) # Not the footnote
+        self.assertIsNone(index.getVerse('3JN', 1, 3))
+        self.assertIsNone(index.getVerse('GEN', 1, 1))
+        self.assertEqual(index.getVerse('RUT', 1, 1).countOccurrences(splitQuote('בִּימֵי֙ שְׁפֹ֣ט')), 1)
+
+    def test_cache(self):
+        WordIndex(self.usfm_dir, self.cache_dir).getBook('RUT')
+        self.assertEqual(len([name for name in os.listdir(self.cache_dir) if name.endswith('.words')]), 1)
+        # The cached copy is used while the file is unchanged
+        filepath = os.path.join(self.usfm_dir, 'hbo_uhb', '08-RUT.usfm')
+        stat = os.stat(filepath)
+        with open(filepath, 'wt', encoding='utf-8') as usfm_file:
+            usfm_file.write(UHB_RUT.replace('עַל', 'עלל'))
+        os.utime(filepath, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        self.assertEqual(WordIndex(self.usfm_dir, self.cache_dir).getVerse('RUT', 1, 2).words[-1], 'עַל')
+        # but not once it changes
+        os.utime(filepath, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        self.assertEqual(WordIndex(self.usfm_dir, self.cache_dir).getVerse('RUT', 1, 2).words[-1], 'עלל')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,11 @@
 import logging
+from time import perf_counter
+from collections import Counter
 
 from tx_usfm_tools.books import loadBooks, silNames
-from tx_usfm_tools.parseUsfm import parseString
+from tx_usfm_tools.token_cache import parseString
+from tx_usfm_tools.alignment import strip_alignment
+from tx_usfm_tools.token_profile import newProfile
 
 
 
@@ -11,6 +15,10 @@ class AbstractRenderer:
 
     chapterLabel = 'Chapter'
 
+    extraRenderers = () # Also given the tokens that are rendered here (see addRenderer)
+
+    profile = None # TokenProfile of the book being rendered (if profiling)
+
     def writeLog(self, s):
         # logging.info(s)
         pass
@@ -21,42 +29,89 @@ class AbstractRenderer:
         self.booksUsfm = loadBooks(usfmDir)
 
 
+    def parseBook(self, usfm):
+        """
+        The renderers don't use any alignment data,
+            so drop it before tokenizing (a no-op for unaligned books).
+        """
+        stripped_usfm, _offset_map = strip_alignment(usfm)
+        return parseString(stripped_usfm)
+
+
+    def addRenderer(self, renderer):
+        """
+        Has another renderer render the same tokens as this one
+            so that several outputs can be made from one parse of the USFM.
+        """
+        self.extraRenderers = self.extraRenderers + (renderer,)
+
+
+    def renderTokens(self, tokens, warning_list):
+        if self.profile is not None:
+            self.renderTokensProfiled(tokens, warning_list)
+        else:
+            for t in tokens:
+                try:
+                    t.renderOn(self)
+                except Exception as e:
+                    warning_list.append(f"Unable to render '{t.type}' token due to {e}")
+        for renderer in self.extraRenderers:
+            renderer.renderTokens(tokens, warning_list)
+
+
+    def renderTokensProfiled(self, tokens, warning_list):
+        """
+        Same as renderTokens (for this renderer) but times each token.
+        """
+        profile = self.profile
+        for t in tokens:
+            start = perf_counter()
+            try:
+                t.renderOn(self)
+            except Exception as e:
+                warning_list.append(f"Unable to render '{t.type}' token due to {e}")
+            profile.add(t.type, perf_counter() - start)
+
+
+    def renderUsfm(self, usfm, warning_list):
+        """
+        Render one book—derived renderers may override this to split the work up.
+        """
+        self.renderTokens(self.parseBook(usfm), warning_list)
+
+
     def run(self):
         # logging.debug(f"AbstractRenderer.run() to convert {len(self.booksUsfm)} books…")
-        self.unknowns = []
+        self.unknowns = Counter()
         warning_list = []
         try:
             # logging.debug("AbstractRenderer.run() try using renderBook…")
             bookName = self.renderBook # This gives an AttributeError for USFM since it doesn't exist
             if bookName in self.booksUsfm:
-                self.writeLog('     (' + bookName + ')')
-                tokens = parseString(self.booksUsfm[bookName])
-                for t in tokens:
-                    try:
-                        t.renderOn(self)
-                    except Exception as e:
-                        warning_list.append(f"Unable to render '{t.type}' token due to {e}")
+                self.runBook(bookName, warning_list)
         except AttributeError:
             # logging.debug("AbstractRenderer.run() now using silNames…")
             for bookName in silNames:
                 if bookName in self.booksUsfm:
                     # logging.debug(f"AbstractRenderer.run() converting {bookName}…")
-                    self.writeLog('     (' + bookName + ')')
-                    tokens = parseString(self.booksUsfm[bookName])
-                    for t in tokens:
-                        try:
-                            t.renderOn(self)
-                        except Exception as e:
-                            warning_list.append(f"Unable to render '{t.type}' token due to {e}")
+                    self.runBook(bookName, warning_list)
         if self.unknowns:
-            unknownsSet = set(self.unknowns)
-            msg = f"Renderer skipped {len(self.unknowns)} total, {len(unknownsSet)} unique unknown USFM tokens: {', '.join(unknownsSet)}"
+            msg = f"Renderer skipped {sum(self.unknowns.values())} total, {len(self.unknowns)} unique unknown USFM tokens: {', '.join(self.unknowns)}"
             logging.error(msg)
             # warning_list.append(msg)
         return set(warning_list) # Remove duplicates
     # end of run()
 
 
+    def runBook(self, bookName, warning_list):
+        self.writeLog('     (' + bookName + ')')
+        self.profile = newProfile('render')
+        self.renderUsfm(self.booksUsfm[bookName], warning_list)
+        if self.profile is not None:
+            self.profile.report(bookName)
+            self.profile = None
+
+
     # Added here May 2019 so they applied to all derived renderers
     # TODO: Should make this list extensive (from USFM 3 spec)
     # TODO: How do we remove the linter warnings
@@ -183,5 +238,5 @@ class AbstractRenderer:
     # Add unknown tokens to list
     def renderUnknown(self, token):
         # logging.debug(f"renderUnkown({token.value})")
-        self.unknowns.append(token.value)
+        self.unknowns[token.value] += 1
 # end of AbstractRenderer class
@@ -0,0 +1,82 @@
+"""
+Fast pre-pass for aligned USFM (e.g., Aligned_Bible repos)
+
+Aligned books are dominated by \\zaln-s ...\\* / \\zaln-e\\* milestones
+    and by \\w word|x-occurrence="1" ...\\w* word attributes.
+Neither parseUsfm nor the renderers need any of that,
+    so this collapses it down to the plain word text
+    (keeping all other text and whitespace exactly as it was)
+    and records where each surviving piece came from in the original.
+"""
+from typing import List, Tuple
+from bisect import bisect_right
+import re
+
+
+# Milestones are removed completely, \w fields keep only the word itself
+#   (the attributes after the | are dropped)
+ALIGNMENT_MARKUP_RE = re.compile(r'\\zaln-[se][^\\]*\\\*'
+                                 r'|\\\+?w\s+([^|\\]*)(?:\|[^\\]*)?\\\+?w\*')
+
+
+class AlignmentOffsetMap:
+    """
+    Maps offsets in the stripped text back to offsets in the original text.
+
+    Stored as two parallel lists giving the start of each copied segment
+        in the stripped and in the original text, so a lookup is a bisect.
+    """
+    def __init__(self, stripped_starts:List[int], original_starts:List[int]) -> None:
+        self.stripped_starts = stripped_starts
+        self.original_starts = original_starts
+
+    def original_offset(self, stripped_offset:int) -> int:
+        ix = bisect_right(self.stripped_starts, stripped_offset) - 1
+        if ix < 0:
+            return stripped_offset
+        return self.original_starts[ix] + stripped_offset - self.stripped_starts[ix]
+
+    def is_identity(self) -> bool:
+        return self.stripped_starts == self.original_starts
+# end of AlignmentOffsetMap class
+
+
+def has_alignment_markup(usfm:str) -> bool:
+    return '\\zaln-' in usfm or '\\w ' in usfm or '\\+w ' in usfm
+
+
+def strip_alignment(usfm:str) -> Tuple[str, AlignmentOffsetMap]:
+    """
+    Remove alignment milestones and collapse \\w fields to their word text.
+
+    Returns the stripped text and an offset map back to the original.
+    Text that contains no alignment markup is returned unchanged.
+    """
+    if not has_alignment_markup(usfm):
+        return usfm, AlignmentOffsetMap([0], [0])
+
+    pieces:List[str] = []
+    stripped_starts:List[int] = []
+    original_starts:List[int] = []
+    stripped_length = 0
+    last_end = 0
+
+    def keep(start:int, end:int) -> None:
+        nonlocal stripped_length
+        if end > start:
+            stripped_starts.append(stripped_length)
+            original_starts.append(start)
+            pieces.append(usfm[start:end])
+            stripped_length += end - start
+
+    for match in ALIGNMENT_MARKUP_RE.finditer(usfm):
+        keep(last_end, match.start())
+        if match.group(1) is not None: # a \w field
+            keep(match.start(1), match.end(1))
+        last_end = match.end()
+    keep(last_end, len(usfm))
+
+    if not stripped_starts: # nothing left at all
+        stripped_starts.append(0); original_starts.append(len(usfm))
+    return ''.join(pieces), AlignmentOffsetMap(stripped_starts, original_starts)
+# end of strip_alignment function
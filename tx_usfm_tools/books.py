@@ -3,6 +3,7 @@
 
 import os
 import logging
+from collections.abc import Mapping
 
 __logger = logging.getLogger('usfm_tools')
 
@@ -365,11 +366,75 @@ def bookID(usfm):
 #     return bookNames[index]
 
 
+BOOK_HEADER_SNIFF_LENGTH = 512 # Characters read (after any leading whitespace) to find the \id line
+
+
+# noinspection PyPep8Naming
+def sniffBookCode(filepath):
+    """
+    Returns the book code from the \\id line at the start of the file
+        (as bookFromUsfm would find it) without reading the whole file,
+        or None if the file doesn't start with a known \\id.
+    """
+    with open(filepath, 'rt') as f:
+        header = f.read(BOOK_HEADER_SNIFF_LENGTH).lstrip()
+        while not header: # Only whitespace so far
+            chunk = f.read(BOOK_HEADER_SNIFF_LENGTH)
+            if not chunk:
+                return None
+            header = chunk.lstrip()
+        header += f.read(BOOK_HEADER_SNIFF_LENGTH - len(header))
+    book = bookFromUsfm(header)
+    return book[0] if book else None
+
+
+# noinspection PyPep8Naming
+def readBook(filepath):
+    """
+    Returns the USFM text of the book as loadBooks loads it,
+        or '' if the file can no longer be read.
+    """
+    try:
+        with open(filepath, 'rt') as f:
+            return f.read().lstrip()
+    except (OSError, UnicodeError) as e:
+        __logger.warning(f"loadBooks couldn't read '{os.path.basename(filepath)}': {e}")
+        return ''
+
+
+class BookFiles(Mapping):
+    """
+    The books found by loadBooks as book code: USFM text,
+        except that each book's text is only read from its file when it's asked for
+        (and not kept) so only the book being rendered needs to be in memory.
+    """
+    def __init__(self):
+        self.filepaths = {} # book code: filepath
+
+    def __getitem__(self, bookCode):
+        return readBook(self.filepaths[bookCode])
+
+    def __contains__(self, bookCode):
+        return bookCode in self.filepaths
+
+    def __iter__(self):
+        return iter(self.filepaths)
+
+    def __len__(self):
+        return len(self.filepaths)
+# end of BookFiles class
+
+
 # noinspection PyPep8Naming
 def loadBooks(path):
-    loaded_books = {}
+    """
+    Finds the USFM books in the folder by looking at the start of each file.
+
+    Returns a BookFiles mapping, i.e., the text of each book is read as it's used.
+    """
+    loaded_books = BookFiles()
     dirList = os.listdir(path)
-    __logger.debug(f"Loading all USFM book files from {path} …")
+    __logger.debug(f"Finding all USFM book files in {path} …")
     for fname in dirList:
 
         full_file_name = os.path.join(path, fname)
@@ -381,20 +446,30 @@ def loadBooks(path):
 
         # noinspection PyBroadException
         try:
-            f = open(full_file_name, 'rt')
-            usfm = f.read().lstrip()
-            if usfm[:4] == r'\id ' and usfm[4:7] in silNames:
-                # print('     Loaded ' + fname + ' as ' + usfm[4:7])
-                loaded_books[bookID(usfm)] = usfm
-                f.close()
+            book_code = sniffBookCode(full_file_name)
+            if book_code:
+                # print('     Found ' + fname + ' as ' + book_code)
+                loaded_books.filepaths[book_code] = full_file_name
             else:
                 __logger.info('Ignored ' + fname)
         except:
             __logger.warning(f"loadBooks couldn't open '{fname}'")
-    # __logger.debug(f"Finished loading {len(loaded_books)} USFM book(s).")
+    # __logger.debug(f"Finished finding {len(loaded_books)} USFM book(s).")
     return loaded_books
 
 
+# noinspection PyPep8Naming
+def bookFromUsfm(usfm):
+    """
+    Returns the (book code, USFM text) as loadBooks would load them,
+        or None if the text doesn't start with a known \\id.
+    """
+    usfm = usfm.lstrip()
+    if usfm[:4] == r'\id ' and usfm[4:7] in silNames:
+        return bookID(usfm), usfm
+    return None
+
+
 # noinspection PyPep8Naming
 def orderFor(booksDict):
     order = silNames
@@ -0,0 +1,65 @@
+"""
+Splitting a USFM book at its \\c markers
+
+Every backslash in (cleaned) USFM starts a new token,
+    so cutting the text just before a \\c marker gives exactly
+    the same tokens as parsing the whole book in one go.
+"""
+from typing import Iterable, Iterator, List, Tuple
+import re
+
+
+CHAPTER_MARKER_RE = re.compile(r'(?<!\\)\\c[ \t\r\n]') # Don't match on \ca, \cl, \cp
+VERSE_NUMBER_RE = re.compile(r'(?<!\\)\\v[ \t\r\n]+([0-9\-()]+)')
+CROSS_REFERENCE_MARKER_RE = re.compile(r'(?<!\\)\\x[ \t\r\n]') # Don't match on \x*, \xo, \xt
+
+
+def split_chapters(usfm:str) -> Tuple[str, List[str]]:
+    """
+    Returns the header (everything before the first \\c)
+        and a list of chapter texts, each one starting with its \\c marker.
+    """
+    chapter_starts = [match.start() for match in CHAPTER_MARKER_RE.finditer(usfm)]
+    if not chapter_starts:
+        return usfm, []
+    chapter_ends = chapter_starts[1:] + [len(usfm)]
+    return usfm[:chapter_starts[0]], [usfm[start:end] for start,end in zip(chapter_starts, chapter_ends)]
+# end of split_chapters function
+
+
+def read_chapters(lines:Iterable[str]) -> Iterator[str]:
+    """
+    Splits a book into the same header and chapter texts as split_chapters does
+        but reading it a line at a time (e.g., from an open file),
+        so only one chapter is ever held in memory.
+    """
+    pieces:List[str] = []
+    for line in lines:
+        start = 0
+        for match in CHAPTER_MARKER_RE.finditer(line):
+            pieces.append(line[start:match.start()])
+            yield ''.join(pieces)
+            pieces, start = [], match.start()
+        pieces.append(line[start:])
+    yield ''.join(pieces)
+# end of read_chapters function
+
+
+def last_verse_number(usfm:str) -> str:
+    """
+    Returns the number (as written) of the last \\v marker in the text,
+        or an empty string if there isn't one.
+    """
+    number = ''
+    for match in VERSE_NUMBER_RE.finditer(usfm):
+        number = match.group(1)
+    return number
+# end of last_verse_number function
+
+
+def count_cross_references(usfm:str) -> int:
+    """
+    Returns the number of \\x (cross-reference) markers in the text.
+    """
+    return len(CROSS_REFERENCE_MARKER_RE.findall(usfm))
+# end of count_cross_references function
@@ -0,0 +1,157 @@
+import json
+from collections import Counter
+
+from tx_usfm_tools.abstractRenderer import AbstractRenderer
+
+
+# The parser drops any space after a closing (character) marker
+#   so one is put back unless the text carries straight on with one of these
+NO_SPACE_BEFORE = '.,;:!?)]}’”»\'"…—'
+
+
+#
+#   Plain text of the verses (with their footnotes kept separately)
+#       so that it can be looked up without parsing any HTML
+#
+
+class JSONRenderer(AbstractRenderer):
+    """
+    Collects a dict for each chapter like
+        {"book":"ROM","chapter":"1","verses":{"1":"Paul, …",…},"footnotes":{"5":["Or set apart"]}}
+
+    It's normally given the tokens parsed for another renderer (see AbstractRenderer.addRenderer).
+    Only the verse text and footnotes are wanted,
+        so all the other (paragraph, heading, cross-reference, …) markers are ignored.
+    """
+    def __init__(self):
+        self.unknowns = Counter()
+        self.chapters = []
+        self.resetBook()
+
+
+    def resetBook(self):
+        self.bookCode = ''
+        self.chapter = None # The dict for the current chapter
+        self.verse = None # The (string) number of the current verse
+        self.verseParts = []
+        self.footnoteFlag = False
+        self.footnoteParts = []
+        self.crossReferenceFlag = False
+
+
+    def __getattr__(self, name):
+        # AbstractRenderer.run needs the AttributeError for renderBook
+        if name.startswith('render') and name != 'renderBook':
+            # The line breaks before (paragraph, poetry, etc.) markers aren't in the text tokens either
+            return self.renderClosing if name.lower().endswith('_e') else self.renderSpace
+        raise AttributeError(name)
+
+    def renderSpace(self, token):
+        self.addText(' ')
+
+    def renderClosing(self, token):
+        self.addText(None) # Becomes a space if needed (see plainText)
+
+    def renderUnknown(self, token):
+        pass
+
+
+    def closeVerse(self):
+        self.closeFootnote()
+        if self.verse is not None:
+            self.chapter['verses'][self.verse] = plainText(self.verseParts)
+        self.verse = None
+        self.verseParts = []
+
+    def closeFootnote(self):
+        if self.footnoteFlag:
+            if self.chapter is not None:
+                self.chapter['footnotes'].setdefault(self.verse or '0', []).append(plainText(self.footnoteParts))
+            self.footnoteFlag = False
+            self.footnoteParts = []
+
+
+    def renderID(self, token):
+        self.closeVerse()
+        self.resetBook()
+        self.bookCode = token.value.split()[0].upper() if token.value.split() else ''
+
+    def renderC(self, token):
+        self.closeVerse()
+        self.chapter = {'book':self.bookCode, 'chapter':token.value, 'verses':{}, 'footnotes':{}}
+        self.chapters.append(self.chapter)
+
+    def renderV(self, token):
+        self.closeVerse()
+        if self.chapter is not None:
+            self.verse = token.value
+
+    def addText(self, text):
+        if self.footnoteFlag:
+            self.footnoteParts.append(text)
+        elif self.crossReferenceFlag:
+            pass
+        elif self.verse is not None:
+            self.verseParts.append(text)
+
+    def renderText(self, token):
+        self.addText(token.value)
+
+
+    def renderF_S(self, token):
+        self.closeFootnote()
+        self.footnoteFlag = True
+    renderFE_S = renderF_S
+    def renderF_E(self, token):
+        self.closeFootnote()
+    renderFE_E = renderF_E
+
+    def renderFootnotePart(self, token):
+        if self.footnoteFlag:
+            self.footnoteParts.append(token.value)
+    renderFT_S = renderFK_S = renderFQ_S = renderFQA_S = renderFootnotePart
+    def renderFR_S(self, token):
+        pass # The footnote's own chapter:verse reference isn't wanted
+
+
+    def renderX_S(self, token):
+        self.crossReferenceFlag = True
+    def renderX_E(self, token):
+        self.crossReferenceFlag = False
+
+    def renderXT(self, token):
+        if not self.crossReferenceFlag: # Can occur not in a cross-reference
+            self.renderText(token)
+    renderPlusXT = renderXT
+
+
+    def getChapters(self):
+        """
+        Returns the chapter dicts (after finishing off the last verse).
+        """
+        self.closeVerse()
+        return self.chapters
+
+
+    def iterChapterJSON(self):
+        """
+        Yields the (zero-padded) chapter number and the compact JSON text of each chapter.
+        """
+        for chapter in self.getChapters():
+            yield chapter['chapter'].zfill(3), json.dumps(chapter, ensure_ascii=False, separators=(',', ':'))
+# end of class JSONRenderer
+
+
+def plainText(parts):
+    """
+    Joins the text parts, leaving single spaces (and ~ as a non-break space).
+    """
+    pieces = []
+    for part in parts:
+        if pieces and pieces[-1] is None: # after a closing marker
+            pieces[-1] = '' if part is None or part[:1] in NO_SPACE_BEFORE else ' '
+        pieces.append(part)
+    if pieces and pieces[-1] is None:
+        pieces.pop()
+    return ' '.join(''.join(pieces).split()).replace('~', '\N{NO-BREAK SPACE}')
+# end of plainText function
@@ -3,7 +3,9 @@ This version of parseUsfm.py appears to be used by verifyUSFM.py
     i.e., used by the USFM linter.
 """
 import sys
+import re
 import logging
+from bisect import bisect_right
 
 from pyparsing import Word, OneOrMore, nums, Literal, White, Group, \
         Suppress, NoMatch, Optional, CharsNotIn, MatchFirst
@@ -342,6 +344,14 @@ element =  MatchFirst([ide, id,
                        escape,
                        unknown])
 
+# Each element is returned as a (location, group) 2-tuple so that tokens know where they came from
+#   (the location given to the parse action is before any leading whitespace was skipped)
+def locateElement(s, loc, toks):
+    while s[loc] in ' \t\r\n':
+        loc += 1
+    return [(loc, toks[0])]
+element.setParseAction(locateElement)
+
 usfm    = OneOrMore(element)
 
 # input string
@@ -359,11 +369,57 @@ def parseString(unicodeString):
     """
     version of parseString for use in libraries
     :param unicodeString:
-    :return:
+    :return: list of tokens, each with offset and line set
+                to where the token starts in unicodeString
     """
     cleaned = clean(unicodeString)
-    tokens = usfm.parseString(cleaned, parseAll=True)
-    return [createToken(t) for t in tokens]
+    located = usfm.parseString(cleaned, parseAll=True)
+    offsets = [loc for loc, _t in located]
+    if len(cleaned) != len(unicodeString): # clean() inserted some escape characters
+        offsets = uncleanOffsets(unicodeString, cleaned, offsets)
+    tokens = []
+    line = 1
+    lastOffset = 0
+    for offset, (_loc, t) in zip(offsets, located):
+        line += unicodeString.count('\n', lastOffset, offset)
+        lastOffset = offset
+        token = createToken(t)
+        token.offset, token.line = offset, line
+        tokens.append(token)
+    return tokens
+
+
+def uncleanOffsets(unicodeString, cleaned, offsets):
+    """
+    Given the increasing offsets of tokens in the cleaned string,
+        return the corresponding offsets in the original unicodeString.
+
+    clean() only ever inserts characters (and swaps non-breaking spaces for spaces)
+        so walking along both strings together finds them.
+    """
+    result = []
+    ix = jx = 0
+    for offset in offsets:
+        while jx < offset:
+            if ix < len(unicodeString) \
+            and (unicodeString[ix] == cleaned[jx] or (unicodeString[ix] == '\xa0' and cleaned[jx] == ' ')):
+                ix += 1
+            jx += 1
+        result.append(min(ix, len(unicodeString)))
+    return result
+
+
+class LineIndex:
+    """
+    Converts offsets in a text into 1-based (line, column) positions.
+    """
+    def __init__(self, text):
+        self.lineStarts = [0] + [match.end() for match in re.finditer('\n', text)]
+
+    def lineColumn(self, offset):
+        line = bisect_right(self.lineStarts, offset)
+        return line, offset - self.lineStarts[line-1] + 1
+# end of LineIndex class
 
 
 def clean(unicodeString):
@@ -388,184 +444,20 @@ def clean(unicodeString):
 
 
 def createToken(t):
-    options = {
-        'id':   IDToken,
-        'ide':  IDEToken,
-        'usfm': USFMVersionToken,
-        'h':    HToken,
-
-        'mt':   MTToken,
-        'mt1':  MT1Token,
-        'mt2':  MT2Token,
-        'mt3':  MT3Token,
-
-        'ms':   MSToken,
-        'ms1':  MS1Token,
-        'ms2':  MS2Token,
-
-        'mr':   MRToken,
-        'p':    PToken,
-        'pc':   PCToken,
-        'pm':   PMToken,
-
-        'pi':   PIToken,
-        'pi1':  PI1Token,
-        'pi2':  PI2Token,
-
-        'b':    BToken,
-
-        's':    SToken,
-        's1':   S1Token,
-        's2':   S2Token,
-        's3':   S3Token,
-        's4':   S4Token,
-
-        's5':   S5Token,
-
-        'periph': PeriphToken,
-
-        'sr':   SRToken,
-        'sts':  STSToken,
-        'mi':   MIToken,
-        'r':    RToken,
-        'c':    CToken,
-        'ca':   CAStartToken, 'ca*':  CAEndToken,
-        'cl':   CLToken,
-        'v':    VToken,
-        'va':   VAStartToken, 'va*':  VAEndToken,
-
-        'q':    QToken,
-        'q1':   Q1Token,
-        'q2':   Q2Token,
-        'q3':   Q3Token,
-        'q4':   Q4Token,
-
-        'qa':   QAToken,
-        'qac':  QACToken,
-        'qc':   QCToken,
-        'qm':   QMToken,
-        'qm1':  QM1Token,
-        'qm2':  QM2Token,
-        'qm3':  QM3Token,
-        'qr':   QRToken,
-        'qs':   QSStartToken,
-        'qs*':  QSEndToken,
-        'qt':   QTStartToken,
-        'qt*':  QTEndToken,
-        'nb':   NBToken,
-        'f':    FStartToken,
-        'fe':   FEStartToken,  # Footnote intended as an end note
-        'fr':   FRToken, 'fr*':  FREndToken,
-        'fk':   FKToken, 'fk*':  FKEndToken,
-        'ft':   FTToken, 'ft*':  FTEndToken,
-        'fq':   FQToken, 'fq*':  FQEndToken,
-        'fqa':  FQAToken, 'fqa*': FQAEndToken,
-        # 'fqb':  FQAEndToken,
-        'f*':   FEndToken,
-        'fe*':  FEEndToken,
-        'fv':   FVStartToken, 'fv*':  FVEndToken,
-        'fdc':  FDCStartToken, 'fdc*': FDCEndToken,
-        'fp':   FPToken,
-        'x':    XStartToken,
-        'xdc':  XDCStartToken, 'xdc*': XDCEndToken,
-        'xo':   XOToken,
-        'xt':   XTToken, 'xt*': XTEndToken,
-        '+xt':  plusXTToken, '+xt*': plusXTEndToken,
-        'x*':   XEndToken,
-        'it':   ITStartToken, 'it*':  ITEndToken,
-        'em':   EMStartToken, 'em*':  EMEndToken,
-        'bd':   BDStartToken, 'bd*':  BDEndToken,
-        'bdit': BDITStartToken, 'bdit*': BDITEndToken,
-
-        'li':   LIToken,
-        'li1':  LI1Token,
-        'li2':  LI2Token,
-        'li3':  LI3Token,
-        'li4':  LI4Token,
-
-        'd':    DToken,
-        'sp':   SPToken,
-        # 'i*':   IEndToken,
-        'add':  ADDStartToken, 'add*': ADDEndToken,
-        'nd':   NDStartToken, 'nd*':  NDEndToken,
-        'sc':   SCStartToken, 'sc*':  SCEndToken,
-        'k':    KStartToken, 'k*':  KEndToken,
-        'tl':   TLStartToken, 'tl*':  TLEndToken,
-        'wj':   WJStartToken, 'wj*':  WJEndToken,
-        'm':    MToken,
-        '\\\\': EscapedToken,
-        'rem':  REMToken,
-
-        'tr':   TRToken,
-        'th1':  TH1Token,
-        'th2':  TH2Token,
-        'th3':  TH3Token,
-        'th4':  TH4Token,
-        'th5':  TH5Token,
-        'th6':  TH6Token,
-        'thr1': THR1Token,
-        'thr2': THR2Token,
-        'thr3': THR3Token,
-        'thr4': THR4Token,
-        'thr5': THR5Token,
-        'thr6': THR6Token,
-        'tc1':  TC1Token,
-        'tc2':  TC2Token,
-        'tc3':  TC3Token,
-        'tc4':  TC4Token,
-        'tc5':  TC5Token,
-        'tc6':  TC6Token,
-        'tcr1': TCR1Token,
-        'tcr2': TCR2Token,
-        'tcr3': TCR3Token,
-        'tcr4': TCR4Token,
-        'tcr5': TCR5Token,
-        'tcr6': TCR6Token,
-
-        'toc1': TOC1Token,
-        'toc2': TOC2Token,
-        'toc3': TOC3Token,
-
-        'is':   ISToken,
-        'is1':  IS1Token,
-        'is2':  IS2Token,
-        'is3':  IS3Token,
-
-        'ili':  ILIToken,
-
-        'imt':  IMTToken,
-        'imt1': IMT1Token,
-        'imt2': IMT2Token,
-        'imt3': IMT3Token,
-
-        'ie':   IEToken,
-        'ip':   IPToken,
-        'ipi':  IPIToken,
-        'im':   IMToken,
-        'imi':  IMIToken,
-        'iot':  IOTToken,
-        'io':   IOToken,
-        'io1':  IO1Token,
-        'io2':  IO2Token,
-        'ior':  IORStartToken, 'ior*': IOREndToken,
-        'bk':   BKStartToken, 'bk*':  BKEndToken,
-        'text': TEXTToken,
-        'unknown': UnknownToken
-    }
-    for k, v in options.items():
-        if t[0] == k:
-            if len(t) == 1:
-                token = v()
-            else:
-                token = v(t[1])
-            token.type = k
-            return token
-    raise Exception(t[0])
+    tokenClass = TOKEN_CLASSES.get(t[0])
+    if tokenClass is None:
+        raise Exception(t[0])
+    token = tokenClass() if len(t) == 1 else tokenClass(t[1])
+    token.type = t[0]
+    return token
 
 
 
 # noinspection PyMethodMayBeStatic
 class UsfmToken:
+    offset = None # Where the token starts in the parsed text (set by parseString)
+    line = None # 1-based line number of offset
+
     def __init__(self, value=''):
         self.value = value
         self.type = None
@@ -1392,3 +1284,184 @@ class BKStartToken(UsfmToken):
 class BKEndToken(UsfmToken):
     def renderOn(self, printer):  return printer.render_bk_e(self)
     def is_bk_e(self):            return True
+
+
+TOKEN_CLASSES = { # Token type (i.e., marker) to token class
+    'id':   IDToken,
+    'ide':  IDEToken,
+    'usfm': USFMVersionToken,
+    'h':    HToken,
+
+    'mt':   MTToken,
+    'mt1':  MT1Token,
+    'mt2':  MT2Token,
+    'mt3':  MT3Token,
+
+    'ms':   MSToken,
+    'ms1':  MS1Token,
+    'ms2':  MS2Token,
+
+    'mr':   MRToken,
+    'p':    PToken,
+    'pc':   PCToken,
+    'pm':   PMToken,
+
+    'pi':   PIToken,
+    'pi1':  PI1Token,
+    'pi2':  PI2Token,
+
+    'b':    BToken,
+
+    's':    SToken,
+    's1':   S1Token,
+    's2':   S2Token,
+    's3':   S3Token,
+    's4':   S4Token,
+
+    's5':   S5Token,
+
+    'periph': PeriphToken,
+
+    'sr':   SRToken,
+    'sts':  STSToken,
+    'mi':   MIToken,
+    'r':    RToken,
+    'c':    CToken,
+    'ca':   CAStartToken, 'ca*':  CAEndToken,
+    'cl':   CLToken,
+    'v':    VToken,
+    'va':   VAStartToken, 'va*':  VAEndToken,
+
+    'q':    QToken,
+    'q1':   Q1Token,
+    'q2':   Q2Token,
+    'q3':   Q3Token,
+    'q4':   Q4Token,
+
+    'qa':   QAToken,
+    'qac':  QACToken,
+    'qc':   QCToken,
+    'qm':   QMToken,
+    'qm1':  QM1Token,
+    'qm2':  QM2Token,
+    'qm3':  QM3Token,
+    'qr':   QRToken,
+    'qs':   QSStartToken,
+    'qs*':  QSEndToken,
+    'qt':   QTStartToken,
+    'qt*':  QTEndToken,
+    'nb':   NBToken,
+    'f':    FStartToken,
+    'fe':   FEStartToken,  # Footnote intended as an end note
+    'fr':   FRToken, 'fr*':  FREndToken,
+    'fk':   FKToken, 'fk*':  FKEndToken,
+    'ft':   FTToken, 'ft*':  FTEndToken,
+    'fq':   FQToken, 'fq*':  FQEndToken,
+    'fqa':  FQAToken, 'fqa*': FQAEndToken,
+    # 'fqb':  FQAEndToken,
+    'f*':   FEndToken,
+    'fe*':  FEEndToken,
+    'fv':   FVStartToken, 'fv*':  FVEndToken,
+    'fdc':  FDCStartToken, 'fdc*': FDCEndToken,
+    'fp':   FPToken,
+    'x':    XStartToken,
+    'xdc':  XDCStartToken, 'xdc*': XDCEndToken,
+    'xo':   XOToken,
+    'xt':   XTToken, 'xt*': XTEndToken,
+    '+xt':  plusXTToken, '+xt*': plusXTEndToken,
+    'x*':   XEndToken,
+    'it':   ITStartToken, 'it*':  ITEndToken,
+    'em':   EMStartToken, 'em*':  EMEndToken,
+    'bd':   BDStartToken, 'bd*':  BDEndToken,
+    'bdit': BDITStartToken, 'bdit*': BDITEndToken,
+
+    'li':   LIToken,
+    'li1':  LI1Token,
+    'li2':  LI2Token,
+    'li3':  LI3Token,
+    'li4':  LI4Token,
+
+    'd':    DToken,
+    'sp':   SPToken,
+    # 'i*':   IEndToken,
+    'add':  ADDStartToken, 'add*': ADDEndToken,
+    'nd':   NDStartToken, 'nd*':  NDEndToken,
+    'sc':   SCStartToken, 'sc*':  SCEndToken,
+    'k':    KStartToken, 'k*':  KEndToken,
+    'tl':   TLStartToken, 'tl*':  TLEndToken,
+    'wj':   WJStartToken, 'wj*':  WJEndToken,
+    'm':    MToken,
+    '\\\\': EscapedToken,
+    'rem':  REMToken,
+
+    'tr':   TRToken,
+    'th1':  TH1Token,
+    'th2':  TH2Token,
+    'th3':  TH3Token,
+    'th4':  TH4Token,
+    'th5':  TH5Token,
+    'th6':  TH6Token,
+    'thr1': THR1Token,
+    'thr2': THR2Token,
+    'thr3': THR3Token,
+    'thr4': THR4Token,
+    'thr5': THR5Token,
+    'thr6': THR6Token,
+    'tc1':  TC1Token,
+    'tc2':  TC2Token,
+    'tc3':  TC3Token,
+    'tc4':  TC4Token,
+    'tc5':  TC5Token,
+    'tc6':  TC6Token,
+    'tcr1': TCR1Token,
+    'tcr2': TCR2Token,
+    'tcr3': TCR3Token,
+    'tcr4': TCR4Token,
+    'tcr5': TCR5Token,
+    'tcr6': TCR6Token,
+
+    'toc1': TOC1Token,
+    'toc2': TOC2Token,
+    'toc3': TOC3Token,
+
+    'is':   ISToken,
+    'is1':  IS1Token,
+    'is2':  IS2Token,
+    'is3':  IS3Token,
+
+    'ili':  ILIToken,
+
+    'imt':  IMTToken,
+    'imt1': IMT1Token,
+    'imt2': IMT2Token,
+    'imt3': IMT3Token,
+
+    'ie':   IEToken,
+    'ip':   IPToken,
+    'ipi':  IPIToken,
+    'im':   IMToken,
+    'imi':  IMIToken,
+    'iot':  IOTToken,
+    'io':   IOToken,
+    'io1':  IO1Token,
+    'io2':  IO2Token,
+    'ior':  IORStartToken, 'ior*': IOREndToken,
+    'bk':   BKStartToken, 'bk*':  BKEndToken,
+    'text': TEXTToken,
+    'unknown': UnknownToken
+}
+
+
+class TokenClassTable(dict):
+    """
+    Maps each token class to compute(sampleToken),
+        computed the first time that class is looked up,
+        so that the per-token work becomes a single dictionary lookup.
+    """
+    def __init__(self, compute):
+        super().__init__()
+        self.compute = compute
+
+    def __missing__(self, tokenClass):
+        value = self[tokenClass] = self.compute(tokenClass())
+        return value
@@ -0,0 +1,154 @@
+"""
+Chapter:verse references in USFM, i.e., in \\x cross-references and in footnote origins
+
+parseReferences splits the text of a \\xt field into its references
+    (e.g., 'Acts 9:15; 22:21; Galatians 1:15-16'),
+    and ReferenceChecker checks all of the references in a book
+    against the versification (see versification.Versification.hasVerse).
+"""
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+import re
+
+from tx_usfm_tools.books import bookNames, readerNames, silNames
+from tx_usfm_tools.versification import Versification, getVersification
+
+
+# A book name (optional), chapter and verse (or verse range) at the start of a reference
+REFERENCE_RE = re.compile(r'(?:((?:[1-3] )?\w{2,16}) )?(\d{1,3}):(\d{1,3})(?:[-–](\d{1,3}))?')
+# The space after the book number in a name, e.g., '1 Cor'
+BOOK_NUMBER_SPACE_RE = re.compile(r'^([1-3]) ')
+# A chapter and verse anywhere in a footnote or cross-reference origin, e.g., '1:5' or '1.5'
+ORIGIN_RE = re.compile(r'(\d{1,3})[:.](\d{1,3})')
+# The markers that the checker needs: chapters, verses, origins and cross-reference targets
+REFERENCE_MARKER_RE = re.compile(r'\\c\s+(\d+)|\\v\s+(\d+)|\\(fr|xo)\s+([^\\]*)|\\\+?xt\s+([^\\]*)')
+
+
+class Reference(NamedTuple):
+    text:str # as written (without the separators)
+    bookCode:Optional[str] # None if the book name isn't recognised
+    chapter:int
+    verse:int
+    lastVerse:int # same as verse if it's not a range
+
+
+def normaliseBookName(name:str) -> str:
+    """
+    Ignores case, full stops, and spaces after the book number, e.g., '1Cor.' is the same as '1 cor'.
+    """
+    return BOOK_NUMBER_SPACE_RE.sub(r'\1', ' '.join(name.replace('.', ' ').split())).lower()
+
+
+def _buildBookNameIndexes() -> Tuple[Dict[str,int],Dict[str,int],Dict[str,int]]:
+    """
+    Returns dicts (from exact names, normalised names, and parts of names)
+        to the index into books.bookNames.
+
+    Where more than one book matches, the first one (in bookNames then readerNames) is kept.
+    """
+    exactNames:Dict[str,int] = {}
+    normalisedNames:Dict[str,int] = {}
+    partialNames:Dict[str,int] = {}
+    for names in (bookNames, readerNames):
+        for ix, bookName in enumerate(names):
+            exactNames.setdefault(bookName, ix)
+            normalisedNames.setdefault(normaliseBookName(bookName), ix)
+    for names in (bookNames, readerNames):
+        for ix, bookName in enumerate(names):
+            for start in range(len(bookName)):
+                for end in range(start+1, len(bookName)+1):
+                    partialNames.setdefault(bookName[start:end], ix)
+    return exactNames, normalisedNames, partialNames
+# end of _buildBookNameIndexes function
+
+EXACT_BOOK_NAMES, NORMALISED_BOOK_NAMES, PARTIAL_BOOK_NAMES = _buildBookNameIndexes()
+# The (Door43) filename without the extension for each book, e.g., 41-MAT
+#   (the NT books are numbered from 41)
+BOOK_FILEBASES = {bookCode: f'{str(ix if ix < silNames.index("MAT") else ix+1).zfill(2)}-{bookCode}'
+                    for ix, bookCode in enumerate(silNames)}
+
+
+def findBookIndex(name:str, exact:bool=False) -> Optional[int]:
+    """
+    Returns the index into books.bookNames of the book with the given (English) name or abbreviation,
+        or None if it's not recognised.
+
+    Unless exact is set, part of a name is also accepted (e.g., 'Corinthians').
+    """
+    ix = EXACT_BOOK_NAMES.get(name)
+    if ix is None:
+        ix = NORMALISED_BOOK_NAMES.get(normaliseBookName(name))
+        if ix is None and not exact:
+            ix = PARTIAL_BOOK_NAMES.get(name)
+    return ix
+# end of findBookIndex function
+
+
+def findBookCode(name:str, exact:bool=False) -> Optional[str]:
+    ix = findBookIndex(name, exact)
+    return None if ix is None else silNames[ix+1]
+
+
+def parseReferences(text:str, bookCode:Optional[str]=None, exact:bool=False) -> Iterator[Optional[Reference]]:
+    """
+    Yields a Reference for each semicolon-separated part of the text that starts with one,
+        or None for a part that doesn't.
+
+    A reference without a book name is taken to be in the same book as the one before it
+        (or in the given book for the first one).
+    """
+    for part in text.split(';'):
+        match = REFERENCE_RE.match(part.strip())
+        if not match:
+            yield None
+            continue
+        name, chapter, verse, lastVerse = match.groups()
+        if name:
+            bookCode = findBookCode(name, exact)
+        yield Reference(match.group(), bookCode, int(chapter), int(verse), int(lastVerse) if lastVerse else int(verse))
+# end of parseReferences function
+
+
+class ReferenceChecker:
+    """
+    Checks the footnote and cross-reference origins (\\fr and \\xo)
+        and the cross-reference targets (\\xt) in a book
+        against the versification.
+
+    The book text can be given all at once or in parts (e.g., chapter by chapter).
+    References to books that aren't recognised (by their exact English name or abbreviation),
+        or aren't in the versification, aren't checked.
+    """
+    def __init__(self, bookCode:str, versification:Optional[str]=None) -> None:
+        self.bookCode = bookCode
+        self.versification:Versification = getVersification(versification)
+        self.C = self.V = '0'
+
+    def check(self, text:str) -> List[str]:
+        """
+        Returns the warnings for the next part of the book.
+        """
+        warnings = []
+        for match in REFERENCE_MARKER_RE.finditer(text):
+            chapter, verse, originMarker, origin, targets = match.groups()
+            if chapter:
+                self.C, self.V = chapter, '0'
+            elif verse:
+                self.V = verse
+            elif originMarker:
+                origin = origin.strip()
+                originMatch = ORIGIN_RE.search(origin)
+                if originMatch and not self.exists(self.bookCode, int(originMatch.group(1)), int(originMatch.group(2))):
+                    kind = 'Footnote' if originMarker == 'fr' else 'Cross-reference'
+                    warnings.append(f"{self.bookCode} {self.C}:{self.V} - {kind} origin isn't a valid verse: '{origin}'")
+            else:
+                for reference in parseReferences(targets, self.bookCode, exact=True):
+                    if reference and (not self.exists(reference.bookCode, reference.chapter, reference.verse)
+                                   or not self.exists(reference.bookCode, reference.chapter, reference.lastVerse)):
+                        warnings.append(f"{self.bookCode} {self.C}:{self.V} - Cross-reference to nonexistent verse: '{reference.text}'")
+        return warnings
+
+    def exists(self, bookCode:Optional[str], chapter:int, verse:int) -> bool:
+        if not bookCode or not self.versification.nChapters(bookCode):
+            return True # Can't tell
+        return self.versification.hasVerse(bookCode, chapter, verse)
+# end of ReferenceChecker class
@@ -1,22 +1,106 @@
 import logging
+import os
 import re
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 
 from tx_usfm_tools.abstractRenderer import AbstractRenderer
-from tx_usfm_tools.books import bookKeys, bookNames, silNames, readerNames, bookKeyForIdValue
+from tx_usfm_tools.books import bookKeys, bookNames, bookKeyForIdValue, bookID, bookFromUsfm
 from tx_usfm_tools.parseUsfm import UsfmToken
+from tx_usfm_tools.alignment import strip_alignment
+from tx_usfm_tools.chapters import split_chapters, last_verse_number, count_cross_references
+from tx_usfm_tools.references import parseReferences, BOOK_FILEBASES
+from tx_usfm_tools.versification import getVersification
+from tx_usfm_tools.token_profile import newProfile
+
+
+# Smaller books aren't worth starting up a process pool for
+PARALLEL_CHAPTERS_MIN_LENGTH = 50_000 # characters
+
+# Renderer fields that can carry over from one chapter into the next
+CHAPTER_STATE_FIELDS = ('current_bookname', 'bookName', 'chapterLabel',
+                        'current_chapter_number_string', 'current_verse_number_string',
+                        'inParagraph', 'indentFlag', 'listItemLevel', 'inTable', 'inTableRow',
+                        'footnoteFlag', 'emFlag', 'footnotes', 'footnote_id', 'footnote_num', 'footnote_parts',
+                        'crossReferenceFlag', 'crossReferences', 'crossReference_id', 'crossReference_num',
+                        'crossReference_origin', 'crossReference_parts')
+# renderC sets these before anything can read them
+CHAPTER_STATE_OVERWRITTEN_FIELDS = ('current_chapter_number_string', 'footnote_num')
+
+workerStructureIndex = None # Set in each worker process by setWorkerStructureIndex
+
+PAGE_END = '\n    </body>\n</html>\n'
+# Sends links to chapters (or verses) that used to be on the book page to the right chapter page
+CHAPTER_REDIRECT_SCRIPT = """
+<script>
+var chapterPages = {%s};
+var chapterMatch = /-ch-(\\w+)/.exec(window.location.hash);
+if (chapterMatch && chapterPages[chapterMatch[1]]) window.location.replace(chapterPages[chapterMatch[1]] + window.location.hash);
+</script>
+"""
+
+
+class HtmlChunks(list):
+    """
+    Append-only output buffer for the renderer (in place of a file or StringIO).
+
+    The ~ (non-break space) in the text is only escaped once, when the whole page is joined.
+    """
+    write = list.append
+
+    def getvalue(self, start=0, end=None):
+        return ''.join(self[start:end]).replace('~', '&nbsp;')
+# end of HtmlChunks class
+
+
+def setWorkerStructureIndex(structureIndex):
+    global workerStructureIndex
+    workerStructureIndex = structureIndex
+
+
+def renderChapter(chapterUsfm, entryState, isLastChapter):
+    """
+    Runs in a worker process: tokenizes and renders one chapter
+        starting from the given renderer state.
+
+    Returns the html, the tokens (in case the chapter has to be rendered again),
+        the state at the end of the chapter, any warnings and unknown markers,
+        and the token profile (if profiling).
+    """
+    renderer = SingleHTMLRenderer(None, None, structureIndex=workerStructureIndex)
+    renderer.f = HtmlChunks()
+    renderer.unknowns = Counter()
+    renderer.profile = newProfile('render')
+    renderer.setChapterState(entryState)
+    warning_list = []
+    tokens = renderer.parseBook(chapterUsfm)
+    renderer.renderTokens(tokens, warning_list)
+    if not isLastChapter:
+        renderer.closeChapter()
+    return ''.join(renderer.f), tokens, renderer.getChapterState(), warning_list, renderer.unknowns, renderer.profile
+# end of renderChapter function
+
 
 #
 #   Simplest renderer. Ignores everything except ascii text.
 #
 
 class SingleHTMLRenderer(AbstractRenderer):
-    def __init__(self, inputDir, outputFilename):
+    def __init__(self, inputDir, outputFilename, chapterWorkers=0, structureIndex=None):
         # logging.debug(f"SingleHTMLRenderer.__init__( {inputDir}, {outputFilename} ) …")
         # Unset
-        self.f = None  # output file stream
+        self.f = None  # output chunks (see HtmlChunks)
+        self.headerEnd = None # index in self.f after the page header
+        self.chapterStarts = [] # (index in self.f, chapter number string) for each chapter
         # IO
         self.outputFilename = outputFilename
         self.inputDir = inputDir
+        # If more than one, large books are rendered chapter by chapter in a process pool
+        self.chapterWorkers = chapterWorkers
+        # From the USFM linter (if available) so the chapters and verses are already known
+        self.structureIndex = structureIndex
+        self.rerenderedChapters = 0 # where the guessed starting state (see renderUsfm) was wrong
+        self.versification = getVersification() # for cross-reference links if there's no structure index
         self.resetBook()
 
 
@@ -36,7 +120,7 @@ class SingleHTMLRenderer(AbstractRenderer):
         self.footnotes = {}
         self.footnote_id = ''
         self.footnote_num = 1
-        self.footnote_text = ''
+        self.footnote_parts = [] # joined when the footnote is closed
 
         # TODO: This isn't finished
         self.crossReferenceFlag = False
@@ -44,24 +128,221 @@ class SingleHTMLRenderer(AbstractRenderer):
         self.crossReference_id = ''
         self.crossReference_num = 1
         self.crossReference_origin = ''
-        self.crossReference_text = ''
+        self.crossReference_parts = []
 
         self.inTable = False
         self.inTableRow = False
 
 
+    def getChapterState(self):
+        return {field:getattr(self, field) for field in CHAPTER_STATE_FIELDS}
+
+    def setChapterState(self, state):
+        for field in CHAPTER_STATE_FIELDS:
+            setattr(self, field, state[field])
+
+
+    def renderUsfm(self, usfm, warning_list):
+        """
+        If enabled, parses and renders the chapters of a large book in a process pool.
+
+        Each chapter (except the first) is rendered speculatively,
+            assuming that it starts from the same state as it would if the previous chapter
+            had no open cross-references or table rows at its end
+            (and that every earlier \\x marker has been numbered).
+        That assumption is then checked in chapter order,
+            and any chapter where it was wrong is rendered again here
+            (reusing its tokens) from the correct state.
+        """
+        if self.chapterWorkers < 2 or len(usfm) < PARALLEL_CHAPTERS_MIN_LENGTH:
+            super().renderUsfm(usfm, warning_list)
+            return
+        header, chapters = self.splitChapters(usfm)
+        if len(chapters) < 2:
+            super().renderUsfm(usfm, warning_list)
+            return
+
+        self.renderTokens(self.parseBook(header), warning_list)
+        actualState = self.getChapterState()
+        entryStates = [actualState]
+        for chapterUsfm in chapters[:-1]:
+            entryState = dict(entryStates[-1])
+            entryState['current_verse_number_string'] = last_verse_number(chapterUsfm).zfill(3) \
+                                        or entryState['current_verse_number_string']
+            entryState['crossReference_num'] += count_cross_references(chapterUsfm)
+            entryState.update(inParagraph=False, indentFlag=False, listItemLevel=0,
+                                inTable=False, inTableRow=False, footnoteFlag=False, emFlag=False,
+                                footnotes={}, footnote_id='', footnote_parts=[],
+                                crossReferenceFlag=False, crossReferences={}, crossReference_id='',
+                                crossReference_origin='', crossReference_parts=[])
+            entryStates.append(entryState)
+        lastFlags = [False] * (len(chapters)-1) + [True]
+
+        with ProcessPoolExecutor(max_workers=self.chapterWorkers,
+                        initializer=setWorkerStructureIndex, initargs=(self.structureIndex,)) as executor:
+            results = executor.map(renderChapter, chapters, entryStates, lastFlags)
+            for entryState, isLastChapter, (html, tokens, exitState, chapterWarnings, chapterUnknowns, chapterProfile) \
+                                                in zip(entryStates, lastFlags, results):
+                if all(entryState[field] == actualState[field] for field in CHAPTER_STATE_FIELDS
+                                                    if field not in CHAPTER_STATE_OVERWRITTEN_FIELDS):
+                    self.chapterStarts.append((len(self.f), exitState['current_chapter_number_string']))
+                    self.f.write(html)
+                    for renderer in self.extraRenderers:
+                        renderer.renderTokens(tokens, warning_list)
+                    warning_list.extend(chapterWarnings)
+                    self.unknowns.update(chapterUnknowns)
+                    if self.profile is not None and chapterProfile is not None:
+                        self.profile.update(chapterProfile)
+                    actualState = exitState
+                else: # The guess was wrong so render it again from the correct state
+                    self.rerenderedChapters += 1
+                    self.setChapterState(actualState)
+                    self.renderTokens(tokens, warning_list)
+                    if not isLastChapter:
+                        self.closeChapter()
+                    actualState = self.getChapterState()
+        self.setChapterState(actualState)
+    # end of renderUsfm function
+
+
+    def splitChapters(self, usfm):
+        """
+        Returns the header and the list of chapter texts,
+            using the structure index if it has this book.
+
+        The index cuts the original text, leaving the alignment to be stripped
+            from each part as it's tokenized (it never spans a \\c marker).
+        """
+        bookStructure = self.structureIndex.getBook(bookID(usfm)) if self.structureIndex else None
+        parts = bookStructure.splitChapters(usfm) if bookStructure else None
+        if parts is None: # Find the \c markers ourselves
+            stripped_usfm, _offset_map = strip_alignment(usfm) # Done once here for the whole book
+            parts = split_chapters(stripped_usfm)
+        return parts
+    # end of splitChapters function
+
+
     def render(self):
         # logging.debug("SingleHTMLRenderer.render() …")
         self.loadUSFM(self.inputDir) # Result is in self.booksUsfm
         #print(f"About to render USFM ({len(self.booksUsfm)} books): {str(self.booksUsfm)[:300]} …")
-        with open(self.outputFilename, 'wt', encoding='utf-8') as self.f:
-            warning_list = self.run()
-            self.writeFootnotes()
-            self.writeCrossReferences()
-            self.f.write('\n    </body>\n</html>\n')
+        html, warning_list = self.renderHtml()
+        with open(self.outputFilename, 'wt', encoding='utf-8') as output_file:
+            output_file.write(html)
+        return warning_list
+
+
+    def renderString(self, usfm):
+        """
+        Renders the USFM text of one book (rather than the books in inputDir).
+
+        Returns the HTML and the warnings.
+        """
+        book = bookFromUsfm(usfm)
+        self.booksUsfm = dict([book]) if book else {}
+        return self.renderHtml()
+
+
+    def renderStringPages(self, usfm, pageFilebase, maxPageLength=0):
+        """
+        Renders the USFM text of one book as an index page and pages of chapters
+            (see renderPages).
+        """
+        book = bookFromUsfm(usfm)
+        self.booksUsfm = dict([book]) if book else {}
+        return self.renderPages(pageFilebase, maxPageLength)
+
+
+    def renderTo(self, outputStream):
+        """
+        Renders the loaded books as one HTML page to the given (text) stream.
+        """
+        html, warning_list = self.renderHtml()
+        outputStream.write(html)
+        return warning_list
+
+
+    def renderHtml(self):
+        """
+        Renders the loaded books as one HTML page.
+
+        Returns the HTML and the warnings.
+        """
+        warning_list = self.renderChunks()
+        self.f.write(PAGE_END)
+        html = self.f.getvalue()
+        self.f = None
+        return html, warning_list
+
+
+    def renderChunks(self):
+        """
+        Renders the loaded books into self.f (leaving the page unfinished).
+
+        Returns the warnings.
+        """
+        self.f = HtmlChunks()
+        self.headerEnd = None
+        self.chapterStarts = []
+        warning_list = self.run()
+        self.writeFootnotes()
+        self.writeCrossReferences()
         return warning_list
 
 
+    def renderPages(self, pageFilebase, maxPageLength=0):
+        """
+        Renders the loaded book as a small index page (with the introduction)
+            and pages of whole chapters -- one chapter per page,
+            or as many as fit into maxPageLength characters.
+        Each page has its own footnotes and cross-references
+            as they're written at the end of each chapter.
+
+        Returns an iterator of (filename, html) for the pages (starting with pageFilebase.html)
+            and the warnings.
+        A book that doesn't divide into more than one page is rendered as a single page.
+        """
+        warning_list = self.renderChunks()
+        chunks, chapterStarts, headerEnd = self.f, self.chapterStarts, self.headerEnd
+        self.f = None
+
+        pages = [] # [start, end, chapter number strings]
+        chapterEnds = [start for start, _number in chapterStarts[1:]] + [len(chunks)]
+        if headerEnd is not None and chapterStarts and chapterStarts[0][0] >= headerEnd:
+            pageLength = 0
+            for (start, number), end in zip(chapterStarts, chapterEnds):
+                chapterLength = sum(len(chunk) for chunk in chunks[start:end])
+                if pages and maxPageLength and pageLength + chapterLength <= maxPageLength:
+                    pages[-1][1] = end
+                    pages[-1][2].append(number)
+                    pageLength += chapterLength
+                else:
+                    pages.append([start, end, [number]])
+                    pageLength = chapterLength
+
+        def iterPages():
+            if len(pages) < 2:
+                chunks.write(PAGE_END)
+                yield f'{pageFilebase}.html', chunks.getvalue()
+                return
+            chapterPages = {number:f'{pageFilebase}-{numbers[0]}.html'
+                                                for _start, _end, numbers in pages for number in numbers}
+            index = [chunks.getvalue(0, pages[0][0]), '\n\n<ul class="chapter-pages">']
+            for number, filename in chapterPages.items():
+                index.append(f'\n<li><a href="{filename}#{self.current_bookname}-ch-{number}">'
+                             f'{self.chapterLabel} {number.lstrip("0") or number}</a></li>')
+            index.append('\n</ul>\n')
+            index.append(CHAPTER_REDIRECT_SCRIPT % ', '.join(f'"{number}": "{filename}"'
+                                                    for number, filename in chapterPages.items()))
+            index.append(PAGE_END)
+            yield f'{pageFilebase}.html', ''.join(index)
+            header = chunks.getvalue(0, headerEnd)
+            for start, end, numbers in pages:
+                yield chapterPages[numbers[0]], header + chunks.getvalue(start, end) + PAGE_END
+        return iterPages(), warning_list
+    # end of renderPages function
+
+
     def writeHeader(self):
         h = """
 <!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.0 Strict//EN" "http://www.w3.org/TR/xhtml1/DTD/xhtml1-strict.dtd">
@@ -115,6 +396,7 @@ class SingleHTMLRenderer(AbstractRenderer):
 <h1>""" + self.bookName + """</h1>
 """
         self.f.write(h)
+        self.headerEnd = len(self.f)
 
     def startLI(self, level=1):
         # if 'NUM' in self.bookName and '00' in self.current_chapter_number_string: logging.debug(f"@{self.current_chapter_number_string}:{self.current_verse_number_string} startLI({level})…")
@@ -133,11 +415,8 @@ class SingleHTMLRenderer(AbstractRenderer):
             self.listItemLevel -= 1
         assert self.listItemLevel == 0
 
-    def escape(self, s):
-        return s.replace('~', '&nbsp;')
-
     def write(self, unicodeString):
-        self.f.write(unicodeString.replace('~', '&nbsp;'))
+        self.f.write(unicodeString) # ~ is escaped when the output is joined
 
     def writeIndent(self, level):
         assert level > 0
@@ -223,6 +502,18 @@ class SingleHTMLRenderer(AbstractRenderer):
             logging.error("Got \\cl field after \\c — could produce duplicate chapter numbers!!!")
             self.write(f'\n\n<h2 id="{self.current_bookname}-ch-{self.current_chapter_number_string}" class="c-num">{token.value}</h2>')
 
+    def closeChapter(self):
+        """
+        Close off everything still open at the end of a chapter
+            (after the book header has been written).
+        """
+        if self.bookName:
+            self.closeFootnote()
+            self.stopLI()
+            self.closeParagraph()
+            self.writeFootnotes()
+            self.writeCrossReferences()
+
     def renderC(self, token):
         self.closeFootnote()
         if not self.bookName: # i.e., there was no \h or \toc2 field in the USFM
@@ -230,12 +521,10 @@ class SingleHTMLRenderer(AbstractRenderer):
             self.bookName = bookNames[int(self.current_bookname)-1]
             logging.warning(f"Used '{self.bookName}' as book name (due to missing \\h and \\toc2 fields)")
             self.writeHeader()
-        self.stopLI()
-        self.closeParagraph()
-        self.writeFootnotes()
-        self.writeCrossReferences()
+        self.closeChapter()
         self.footnote_num = 1
         self.current_chapter_number_string = token.value.zfill(3)
+        self.chapterStarts.append((len(self.f), self.current_chapter_number_string))
         self.write(f'\n\n<h2 id="{self.current_bookname}-ch-{self.current_chapter_number_string}" class="c-num">{self.chapterLabel} {token.value}</h2>')
     def renderCA_S(self, token):
         assert not token.value
@@ -586,7 +875,7 @@ class SingleHTMLRenderer(AbstractRenderer):
 
 
     def renderF_S(self, token):
-        # print(f"renderF_S({token.value}) with {self.footnoteFlag} and '{self.footnote_text}'")
+        # print(f"renderF_S({token.value}) with {self.footnoteFlag} and {self.footnote_parts}")
         self.closeFootnote() # If there's one currently open
         self.footnote_id = 'fn-{0}-{1}-{2}-{3}'.format(self.current_bookname, self.current_chapter_number_string, self.current_verse_number_string, self.footnote_num)
         self.write('<span id="ref-{0}"><sup><em>[<a href="#{0}">{1}</a>]</em></sup></span>'.format(self.footnote_id, self.footnote_num))
@@ -596,7 +885,7 @@ class SingleHTMLRenderer(AbstractRenderer):
             text = text[2:]
         elif text.startswith('+'):
             text = text[1:]
-        self.footnote_text = text
+        self.footnote_parts = [text]
 
     def renderFR_S(self, token):
         pass # We don't need these footnote reference fields to be rendered
@@ -604,93 +893,91 @@ class SingleHTMLRenderer(AbstractRenderer):
         assert not token.value
 
     def renderFT_S(self, token):
-        # print(f"renderFT_S({token.value}) with '{self.footnote_text}'")
+        # print(f"renderFT_S({token.value}) with {self.footnote_parts}")
         if self.emFlag:
-            self.footnote_text += '</em>'
+            self.footnote_parts.append('</em>')
             self.emFlag = False
-        self.footnote_text += token.value
+        self.footnote_parts.append(token.value)
     def renderFT_E(self, token):
         assert not token.value
 
     def renderFK_S(self, token):
-        # print(f"renderFK_S({token.value}) with '{self.footnote_text}'")
+        # print(f"renderFK_S({token.value}) with {self.footnote_parts}")
         if self.emFlag:
-            self.footnote_text += '</em>'
+            self.footnote_parts.append('</em>')
             self.emFlag = False
-        self.footnote_text += token.value
+        self.footnote_parts.append(token.value)
     def renderFK_E(self, token):
         assert not token.value
 
     def renderFV_S(self, token):
-        # print(f"renderFV_S({token.value}) with '{self.footnote_text}'")
+        # print(f"renderFV_S({token.value}) with {self.footnote_parts}")
         if self.emFlag:
-            self.footnote_text += '</em>'
+            self.footnote_parts.append('</em>')
             self.emFlag = False
-        self.footnote_text += token.value
+        self.footnote_parts.append(token.value)
     def renderFV_E(self, token):
         assert not token.value
 
     def renderF_E(self, token):
-        # print(f"renderF_E({token.value}) with '{self.footnote_text}'")
+        # print(f"renderF_E({token.value}) with {self.footnote_parts}")
         assert not token.value
         self.closeFootnote()
 
     def renderFP(self, token):
-        # print(f"renderFP({token.value}) with '{self.footnote_text}'")
+        # print(f"renderFP({token.value}) with {self.footnote_parts}")
         assert not token.value
         self.write('<br />')
 
 
     def renderFQ_S(self, token):
-        # print(f"renderFQ_S({token.value}) with {self.emFlag} and '{self.footnote_text}'")
-        self.footnote_text += '<em>' + token.value
+        # print(f"renderFQ_S({token.value}) with {self.emFlag} and {self.footnote_parts}")
+        self.footnote_parts.extend(('<em>', token.value))
         self.emFlag = True
     def renderFQ_E(self, token):
-        # print(f"renderFQ_E({token.value}) with {self.emFlag} and '{self.footnote_text}'")
+        # print(f"renderFQ_E({token.value}) with {self.emFlag} and {self.footnote_parts}")
         if self.emFlag:
-            self.footnote_text += '</em>'
+            self.footnote_parts.append('</em>')
             self.emFlag = False
-        self.footnote_text += token.value
+        self.footnote_parts.append(token.value)
 
     def renderFQA_S(self, token):
-        # print(f"renderFQA_S({token.value}) with {self.emFlag} and '{self.footnote_text}'")
-        self.footnote_text += '<em>' + token.value
+        # print(f"renderFQA_S({token.value}) with {self.emFlag} and {self.footnote_parts}")
+        self.footnote_parts.extend(('<em>', token.value))
         self.emFlag = True
     def renderFQA_E(self, token):
-        # print(f"renderFQA_E({token.value}) with {self.emFlag} and '{self.footnote_text}'")
+        # print(f"renderFQA_E({token.value}) with {self.emFlag} and {self.footnote_parts}")
         if self.emFlag:
-            self.footnote_text += '</em>'
+            self.footnote_parts.append('</em>')
             self.emFlag = False
-        self.footnote_text += token.value
+        self.footnote_parts.append(token.value)
 
 
     def closeFootnote(self):
-        # if self.footnoteFlag or self.footnote_text:
-        #     print(f"closeFootnote() with {self.footnoteFlag} and '{self.footnote_text}'")
+        # if self.footnoteFlag or self.footnote_parts:
+        #     print(f"closeFootnote() with {self.footnoteFlag} and {self.footnote_parts}")
         if self.emFlag:
-            self.footnote_text += '</em>'
+            self.footnote_parts.append('</em>')
             self.emFlag = False
         if self.footnoteFlag:
             self.footnoteFlag = False
             self.renderFQA_E(UsfmToken(''))
             self.footnotes[self.footnote_id] = {
-                'text': self.footnote_text,
+                'text': ''.join(self.footnote_parts),
                 'book': self.current_bookname,
                 'chapter': self.current_chapter_number_string,
                 'verse': self.current_verse_number_string,
                 'fn_num': self.footnote_num
             }
             self.footnote_num += 1
-            self.footnote_text = ''
+            self.footnote_parts = []
             self.footnote_id = ''
 
     def writeFootnotes(self):
-        fkeys = self.footnotes.keys()
-        if fkeys:
+        if self.footnotes:
             self.write('<div class="footnotes">')
             self.write('<hr class="footnotes-hr"/>')
-            for fkey in sorted(fkeys):
-                footnote = self.footnotes[fkey]
+            for fkey, footnote in self.footnotes.items(): # in the order they occurred
                 self.write(f'<div id="{fkey}" class="footnote">{footnote["chapter"].lstrip("0")}:{footnote["verse"].lstrip("0")} <sup>[<a href="#ref-{fkey}">{footnote["fn_num"]}</a>]</sup> <span class="text">{footnote["text"]}</span></div>')
             self.write('</div>')
         self.footnotes = {}
@@ -708,14 +995,14 @@ class SingleHTMLRenderer(AbstractRenderer):
             text = text[2:]
         elif text.startswith('+'):
             text = text[1:]
-        self.crossReference_text = text
+        self.crossReference_parts = [text]
 
     def renderXO(self, token):
         self.crossReference_origin = token.value
 
     def renderXT(self, token):
         if self.crossReferenceFlag:
-            self.crossReference_text += token.value
+            self.crossReference_parts.append(token.value)
         else: # Can occur not in a cross-reference
             self.write(token.value)
     def renderXT_E(self, token):
@@ -723,7 +1010,7 @@ class SingleHTMLRenderer(AbstractRenderer):
 
     def renderPlusXT(self, token):
         if self.crossReferenceFlag:
-            self.crossReference_text += token.value
+            self.crossReference_parts.append(token.value)
         else: # Can occur not in a cross-reference
             self.write(token.value)
     def renderPlusXT_E(self, token):
@@ -741,7 +1028,7 @@ class SingleHTMLRenderer(AbstractRenderer):
             # self.renderFQA_E(UsfmToken(''))
             self.crossReferences[self.crossReference_id] = {
                 'origin': self.crossReference_origin,
-                'text': self.crossReference_text,
+                'text': ''.join(self.crossReference_parts),
                 'book': self.current_bookname,
                 'chapter': self.current_chapter_number_string,
                 'verse': self.current_verse_number_string,
@@ -749,16 +1036,14 @@ class SingleHTMLRenderer(AbstractRenderer):
             }
             self.crossReference_num += 1
             self.crossReference_origin = ''
-            self.crossReference_text = ''
+            self.crossReference_parts = []
             self.crossReference_id = ''
 
     def writeCrossReferences(self):
-        crKeys = self.crossReferences.keys()
-        if crKeys:
+        if self.crossReferences:
             self.write('<div class="crossreferences">')
             self.write('<hr class="crossreferences-hr"/>')
-            for crKey in sorted(crKeys):
-                crossreference = self.crossReferences[crKey]
+            for crKey, crossreference in self.crossReferences.items(): # in the order they occurred
                 liveCrossReferences = self.livenCrossReferences(crossreference['text'])
                 origin_text = self.crossReference_origin if self.crossReference_origin \
                                 else f'{crossreference["chapter"].lstrip("0")}:{crossreference["verse"].lstrip("0")}'
@@ -769,53 +1054,31 @@ class SingleHTMLRenderer(AbstractRenderer):
     def livenCrossReferences(self, xr_text):
         """
         Convert cross-references (\\x....\\x*) to live links
+
+        A reference without a book name links into the same book as the one before it.
         """
-        # print(f"livenCrossReferences({xr_text})…")
         results = []
-        # lastBookcode = lastBooknumber = None
-        for individualXR in xr_text.split(';'):
-            # print(f"  Processing '{individualXR}'…")
-            strippedXR = individualXR.strip()
-            # xrBookcode = xrBooknumberStr = None
+        for individualXR, reference in zip(xr_text.split(';'), parseReferences(xr_text)):
             xrLink = ''
-            match = re.match(r'(\w{2,16}) (\d{1,3}):(\d{1,3})', strippedXR)
-            if match:
-                xrBookname, C, V = match.group(1), match.group(2), match.group(3)
-                # print(f"    Have match '{xrBookname}' '{C}':'{V}'")
-                try: ix = bookNames.index(xrBookname)
-                except ValueError: ix = -1
-                # print(f"      ix1={ix}")
-                if ix == -1:
-                    try: ix = readerNames.index(xrBookname)
-                    except ValueError: ix = -1
-                    # print(f"      ix2={ix}")
-                if ix == -1:
-                    for j,bookName in enumerate(bookNames):
-                        if xrBookname in bookName:
-                            ix = j; break
-                    # print(f"      ix3={ix}")
-                if ix == -1:
-                    for j,bookName in enumerate(readerNames):
-                        if xrBookname in bookName:
-                            ix = j; break
-                    # print(f"      ix4={ix}")
-                if ix != -1:
-                    xrBookcode = silNames[ix+1]
-                    xrBooknumberStr = bookKeys[xrBookcode]
-                    assert isinstance(xrBooknumberStr, str)
-                    # print(f"      xrBookcode='{xrBookcode}'")
-                    # print(f"      xrBooknumber='{xrBooknumberStr}'")
-                    # TODO: This logic may not work for FRT and for NT books (due to book numbering MAT=41)
-                    xrLink = f'{str(ix+1).zfill(2)}-{xrBookcode}.html#{xrBooknumberStr}-ch-{C.zfill(3)}-v-{V.zfill(3)}'
-                    # lastBookcode, lastBooknumber = xrBookcode, xrBooknumber
-            # TODO: Handle other types of matches, e.g., book name not included, i.e., defaults to last book
-            # print(f"    Got '{xrLink}'…")
-            liveXR = f'<a href="{xrLink}">{individualXR}</a>'
-            results.append(liveXR)
-
-        live_text = ';'.join(results)
-        # print(f"Returning '{live_text}'")
-        return live_text
+            if reference and reference.bookCode:
+                xrBookcode = reference.bookCode
+                xrBooknumberStr = bookKeys[xrBookcode]
+                assert isinstance(xrBooknumberStr, str)
+                C, V = reference.chapter, reference.verse
+                bookStructure = self.structureIndex.getBook(xrBookcode) if self.structureIndex else None
+                if bookStructure: # We know the actual file and which verses it has
+                    xrFilename = os.path.splitext(bookStructure.filename)[0]
+                    hasChapter, hasVerse = bookStructure.hasChapter(C), bookStructure.hasVerse(C, V)
+                else: # Fall back to the versification
+                    xrFilename = BOOK_FILEBASES[xrBookcode]
+                    hasChapter, hasVerse = self.versification.hasChapter(xrBookcode, C), \
+                                           self.versification.hasVerse(xrBookcode, C, V)
+                if hasChapter:
+                    xrLink = f'{xrFilename}.html#{xrBooknumberStr}-ch-{str(C).zfill(3)}'
+                    if hasVerse:
+                        xrLink += f'-v-{str(V).zfill(3)}'
+            results.append(f'<a href="{xrLink}">{individualXR}</a>')
+        return ';'.join(results)
 
 
     def renderQA(self, token):
@@ -873,7 +1136,7 @@ class SingleHTMLRenderer(AbstractRenderer):
         # if "the best copies" in token.value:
         #     print(f"renderText({token.value})")
         if self.footnoteFlag:
-            self.footnote_text += f' {self.escape(token.value)} '
+            self.footnote_parts.extend((' ', token.value, ' '))
         else:
             self.write(f' {token.value} ') # write function does escaping of non-break space
 # end of class SingleHTMLRenderer
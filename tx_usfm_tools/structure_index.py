@@ -0,0 +1,153 @@
+"""
+An index of the books, chapters and verses in a job's USFM files
+
+The USFM linter builds it while verifying the books
+    and saves it in the source folder (as STRUCTURE_INDEX_FILENAME)
+    so that the converter (which runs next on the same folder)
+    can split the books into chapters and make cross-reference links
+    without scanning the text again.
+
+For each book it holds:
+    the filename and the size of the book text in bytes,
+    the byte offset of each \\c marker in the book text, and
+    the ranges of verse numbers found in each chapter.
+
+Offsets are into the UTF-8 encoding of the book text as the tools read it
+    (i.e., text mode with leading whitespace removed, see books.loadBooks),
+    and the index is ignored for any book whose text doesn't match it.
+"""
+from typing import Dict, Iterator, List, Optional, Tuple
+import json
+import logging
+from array import array
+
+from tx_usfm_tools.chapters import CHAPTER_MARKER_RE
+
+
+STRUCTURE_INDEX_FILENAME = 'usfm_structure_index.json'
+STRUCTURE_INDEX_VERSION = 1
+
+
+class BookStructure:
+    """
+    The chapters and verses of one book.
+    """
+    def __init__(self, filename:str, bookCode:Optional[str]=None) -> None:
+        self.filename = filename
+        self.bookCode = bookCode
+        self.numBytes = 0
+        self.chapterOffsets = array('I') # Byte offset of each \c marker
+        self.verseRanges:Dict[int,List[List[int]]] = {} # chapter number: [first, last] verse ranges
+
+    def addPart(self, part:str) -> None:
+        """
+        Adds the next part of the book text as split by chapters.split_chapters or chapters.read_chapters
+            (i.e., the header or a chapter).
+        """
+        if CHAPTER_MARKER_RE.match(part):
+            self.chapterOffsets.append(self.numBytes)
+        self.numBytes += len(part.encode('utf-8'))
+
+    def addChapter(self, chapter:int) -> None:
+        self.verseRanges.setdefault(chapter, [])
+
+    def addVerse(self, chapter:int, verse:int) -> None:
+        ranges = self.verseRanges.setdefault(chapter, [])
+        if ranges:
+            lastRange = ranges[-1]
+            if lastRange[0] <= verse <= lastRange[1]:
+                return # Duplicated verse
+            if verse == lastRange[1] + 1:
+                lastRange[1] = verse
+                return
+        ranges.append([verse, verse])
+
+    def hasChapter(self, chapter:int) -> bool:
+        return chapter in self.verseRanges
+
+    def hasVerse(self, chapter:int, verse:int) -> bool:
+        return any(first <= verse <= last for first, last in self.verseRanges.get(chapter, ()))
+
+    def splitChapters(self, usfm:str) -> Optional[Tuple[str,List[str]]]:
+        """
+        Returns the same header and chapter texts as chapters.split_chapters
+            but without searching the text for \\c markers,
+            or None if the text doesn't match the index.
+        """
+        usfmBytes = usfm.encode('utf-8')
+        if len(usfmBytes) != self.numBytes \
+        or not all(usfmBytes.startswith(b'\\c', offset) for offset in self.chapterOffsets):
+            return None
+        starts = [0] + list(self.chapterOffsets)
+        ends = starts[1:] + [len(usfmBytes)]
+        parts = [usfmBytes[start:end].decode('utf-8') for start,end in zip(starts, ends)]
+        return parts[0], parts[1:]
+
+    def toDict(self) -> Dict:
+        return {'file': self.filename, 'book': self.bookCode, 'bytes': self.numBytes,
+                'chapterOffsets': list(self.chapterOffsets),
+                'verses': {str(chapter):ranges for chapter, ranges in self.verseRanges.items()}}
+
+    @classmethod
+    def fromDict(cls, bookDict:Dict) -> 'BookStructure':
+        bookStructure = cls(bookDict['file'], bookDict['book'])
+        bookStructure.numBytes = bookDict['bytes']
+        bookStructure.chapterOffsets = array('I', bookDict['chapterOffsets'])
+        bookStructure.verseRanges = {int(chapter):ranges for chapter, ranges in bookDict['verses'].items()}
+        return bookStructure
+# end of BookStructure class
+
+
+class StructureIndex:
+    """
+    The structure of each book in a job, by book code.
+    """
+    def __init__(self) -> None:
+        self.books:Dict[str,BookStructure] = {}
+
+    def __len__(self) -> int:
+        return len(self.books)
+
+    def __iter__(self) -> Iterator[BookStructure]:
+        return iter(self.books.values())
+
+    def addBook(self, bookStructure:BookStructure) -> None:
+        """
+        Only the first book with each code is kept.
+        """
+        if bookStructure.bookCode and bookStructure.bookCode not in self.books:
+            self.books[bookStructure.bookCode] = bookStructure
+
+    def getBook(self, bookCode:str) -> Optional[BookStructure]:
+        return self.books.get(bookCode)
+
+    def save(self, filepath:str) -> None:
+        with open(filepath, 'wt', encoding='utf-8') as index_file:
+            json.dump({'version': STRUCTURE_INDEX_VERSION,
+                       'books': [bookStructure.toDict() for bookStructure in self.books.values()]},
+                      index_file, separators=(',',':'))
+
+    @classmethod
+    def load(cls, filepath:str) -> Optional['StructureIndex']:
+        """
+        Returns None if there's no (usable) index file.
+        """
+        try:
+            with open(filepath, 'rt', encoding='utf-8') as index_file:
+                indexDict = json.load(index_file)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable USFM structure index {filepath}: {e}")
+            return None
+        if not isinstance(indexDict, dict) or indexDict.get('version') != STRUCTURE_INDEX_VERSION:
+            return None
+        structureIndex = cls()
+        try:
+            for bookDict in indexDict['books']:
+                structureIndex.addBook(BookStructure.fromDict(bookDict))
+        except (KeyError, TypeError, ValueError, OverflowError) as e:
+            logging.warning(f"Ignoring invalid USFM structure index {filepath}: {e}")
+            return None
+        return structureIndex
+# end of StructureIndex class
@@ -0,0 +1,169 @@
+"""
+Optional on-disk cache of parsed USFM tokens
+
+Most jobs for a Bible repo only change one or two books,
+    so rather than re-parsing every book each time,
+    the tokens for each parsed text are saved keyed by a hash of that text
+    (and of the parser version, so a changed grammar never reuses old entries).
+
+The cache is only used if the USFM_TOKEN_CACHE_DIR environment variable is set.
+USFM_TOKEN_CACHE_MAX_BYTES (default 200MB) sets the budget:
+    the least recently used entries are deleted when it's exceeded.
+"""
+from typing import List, Optional
+import os
+import sys
+import zlib
+import marshal
+import hashlib
+import logging
+import tempfile
+from array import array
+
+from tx_usfm_tools import parseUsfm
+
+
+CACHE_FORMAT = b'USFMTOK1' # Written at the start of every cache file
+DEFAULT_MAX_BYTES = 200_000_000
+
+
+def getParserVersion() -> str:
+    """
+    Changes whenever the parser source (or the Python/marshal version) does.
+    """
+    with open(parseUsfm.__file__, 'rb') as parser_file:
+        parser_hash = hashlib.sha1(parser_file.read()).hexdigest()
+    return f'{CACHE_FORMAT.decode()}-{sys.version_info[0]}.{sys.version_info[1]}-{parser_hash}'
+
+
+class TokenCache:
+    """
+    A directory of <hash>.tokens files, each holding one parsed text.
+
+    Each file is the format marker followed by the zlib-compressed marshalled columns:
+        token type names, and for each token: type index, value, offset and line.
+    """
+    def __init__(self, cacheDir:str, maxBytes:int=DEFAULT_MAX_BYTES) -> None:
+        self.cacheDir = cacheDir
+        self.maxBytes = maxBytes
+        self.parserVersion = getParserVersion()
+        self.hits = self.misses = 0
+        os.makedirs(cacheDir, exist_ok=True)
+
+    def getKey(self, usfm:str) -> str:
+        return hashlib.sha256(self.parserVersion.encode() + usfm.encode('utf-8', 'surrogatepass')).hexdigest()
+
+    def getFilepath(self, key:str) -> str:
+        return os.path.join(self.cacheDir, key + '.tokens')
+
+    def parseString(self, usfm:str) -> List[parseUsfm.UsfmToken]:
+        """
+        Same as parseUsfm.parseString but uses (and fills) the cache.
+        """
+        filepath = self.getFilepath(self.getKey(usfm))
+        tokens = self.load(filepath)
+        if tokens is not None:
+            self.hits += 1
+            return tokens
+        self.misses += 1
+        tokens = parseUsfm.parseString(usfm)
+        self.save(filepath, tokens)
+        return tokens
+
+    def load(self, filepath:str) -> Optional[List[parseUsfm.UsfmToken]]:
+        try:
+            with open(filepath, 'rb') as cache_file:
+                data = cache_file.read()
+            os.utime(filepath) # Mark it as recently used
+        except OSError: # Not cached (or evicted by another process)
+            return None
+        if not data.startswith(CACHE_FORMAT):
+            return None
+        try:
+            typeNames, typeIndexes, values, offsets, lines = marshal.loads(zlib.decompress(data[len(CACHE_FORMAT):]))
+        except (zlib.error, ValueError, EOFError, TypeError) as e:
+            logging.warning(f"Ignoring corrupt USFM token cache file {filepath}: {e}")
+            return None
+        tokenClasses = [parseUsfm.TOKEN_CLASSES[typeName] for typeName in typeNames]
+        tokens = []
+        for typeIndex, value, offset, line in zip(array('H', typeIndexes), values,
+                                                  array('I', offsets), array('I', lines)):
+            token = tokenClasses[typeIndex](value)
+            token.type = typeNames[typeIndex]
+            token.offset, token.line = offset, line
+            tokens.append(token)
+        return tokens
+
+    def save(self, filepath:str, tokens:List[parseUsfm.UsfmToken]) -> None:
+        typeNames:List[str] = []
+        typeNumbers = {}
+        typeIndexes = array('H')
+        for token in tokens:
+            if token.type not in typeNumbers:
+                typeNumbers[token.type] = len(typeNames)
+                typeNames.append(token.type)
+            typeIndexes.append(typeNumbers[token.type])
+        data = CACHE_FORMAT + zlib.compress(marshal.dumps((typeNames, typeIndexes.tobytes(),
+                                            [token.value for token in tokens],
+                                            array('I', [token.offset for token in tokens]).tobytes(),
+                                            array('I', [token.line for token in tokens]).tobytes())))
+        # Write to a temporary file first so that other processes never see a partial file
+        file_descriptor, temp_filepath = tempfile.mkstemp(dir=self.cacheDir, suffix='.tmp')
+        try:
+            with os.fdopen(file_descriptor, 'wb') as temp_file:
+                temp_file.write(data)
+            os.replace(temp_filepath, filepath)
+        except OSError as e:
+            logging.warning(f"Unable to save USFM token cache file {filepath}: {e}")
+            try: os.remove(temp_filepath)
+            except OSError: pass
+            return
+        self.evict()
+
+    def evict(self) -> None:
+        """
+        Delete the least recently used files until we're back within the budget.
+        """
+        entries = []
+        totalBytes = 0
+        with os.scandir(self.cacheDir) as dir_entries:
+            for dir_entry in dir_entries:
+                if dir_entry.name.endswith('.tokens'):
+                    try: stat = dir_entry.stat()
+                    except OSError: continue
+                    entries.append((stat.st_mtime, stat.st_size, dir_entry.path))
+                    totalBytes += stat.st_size
+        if totalBytes <= self.maxBytes:
+            return
+        for _mtime, size, filepath in sorted(entries):
+            try: os.remove(filepath)
+            except OSError: pass
+            totalBytes -= size
+            if totalBytes <= self.maxBytes:
+                break
+# end of TokenCache class
+
+
+_tokenCache:Optional[TokenCache] = None
+
+def getTokenCache() -> Optional[TokenCache]:
+    """
+    Returns the cache set up from the environment variables, or None if it's not enabled.
+    """
+    global _tokenCache
+    cacheDir = os.getenv('USFM_TOKEN_CACHE_DIR')
+    if not cacheDir:
+        return None
+    if _tokenCache is None or _tokenCache.cacheDir != cacheDir:
+        _tokenCache = TokenCache(cacheDir, int(os.getenv('USFM_TOKEN_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES)))
+    return _tokenCache
+
+
+def parseString(usfm:str) -> List[parseUsfm.UsfmToken]:
+    """
+    Drop-in replacement for parseUsfm.parseString that uses the cache if enabled.
+    """
+    tokenCache = getTokenCache()
+    if tokenCache is None:
+        return parseUsfm.parseString(usfm)
+    return tokenCache.parseString(usfm)
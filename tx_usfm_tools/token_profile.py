@@ -0,0 +1,90 @@
+"""
+Optional profiling of the time spent on each type of USFM token
+
+When a book is slow to convert (or lint), this shows which markers are responsible.
+
+Profiling is only done if the USFM_PROFILE environment variable is set.
+The renderers (and the USFM verifier) then count the tokens of each type
+    and add up the time taken by their handlers,
+    and a summary for each book is written to the debug log.
+If a statsd client has been given (see setStatsClient),
+    the totals for each book are also sent as timings (i.e., histograms).
+"""
+from typing import Any, Optional
+import os
+import re
+import logging
+from collections import Counter
+
+
+SUMMARY_TOKEN_TYPES = 8 # The slowest ones listed in the log for each book
+
+NON_STATS_NAME_RE = re.compile(r'\W')
+
+_statsClient:Any = None
+_statsPrefix = ''
+
+
+def isProfiling() -> bool:
+    return bool(os.getenv('USFM_PROFILE'))
+
+
+def getStatsName(tokenType:str) -> str:
+    """
+    Returns the token type (e.g., 'add*' or '+xt') as a usable statsd name part.
+    """
+    return NON_STATS_NAME_RE.sub('_', tokenType.replace('*', '_end').replace('+', 'plus_'))
+
+
+def setStatsClient(statsClient:Any, statsPrefix:str) -> None:
+    """
+    Sets where the per-book profiles are sent, e.g., the job handler's StatsClient.
+    """
+    global _statsClient, _statsPrefix
+    _statsClient, _statsPrefix = statsClient, statsPrefix
+
+
+class TokenProfile:
+    """
+    The count and the total seconds for each token type.
+    """
+    def __init__(self, name:str) -> None:
+        self.name = name # What was done with the tokens, e.g., 'render'
+        self.counts:Counter = Counter()
+        self.seconds:Counter = Counter()
+
+    def add(self, tokenType:str, seconds:float) -> None:
+        self.counts[tokenType] += 1
+        self.seconds[tokenType] += seconds
+
+    def update(self, other:'TokenProfile') -> None:
+        """
+        Adds in another profile, e.g., from a chapter rendered in a worker process.
+        """
+        self.counts.update(other.counts)
+        self.seconds.update(other.seconds)
+
+    def summary(self, bookName:str) -> str:
+        slowest = ', '.join(f"{tokenType} {self.counts[tokenType]:,}×={seconds*1000:.1f}ms"
+                            for tokenType, seconds in self.seconds.most_common(SUMMARY_TOKEN_TYPES))
+        return f"USFM {self.name} profile for {bookName}: {sum(self.counts.values()):,} tokens" \
+               f" in {sum(self.seconds.values())*1000:.1f}ms — slowest: {slowest}"
+
+    def report(self, bookName:str) -> None:
+        """
+        Logs the summary and sends the timings (if there's a stats client).
+        """
+        logging.debug(self.summary(bookName))
+        if _statsClient is not None:
+            for tokenType, count in self.counts.items():
+                statsName = f'{_statsPrefix}.{self.name}.{getStatsName(tokenType)}'
+                _statsClient.timing(f'{statsName}.count', count)
+                _statsClient.timing(f'{statsName}.ms', self.seconds[tokenType] * 1000)
+# end of TokenProfile class
+
+
+def newProfile(name:str) -> Optional[TokenProfile]:
+    """
+    Returns an empty profile if profiling is enabled, else None.
+    """
+    return TokenProfile(name) if isProfiling() else None
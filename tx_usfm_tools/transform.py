@@ -95,15 +95,49 @@ class UsfmTransform:
     #     c.render()
 
     @staticmethod
-    def buildSingleHtml(usfmDir, builtDir, buildName):
+    def buildSingleHtml(usfmDir, builtDir, buildName, chapterWorkers=0, structureIndex=None):
         # UsfmTransform.__logger.debug("transform.buildSingleHtml( … ) …")
         # Convert to HTML
         UsfmTransform.__logger.debug("transform: building Single Page HTML…")
         UsfmTransform.ensureOutputDir(builtDir)
-        c = singlehtmlRenderer.SingleHTMLRenderer(usfmDir, builtDir + '/' + buildName + '.html')
+        c = singlehtmlRenderer.SingleHTMLRenderer(usfmDir, builtDir + '/' + buildName + '.html',
+                                                  chapterWorkers=chapterWorkers, structureIndex=structureIndex)
         warning_list = c.render()
         return warning_list
 
+    @staticmethod
+    def renderSingleHtml(usfm, outputStream=None, chapterWorkers=0, structureIndex=None, extraRenderers=()):
+        """
+        Same as buildSingleHtml but for the USFM text of one book, without using any files.
+
+        Writes the HTML to outputStream if one is given,
+            else returns it (with the warnings) as a string.
+        Any extraRenderers are given the same tokens as the HTML renderer.
+        """
+        c = singlehtmlRenderer.SingleHTMLRenderer(None, None,
+                                                  chapterWorkers=chapterWorkers, structureIndex=structureIndex)
+        for renderer in extraRenderers:
+            c.addRenderer(renderer)
+        html, warning_list = c.renderString(usfm)
+        if outputStream is None:
+            return html, warning_list
+        outputStream.write(html)
+        return None, warning_list
+
+    @staticmethod
+    def renderSingleHtmlPages(usfm, pageFilebase, maxPageLength=0, chapterWorkers=0, structureIndex=None,
+                                extraRenderers=()):
+        """
+        Same as renderSingleHtml but splits the book into an index page and pages of whole chapters.
+
+        Returns an iterator of (filename, html) for the pages, and the warnings.
+        """
+        c = singlehtmlRenderer.SingleHTMLRenderer(None, None,
+                                                  chapterWorkers=chapterWorkers, structureIndex=structureIndex)
+        for renderer in extraRenderers:
+            c.addRenderer(renderer)
+        return c.renderStringPages(usfm, pageFilebase, maxPageLength)
+
     # @staticmethod
     # def buildCSV(usfmDir, builtDir, buildName):
     #     # Convert to CSV
@@ -4,156 +4,190 @@
 # Uses parseUsfm module.
 # Place this script in the USFM-Tools folder.
 
-from typing import List, Tuple, Optional
+from typing import Iterable, Iterator, List, Tuple, Optional
 import re
-import sys
-import logging
+from time import perf_counter
 
-from tx_usfm_tools import parseUsfm, usfm_verses
+from tx_usfm_tools import parseUsfm, usfm_verses, token_cache
+from tx_usfm_tools.alignment import strip_alignment
+from tx_usfm_tools.versification import getVersification
+from tx_usfm_tools.structure_index import BookStructure
+from tx_usfm_tools.token_profile import newProfile
 
 
-# Global variables
-lastToken = None
 vv_re = re.compile(r'([0-9]+)-([0-9]+)')
-error_log:Optional[List[str]] = None
-
-chapter_marker_re = re.compile(r'\\c(?!a)') # Don't match on \ca
-verse_marker_re = re.compile(r'\\v(?!a)') # Don't match on \va
 
 WHITE_SPACE = [' ', '\u00A0', '\r', '\n', '\t']
 SPACE = [' ', '\u00A0']
 NON_CHAPTER_BOOK_CODES = ('FRT','BAK','OTH','INT','CNC','GLO','TDX','NDX')
 
+englishWords:List[str] = [] # Sorted words from the English book names (shared, only built once)
+
+SOURCE_CONTEXT_LENGTH = 8 # Characters of the previous part kept so the marker checks can look back
+
+
+class SourcePart:
+    """
+    Part of the book being verified (all of it unless it's verified a chapter at a time)
+        with the alignment stripped out.
+    """
+    def __init__(self, originalText:str, startLine:int=1, startColumn:int=1) -> None:
+        self.originalText = originalText
+        self.text, self.offsetMap = strip_alignment(originalText)
+        self.startLine, self.startColumn = startLine, startColumn # of this part in the book
+        self.lineIndex:Optional[parseUsfm.LineIndex] = None # of the original text (only made if needed)
+
+    def lineColumn(self, offset:int) -> Tuple[int,int]:
+        """
+        Returns the 1-based line and column in the original book of the given offset into self.text.
+        """
+        if self.lineIndex is None:
+            self.lineIndex = parseUsfm.LineIndex(self.originalText)
+        line, column = self.lineIndex.lineColumn(self.offsetMap.original_offset(offset))
+        if line == 1:
+            column += self.startColumn - 1
+        return self.startLine + line - 1, column
+
+    def endLineColumn(self) -> Tuple[int,int]:
+        """
+        Returns the line and column where the next part starts.
+        """
+        numNewlines = self.originalText.count('\n')
+        if numNewlines:
+            return self.startLine + numNewlines, len(self.originalText) - self.originalText.rfind('\n')
+        return self.startLine, self.startColumn + len(self.originalText)
+# end of SourcePart class
+
+
+class UsfmVerifier:
+    """
+    Verifies one USFM book.
+
+    Each verifier owns all of its state and its error list,
+        so several books can be verified at the same time (e.g., in threads).
 
-class State:
-    IDs = []
-    ID = ''
-    IDE = ''
-    usfm = ''
-    toc1 = ''
-    toc2 = ''
-    toc3 = ''
-    mt = ''
-    heading = ''
-    master_chapter_label = ''
-    chapter_label = ''
-    chapter = 0
-    nParagraphs = 0
-    nMargins = 0
-    nQuotes = 0
-    verse = 0
-    lastVerse = 0
-    needVerseText = False
-    textOkayHere = False
-    referenceString = ''
-    lastReferenceString = ''
-    chapters = set()
-    verseCounts = {}
-    errorRefs = set()
-    englishWords = []
-    lang_code = None
-    book_code = None
-
-    def reset_all(self):
+    If a BookStructure is given, the chapters and verses found are added to it.
+    """
+    def __init__(self, book_code:Optional[str]=None, lang_code:Optional[str]=None,
+                    versification:Optional[str]=None, structure:Optional[BookStructure]=None) -> None:
+        self.structure = structure
+        self.errors:List[str] = []
+        self.IDs:List[str] = []
+        self.errorRefs = set()
+        self.versification = getVersification(versification)
+        self.lang_code = lang_code
+        self.lastToken = None
+        self.profile = newProfile('verify') # Time taken for each token type (if profiling)
         self.reset_book()
-        State.IDs = []
-        State.errorRefs = set()
+        self.set_book_code(book_code)
+
+        # For checking the formatting of the \c and \v markers in the source text
+        self.sourcePart:Optional[SourcePart] = None # Part of the book being parsed
+        self.previousSourcePart:Optional[SourcePart] = None
+        self.sourceText = '' # The end of the previous part then the text of this part
+        self.sourceBase = 0 # Where the text of this part starts in sourceText
+        self.markerChapter = 1
+        self.markerVerseRange = '1'
+
 
     def reset_book(self):
-        State.ID = ''
-        State.IDE = ''
-        State.usfm = ''
-        State.toc1 = ''
-        State.toc2 = ''
-        State.toc3 = ''
-        State.mt = ''
-        State.heading = ''
-        State.master_chapter_label = ''
-        State.chapter_label = ''
-        State.chapter = 0
-        State.lastVerse = 0
-        State.verse = 0
-        State.needVerseText = False
-        State.textOkayHere = False
-        State.chapters = set()
-        State.nParagraphs = 0
-        State.nMargins = 0
-        State.nQuotes = 0
-        State.lastReferenceString = ''
-        State.referenceString = ''
-        State.book_code = None
+        self.ID = ''
+        self.IDE = ''
+        self.usfm = ''
+        self.toc1 = ''
+        self.toc2 = ''
+        self.toc3 = ''
+        self.mt = ''
+        self.heading = ''
+        self.master_chapter_label = ''
+        self.chapter_label = ''
+        self.chapter = 0
+        self.lastChapter = 0
+        self.lastVerse = 0
+        self.verse = 0
+        self.needVerseText = False
+        self.textOkayHere = False
+        self.chapters = set()
+        self.chapterEnds:List[Tuple[int,int]] = [] # (chapter, last verse) for each chapter so far
+        self.chapterEndReferences:List[str] = []
+        self.nParagraphs = 0
+        self.nMargins = 0
+        self.nQuotes = 0
+        self.lastReferenceString = ''
+        self.referenceString = ''
+        self.book_code = None
 
     def set_book_code(self, book):
-        State.book_code = book
-        State.referenceString = book  # default
-
-    def setLanguageCode(self, code):
-        State.lang_code = code
+        self.book_code = book
+        self.referenceString = book  # default
 
     def addID(self, id):
+        self.verifyVerseCounts() # for the previous book (if any)
         self.reset_book()
-        State.IDs.append(id)
-        State.ID = id
-        State.lastReferenceString = State.referenceString
-        State.referenceString = id
+        self.IDs.append(id)
+        self.ID = id
+        self.lastReferenceString = self.referenceString
+        self.referenceString = id
 
     def getIDs(self):
-        return State.IDs
+        return self.IDs
 
     def addHeading(self, heading):
-        State.heading = heading
+        self.heading = heading
 
     def addIDE(self, ide):
-        State.IDE = ide
+        self.IDE = ide
 
     def addUSFM(self, usfm):
-        State.usfm = usfm
+        self.usfm = usfm
 
     def addTOC1(self, toc):
-        State.toc1 = toc
+        self.toc1 = toc
 
     def addTOC2(self, toc):
-        State.toc2 = toc
+        self.toc2 = toc
 
     def addTOC3(self, toc):
-        State.toc3 = toc
+        self.toc3 = toc
 
     def addMT(self, mt):
-        State.mt = mt
+        self.mt = mt
 
     def addChapterLabel(self, text):
-        if State.chapter == 0:
-            State.master_chapter_label = text
+        if self.chapter == 0:
+            self.master_chapter_label = text
         else:
-            State.chapter_label = text
+            self.chapter_label = text
 
     def addChapter(self, c):
-        State.lastChapter = State.chapter
-        State.chapter = int(c)
-        State.chapters.add(State.chapter)
-        State.lastVerse = 0
-        State.nParagraphs = 0
-        State.nMargins = 0
-        State.nQuotes = 0
-        State.verse = 0
-        State.needVerseText = False
-        State.textOkayHere = False
-        State.lastReferenceString = State.referenceString
-        State.referenceString = self.get_id() + ' ' + str(State.chapter)
+        self.lastChapter = self.chapter
+        self.chapter = int(c)
+        self.chapters.add(self.chapter)
+        if self.structure is not None and self.chapter > 0:
+            self.structure.addChapter(self.chapter)
+        self.lastVerse = 0
+        self.nParagraphs = 0
+        self.nMargins = 0
+        self.nQuotes = 0
+        self.verse = 0
+        self.needVerseText = False
+        self.textOkayHere = False
+        self.lastReferenceString = self.referenceString
+        self.referenceString = self.get_id() + ' ' + str(self.chapter)
 
     def get_id(self):
-        id = State.ID
-        if not State.ID:
-            id = State.book_code  # use book code if no ID given
+        id = self.ID
+        if not self.ID:
+            id = self.book_code  # use book code if no ID given
         return id
 
     def addParagraph(self):
-        State.nParagraphs += 1
-        State.textOkayHere = True
+        self.nParagraphs += 1
+        self.textOkayHere = True
 
     def addMargin(self):
-        State.nMargins += 1
-        State.textOkayHere = True
+        self.nMargins += 1
+        self.textOkayHere = True
 
     # supports a span of verses, e.g. 3-4, if needed. Passes the verse(s) on to addVerse()
     def addVerses(self, vv):
@@ -172,133 +206,442 @@ class State:
             self.addVerse(str(vn))
 
     def addVerse(self, v):
-        State.lastVerse = State.verse
-        State.verse = int(v)
-        State.needVerseText = True
-        State.textOkayHere = True
-        State.lastReferenceString = State.referenceString
-        State.referenceString = self.get_id() + ' ' + str(State.chapter) + ':' + v
+        self.lastVerse = self.verse
+        self.verse = int(v)
+        if self.structure is not None and self.chapter > 0:
+            self.structure.addVerse(self.chapter, self.verse)
+        self.needVerseText = True
+        self.textOkayHere = True
+        self.lastReferenceString = self.referenceString
+        self.referenceString = self.get_id() + ' ' + str(self.chapter) + ':' + v
 
     def textOkay(self):
-        return State.textOkayHere
+        return self.textOkayHere
 
     def needText(self):
-        return State.needVerseText
+        return self.needVerseText
 
     def addText(self):
-        State.needVerseText = False
-        State.textOkayHere = True
+        self.needVerseText = False
+        self.textOkayHere = True
 
     def addQuote(self):
-        State.nQuotes += State.nQuotes + 1
-        State.textOkayHere = True
+        self.nQuotes += self.nQuotes + 1
+        self.textOkayHere = True
 
     # Adds the specified reference to the set of error references
     # Returns True if reference can be added
     # Returns False if reference was previously added
     def addError(self, ref):
         success = False
-        if ref not in State.errorRefs:
+        if ref not in self.errorRefs:
             self.errorRefs.add(ref)
             success = True
         return success
 
 
-    def getEnglishWords(self):
-        if not State.englishWords:
-            for book in usfm_verses.verses:
-                book_data = usfm_verses.verses[book]
-                english_name = book_data['en_name'].lower()
-                english_words = english_name.split(' ')
-                for word in english_words:
-                    if word and not isNumber(word):
-                        State.englishWords.append(word)
-            State.englishWords.sort()
-        return State.englishWords
+    def report_error(self, msg):
+        self.errors.append(msg.rstrip(' \t\n\r'))
 
 
-    def loadVerseCounts(self):
-        if not State.verseCounts:
-            State.verseCounts = usfm_verses.verses
+    def endChapter(self):
+        """
+        Notes the last verse of the current chapter
+            (they're all checked together by verifyVerseCounts at the end of the book).
+        """
+        if self.ID and self.chapter > 0:
+            self.chapterEnds.append((self.chapter, self.verse))
+            self.chapterEndReferences.append(self.referenceString)
 
 
-    # Returns the number of chapters that the specified book should contain
-    def nChapters(self, book_id):
-        self.loadVerseCounts()
-        try: return State.verseCounts[book_id]['chapters']
-        except KeyError as e:
-            logging.error(f"verifyUSFM.State.nChapters failed for book_id={book_id} with {e}")
-            return 0
+    def verifyVerseCounts(self):
+        for n in self.versification.getWrongLastVerses(self.ID, self.chapterEnds):
+            chapter = self.chapterEnds[n][0]
+            self.report_error(f"{self.chapterEndReferences[n]} - Should have {self.versification.nVerses(self.ID, chapter)} verses\n")
+        self.chapterEnds, self.chapterEndReferences = [], []
 
 
-    # Returns the number of verses that the specified chapter should contain
-    def nVerses(self, book_id, chap):
-        self.loadVerseCounts()
-        try:
-            chaps = State.verseCounts[book_id]['verses']
-            return chaps[chap-1]
-        except (KeyError, IndexError) as e:
-            logging.error(f"verifyUSFM.State.nVerses failed for book_id={book_id} chap={chap} with {e}")
-            return 0
-# end of State class
+    def verifyNotEmpty(self, filename, book_code):
+        if not self.ID \
+        or (self.chapter==0 and book_code not in NON_CHAPTER_BOOK_CODES):
+            self.report_error(f"{filename} - File may be empty.")
 
 
+    def verifyIdentification(self, book_code):
+        if not self.ID:
+            self.report_error(f"{book_code} - Missing \\id tag")
+        elif (book_code is not None) and (book_code != self.ID):
+            self.report_error(f"{self.ID} - Found in \\id tag does not match code '{book_code}' found in filename")
 
-def report_error(msg):
-    if error_log is None:  # if error logging is enabled then don't print
-        sys.stderr.write(msg)
-    else:
-        error_log.append(msg.rstrip(' \t\n\r'))
+        if not self.IDE:
+            self.report_error(f"{book_code} - Missing \\ide tag")
 
+        if self.heading:
+            if self.heading.isupper():
+                self.report_error(f"{book_code} - \\h '{self.heading}' shouldn't be UPPERCASE")
+        else:
+            self.report_error(f"{book_code} - Missing \\h tag")
+
+        if book_code not in NON_CHAPTER_BOOK_CODES:
+            if not self.toc1:
+                self.report_error(f"{book_code} - Missing \\toc1 tag")
+
+            if not self.toc2:
+                self.report_error(f"{book_code} - Missing \\toc2 tag")
+
+            if not self.toc3:
+                self.report_error(f"{book_code} - Missing \\toc3 tag")
+
+            if not self.mt:
+                self.report_error(f"{book_code} - Missing \\mt or \\mt1 tag")
+    # end of UsfmVerifier.verifyIdentification function
+
+
+    def checkMarkerFormat(self, book:str, start_index:int) -> None:
+        """
+        Called for each token: checks the spacing and numbering of \\c and \\v markers
+            directly in the source text where the token starts.
+        """
+        text = self.sourceText
+        marker = text[start_index+1:start_index+2]
+        end_index = start_index + 2
+        end_char = text[end_index] if end_index < len(text) else ''
+        if marker == 'c':
+            if (end_char >= 'a') and (end_char <= 'z'):
+                return  # skip non-chapter markers, e.g., \ca, \cl
+            has_space = end_char in SPACE
+            if has_space:
+                end_index += 1
+            previous_char = text[start_index - 1]
+            newline_before = (previous_char == '\n') or (previous_char == '\r')
+            ch_num, has_space_after = self.get_chapter_number(text, end_index)
+            if ch_num >= 0:
+                if not has_space:
+                    self.add_error(book, "Missing space before chapter number: '{0}'", start_index, self.markerChapter)
+                elif not has_space_after:
+                    self.add_error(book, "Missing new line after chapter number: '{0}'", start_index, self.markerChapter)
+                elif not newline_before:
+                    self.add_error(book, "Missing new line before chapter marker: '{0}'", start_index-4, self.markerChapter)
+                self.markerChapter = ch_num
+                self.markerVerseRange = '1'
+            else:
+                self.add_error(book, "Invalid chapter number format: '{0}'", start_index, self.markerChapter)
+        elif marker == 'v':
+            if end_char == 'a':
+                return # skip \va
+            has_space = end_char in SPACE
+            if has_space:
+                end_index += 1
+            space_before = text[start_index - 1] in WHITE_SPACE
+            vs_range, has_space_after = self.get_verse_range(text, end_index)
+            if vs_range != '':
+                if not has_space:
+                    self.add_error(book, "Missing space before verse number: '{0}'", start_index, self.markerChapter, vs_range)
+                elif not has_space_after:
+                    self.add_error(book, "Missing space after verse number: '{0}'", start_index, self.markerChapter, vs_range)
+                elif not space_before:
+                    self.add_error(book, "Missing space before verse marker: '{0}'", start_index-1, self.markerChapter, vs_range)
+                self.markerVerseRange = vs_range
+            else:
+                self.add_error(book, "Invalid verse number: '{0}'", start_index, self.markerChapter, self.markerVerseRange)
+    # end of UsfmVerifier.checkMarkerFormat function
 
-def verifyVerseCount():
-    state = State()
-    if not state.ID:
-        return -1
 
-    if state.chapter > 0 and state.verse != state.nVerses(state.ID, state.chapter):
-        # Revelation 12 may have 17 or 18 verses
-        # 3 John may have 14 or 15 verses
-        if state.referenceString != 'REV 12:18' and state.referenceString != '3JN 1:15':
-            report_error(f"{state.referenceString} - Should have {state.nVerses(state.ID, state.chapter)} verses\n")
+    def add_error(self, book, message, pos, chapter, verse=None):
+        length = 8
+        example = self.sourceText[pos: pos + length]
+        if pos < self.sourceBase and self.previousSourcePart is not None:
+            line, column = self.previousSourcePart.lineColumn(len(self.previousSourcePart.text) + pos - self.sourceBase)
+        else:
+            line, column = self.sourcePart.lineColumn(pos - self.sourceBase)
+        self.report_error(make_reference_string(book, chapter, verse) + " - " + message.format(example)
+                            + f" at line {line}, column {column}")
+
 
+    def get_verse_range(self, text, start):
+        pos = start
+        verse, c, end = self.get_number(text, pos)
+        if verse == '':
+            return verse, False
 
-def verifyNotEmpty(filename, book_code):
-    state = State()
-    if not state.ID \
-    or (state.chapter==0 and book_code not in NON_CHAPTER_BOOK_CODES):
-        report_error(f"{filename} - File may be empty.")
+        if c != '-':  # not verse range
+            has_white_space = (c in WHITE_SPACE)
+            return verse, has_white_space
 
+        second_vs, c, end = self.get_number(text, end+1)
+        if second_vs == '':
+            return '', False
 
-def verifyIdentification(book_code):
-    state = State()
-    if not state.ID:
-        report_error(f"{book_code} - Missing \\id tag")
-    elif (book_code is not None) and (book_code != state.ID):
-        report_error(f"{state.ID} - Found in \\id tag does not match code '{book_code}' found in filename")
+        verse += '-' + second_vs
+        has_white_space = (c in WHITE_SPACE)
+        return verse, has_white_space
 
-    if not state.IDE:
-        report_error(f"{book_code} - Missing \\ide tag")
 
-    if state.heading:
-        if state.heading.isupper():
-            report_error(f"{book_code} - \\h '{state.heading}' shouldn't be UPPERCASE")
-    else:
-        report_error(f"{book_code} - Missing \\h tag")
+    def get_chapter_number(self, text, start):
+        pos = start
+        digits, c, _end = self.get_number(text, pos)
+        has_white_space = (c in WHITE_SPACE)
+        if digits:
+            return int(digits), has_white_space
+        return -1, has_white_space
+
+
+    def get_number(self, text, start_index):
+        """
+        Called by get_verse_range() and get_chapter_number()
+        """
+        digits = ''
+        end_index = start_index
+        c = ''
+        for pos in range(start_index, len(text)):
+            c = text[pos]
+            if c=='0' and not digits:
+                self.report_error(f"{self.referenceString} has leading zero in following chapter/verse number")
+            if (c >= '0') and (c <= '9'):
+                digits += c
+                continue
+            end_index = pos
+            break
+        return digits, c, end_index
+
+    def verifyChapterCount(self):
+        if self.ID:
+            expected_chapters = self.versification.nChapters(self.ID)
+            if len(self.chapters) != expected_chapters:
+                for i in range(1, expected_chapters + 1):
+                    if i not in self.chapters:
+                        self.report_error(f"{self.ID} {i} - Missing chapter\n")
+
+
+    def verifyTextTranslated(self, text:str, token) -> None:
+        found, word = self.needsTranslation(text)
+        if found:
+            self.report_error(f"Token '\\{token}' has possible untranslated word '{word}'")
+
+
+    def needsTranslation(self, text) -> Tuple[bool,Optional[str]]:
+        if self.lang_code \
+        and self.lang_code not in ('en', 'el-x-koine', 'hbo'):  # no need to translate English
+            # NOTE: We don't put booknames in original Heb/Grk documents either
+            english = getEnglishWords()
+            words = text.split(' ')
+            for word in words:
+                if word:
+                    found = binarySearch(english, word.lower())
+                    if found:
+                        return True, word
+        return False, None
+
+
+    def takeCL(self, text:str):
+        self.addChapterLabel(text)
+        self.verifyTextTranslated(text, 'cl')
+
+    def takeTOC1(self, text):
+        self.addTOC1(text)
+        self.verifyTextTranslated(text, 'toc1')
+
+    def takeTOC2(self, text):
+        self.addTOC2(text)
+        self.verifyTextTranslated(text, 'toc2')
+
+    def takeTOC3(self, text):
+        self.addTOC3(text)
+        # self.verifyTextTranslated(text, 'toc3') # toc3 commonly has 3-letter book code, not to be translated
+
+    def takeMT(self, text):
+        self.addMT(text)
+        self.verifyTextTranslated(text, 'mt')
+
+    def takeH(self, heading):
+        self.addHeading(heading)
+        self.verifyTextTranslated(heading, 'h')
+
+    def takeIDE(self, ide):
+        self.addIDE(ide)
+
+    def takeUSFM(self, usfm):
+        self.addUSFM(usfm)
+
+
+    def takeID(self, id):
+        code = '' if not id else id.split(' ')[0] # Take the first token in the \id field
+        if len(code) < 3:
+            self.report_error(f"{self.referenceString} - Invalid ID: '{id}'\n")
+            return
+        if code in self.getIDs():
+            self.report_error(f"{self.referenceString} - Duplicate ID: '{id}'\n")
+            return
+        if code in NON_CHAPTER_BOOK_CODES: # Books without chapters/verses
+            self.addID(code)
+            return
+        if code in usfm_verses.verses:  # look for match in bible names
+            self.addID(code)
+            return
+        self.report_error(f"{self.referenceString} - Invalid Code '{code}' in ID: '{id}'\n")
+
+
+    def takeC(self, c):
+        self.addChapter(c)
+        if not self.IDs:
+            self.report_error(f"{self.referenceString} - Missing ID before chapter\n")
+        if self.chapter < self.lastChapter:
+            self.report_error(f"{self.referenceString} - Chapter out of order\n")
+        elif self.chapter == self.lastChapter:
+            self.report_error(f"{self.referenceString} - Duplicate chapter\n")
+        elif self.chapter > self.lastChapter + 2:
+            self.report_error(f"{self.lastReferenceString} - Missing chapters between this and: {self.referenceString}\n")
+        elif self.chapter > self.lastChapter + 1:
+            self.report_error(f"{self.lastReferenceString} - Missing chapter between this and: {self.referenceString}\n")
+
+
+    def takeP(self):
+        self.addParagraph()
+
+    def takeM(self):
+        self.addMargin()
+
+
+    def takeV(self, v):
+        self.addVerses(v)
+        if self.lastVerse == 0:  # if first verse in chapter
+            if not self.IDs and self.chapter == 0:
+                self.report_error(f"{self.referenceString} {v} - Missing ID before verse\n")
+            if self.chapter == 0:
+                self.report_error(f"{self.referenceString} - Missing chapter tag\n")
+            if (self.nParagraphs == 0) and (self.nQuotes == 0) and (self.nMargins == 0):
+                self.report_error(f"{self.referenceString} - Missing paragraph marker (\\p), margin (\\m) or quote (\\q) before verse text\n")
+
+        missing = ""
+        if self.verse < self.lastVerse and self.addError(self.lastReferenceString):
+            self.report_error(f"{self.referenceString} - Verse out of order: after {self.lastReferenceString}\n")
+            self.addError(self.referenceString)
+        elif self.verse == self.lastVerse:
+            self.report_error(f"{self.referenceString} - Duplicated verse number\n")
+        elif self.verse == self.lastVerse + 2 and not isOptional(self.referenceString):
+            missing = " - Missing verse between this and: "
+        elif self.verse > self.lastVerse + 2:
+            missing = " - Missing verses between this and: "
+
+        if missing:
+            self.addError(self.lastReferenceString)
+            # see if already warned for missing verses
+            gaps = False
+            for i in range(self.lastVerse+1, self.verse):
+                ref = f"{self.ID} {self.chapter}:{i}"
+                ref_len = len(ref)
+                verse_warning_found = False
+                for error in self.errors:
+                    if error[:ref_len] == ref:
+                        verse_warning_found = True
+                        break
+                if not verse_warning_found:
+                    gaps = True
+            if not gaps:
+                return
 
-    if book_code not in NON_CHAPTER_BOOK_CODES:
-        if not state.toc1:
-            report_error(f"{book_code} - Missing \\toc1 tag")
+            self.report_error(self.lastReferenceString + missing + self.referenceString + '\n')
 
-        if not state.toc2:
-            report_error(f"{book_code} - Missing \\toc2 tag")
 
-        if not state.toc3:
-            report_error(f"{book_code} - Missing \\toc3 tag")
+    def takeText(self, t):
+        if not self.textOkay() and (self.lastToken is None
+                                    or not TOKEN_CATEGORIES[self.lastToken.__class__] & TEXT_CARRYING):
+            if t[0] == '\\':
+                self.report_error(f"{self.referenceString} - Nearby uncommon or invalid marker\n")
+            else:
+                print(f"Missing verse marker before text: <{t}> around {self.referenceString}")
+                self.report_error(f"Missing verse marker or extra text around {self.referenceString}: <{t[:10]}>.\n")
+                self.report_error(f"{self.referenceString} - Missing verse marker or extra text nearby\n")
+            if self.lastToken:
+                self.report_error(f"{self.referenceString} - Preceding Token.type was '{self.lastToken.getType()}'\n")
+            else:
+                self.report_error(f"{self.referenceString} - No preceding Token\n")
+        self.addText()
+
+
+    def takeUnknown(self, token):
+        value = token.getValue()
+        if (value == 'v') or (value == 'c'):
+            return  # skip malformed chapter and verses - will be caught later
+        elif value == 'p':
+            self.report_error(f"{self.referenceString} - Orphan paragraph marker follows")
+        else:
+            self.report_error(f"{self.referenceString} - Unknown USFM token: '\\{value}'")
+
+
+    def take(self, token):
+        categories = TOKEN_CATEGORIES[token.__class__]
+        if categories & FOOTNOTE:
+            self.addText()     # footnote suffices for verse text
+        if self.needText() and not categories & (TEXT | TEXT_CARRYING):
+            # print(f"EMPTY VERSE {self.referenceString}: {token}")
+            self.report_error(f"{self.referenceString} - Empty verse\n")
+        handler = TAKE_HANDLERS[token.__class__]
+        if handler is not None:
+            handler(self, token)
+        self.lastToken = token
+    # end of UsfmVerifier.take(token) function
+
+
+    def verifyPart(self, originalText:str, book_code:Optional[str]) -> None:
+        """
+        Verifies the next part of the book
+            (which must start at a \\c marker unless it's the first part).
+        """
+        startLineColumn = self.sourcePart.endLineColumn() if self.sourcePart else (1, 1)
+        self.previousSourcePart, self.sourcePart = self.sourcePart, SourcePart(originalText, *startLineColumn)
+        context = self.sourceText[-SOURCE_CONTEXT_LENGTH:] if self.previousSourcePart else ''
+        self.sourceText, self.sourceBase = context + self.sourcePart.text, len(context)
+        profile = self.profile
+        for token in token_cache.parseString(self.sourcePart.text):
+            if profile is not None:
+                start = perf_counter()
+                self.take(token)
+                profile.add(token.type, perf_counter() - start)
+            else:
+                self.take(token)
+            offset = self.sourceBase + token.offset
+            if self.sourceText.startswith('\\', offset): # only markers, not text
+                self.checkMarkerFormat(book_code, offset)
+    # end of UsfmVerifier.verifyPart function
+
+
+    def verifyParts(self, parts:Iterable[str], filename:str) -> Iterator[str]:
+        """
+        Verifies the book one part at a time, e.g., chapter by chapter as it's read in
+            (see chapters.read_chapters for how it must be split),
+            yielding the errors as they're found.
+
+        Afterwards, self.ID is the book ID.
+        """
+        book_code = self.book_code
+        self.markerChapter, self.markerVerseRange = 1, '1'
+        numReported = 0
+        for part in parts:
+            self.verifyPart(part, book_code)
+            yield from self.errors[numReported:]
+            numReported = len(self.errors)
+        self.verifyNotEmpty(filename, book_code)
+        self.verifyIdentification(book_code)
+        self.endChapter()  # for last chapter
+        self.verifyVerseCounts()
+        self.verifyChapterCount()
+        if self.profile is not None:
+            self.profile.report(self.ID or book_code or filename)
+        yield from self.errors[numReported:]
+    # end of UsfmVerifier.verifyParts function
+
+
+    def verify(self, unicodestring:str, filename:str) -> Tuple[List[str],str]:
+        """
+        Verifies the given book text and returns the list of errors and the book ID.
+        """
+        for _error in self.verifyParts([unicodestring], filename):
+            pass
+        return self.errors, self.ID
+    # end of UsfmVerifier.verify function
+# end of UsfmVerifier class
 
-        if not state.mt:
-            report_error(f"{book_code} - Missing \\mt or \\mt1 tag")
-# end of verifyIdentification function
 
 
 def make_reference_string(book, chapter, verse=None):
@@ -309,147 +652,18 @@ def make_reference_string(book, chapter, verse=None):
 # end of make_reference_string function
 
 
-def verifyChapterAndVerseMarkers(text, book):
-    pos = 0
-    last_ch = 1
-    for chapter_current in chapter_marker_re.finditer(text):
-        start_index = chapter_current.start()
-        end_index = chapter_current.end()
-        end_char = text[end_index]
-        if (end_char >= 'a') and (end_char <= 'z'):
-            continue  #  skip non-chapter markers
-        has_space = end_char in SPACE
-        if has_space:
-            end_index += 1
-        previous_char = text[start_index - 1]
-        newline_before = (previous_char == '\n') or (previous_char == '\r')
-        ch_num, has_space_after = get_chapter_number(text, end_index)
-        if ch_num >= 0:
-            if not has_space:
-                add_error(text, book, "Missing space before chapter number: '{0}'", start_index, last_ch)
-            elif not has_space_after:
-                add_error(text, book, "Missing new line after chapter number: '{0}'", start_index, last_ch)
-            elif not newline_before:
-                add_error(text, book, "Missing new line before chapter marker: '{0}'", start_index-4, last_ch)
-            check_chapter(text, book, last_ch, pos, start_index)
-            last_ch = ch_num
-            pos = end_index
-        else:
-            add_error(text, book, "Invalid chapter number format: '{0}'", start_index, last_ch)
-
-    check_chapter(text, book, last_ch, pos, len(text))  # check last chapter
-
-
-def add_error(text, book, message, pos, chapter, verse=None):
-    length = 8
-    example = text[pos: pos + length]
-    report_error(make_reference_string(book, chapter, verse) + " - " + message.format(example))
-
-
-def check_chapter(text, book, chapter_num, start, end):
-    last_vs_range = '1'
-    for verse_current in verse_marker_re.finditer(text, start, end):
-        start = verse_current.start()
-        end = verse_current.end()
-        char = text[end]
-        has_space = char in SPACE
-        if has_space:
-            end += 1
-        char = text[start - 1]
-        space_before = char in WHITE_SPACE
-        vs_range, has_space_after = get_verse_range(text, end)
-        if vs_range != '':
-            if not has_space:
-                add_error(text, book, "Missing space before verse number: '{0}'", start, chapter_num, vs_range)
-            elif not has_space_after:
-                add_error(text, book, "Missing space after verse number: '{0}'", start, chapter_num, vs_range)
-            elif not space_before:
-                add_error(text, book, "Missing space before verse marker: '{0}'", start-1, chapter_num, vs_range)
-            last_vs_range = vs_range
-        else:
-            # print("book", book, "chapter", chapter_num, "verse_current", verse_current)
-            # print(f"start='{start}' end='{end}'")
-            # print(f"char='{char}'")
-            # print(f"space_before={space_before} vs_range={vs_range} has_space_after={has_space_after}")
-            add_error(text, book, "Invalid verse number: '{0}'", start, chapter_num, last_vs_range)
-
-
-def get_verse_range(text, start):
-    pos = start
-    verse, c, end = get_number(text, pos)
-    if verse == '':
-        return verse, False
-
-    if c != '-':  # not verse range
-        has_white_space = (c in WHITE_SPACE)
-        return verse, has_white_space
-
-    second_vs, c, end = get_number(text, end+1)
-    if second_vs == '':
-        return '', False
-
-    verse += '-' + second_vs
-    has_white_space = (c in WHITE_SPACE)
-    return verse, has_white_space
-
-
-def get_chapter_number(text, start):
-    pos = start
-    digits, c, _end = get_number(text, pos)
-    has_white_space = (c in WHITE_SPACE)
-    if digits:
-        return int(digits), has_white_space
-    return -1, has_white_space
-
-
-def get_number(text, start_index):
-    """
-    Called by get_verse_range() and get_chapter_number()
-    """
-    digits = ''
-    end_index = start_index
-    c = ''
-    for pos in range(start_index, len(text)):
-        c = text[pos]
-        if c=='0' and not digits:
-            state = State()
-            report_error(f"{state.referenceString} has leading zero in following chapter/verse number")
-        if (c >= '0') and (c <= '9'):
-            digits += c
-            continue
-        end_index = pos
-        break
-    return digits, c, end_index
-
-def verifyChapterCount():
-    state = State()
-    if state.ID:
-        expected_chapters = state.nChapters(state.ID)
-        if len(state.chapters) != expected_chapters:
-            for i in range(1, expected_chapters + 1):
-                if i not in state.chapters:
-                    report_error(f"{state.ID} {i} - Missing chapter\n")
-
-
-def verifyTextTranslated(text:str, token) -> None:
-    found, word = needsTranslation(text)
-    if found:
-        report_error(f"Token '\\{token}' has possible untranslated word '{word}'")
-
-
-def needsTranslation(text) -> Tuple[bool,Optional[str]]:
-    state = State()
-    if state.lang_code \
-    and state.lang_code not in ('en', 'el-x-koine', 'hbo'):  # no need to translate English
-        # NOTE: We don't put booknames in original Heb/Grk documents either
-        english = state.getEnglishWords()
-        words = text.split(' ')
-        for word in words:
-            if word:
-                found = binarySearch(english, word.lower())
-                if found:
-                    return True, word
-    return False, None
+def getEnglishWords() -> List[str]:
+    if not englishWords:
+        words = []
+        for book in usfm_verses.verses:
+            book_data = usfm_verses.verses[book]
+            english_name = book_data['en_name'].lower()
+            english_words = english_name.split(' ')
+            for word in english_words:
+                if word and not isNumber(word):
+                    words.append(word)
+        englishWords[:] = sorted(words) # All at once (so other threads never see a partial list)
+    return englishWords
 
 
 def binarySearch(alist, item) -> bool:
@@ -479,158 +693,6 @@ def isNumber(s) -> bool:
     return False
 
 
-def takeCL(text:str):
-    state = State()
-    state.addChapterLabel(text)
-    verifyTextTranslated(text, 'cl')
-
-def takeTOC1(text):
-    state = State()
-    state.addTOC1(text)
-    verifyTextTranslated(text, 'toc1')
-
-def takeTOC2(text):
-    state = State()
-    state.addTOC2(text)
-    verifyTextTranslated(text, 'toc2')
-
-def takeTOC3(text):
-    state = State()
-    state.addTOC3(text)
-    # verifyTextTranslated(text, 'toc3') # toc3 commonly has 3-letter book code, not to be translated
-
-def takeMT(text):
-    state = State()
-    state.addMT(text)
-    verifyTextTranslated(text, 'mt')
-
-def takeH(heading):
-    state = State()
-    state.addHeading(heading)
-    verifyTextTranslated(heading, 'h')
-
-def takeIDE(ide):
-    state = State()
-    state.addIDE(ide)
-
-def takeUSFM(usfm):
-    state = State()
-    state.addUSFM(usfm)
-
-
-def takeID(id):
-    state = State()
-    code = '' if not id else id.split(' ')[0] # Take the first token in the \id field
-    if len(code) < 3:
-        report_error(f"{state.referenceString} - Invalid ID: '{id}'\n")
-        return
-    if code in state.getIDs():
-        report_error(f"{state.referenceString} - Duplicate ID: '{id}'\n")
-        return
-    if code in NON_CHAPTER_BOOK_CODES: # Books without chapters/verses
-        state.addID(code)
-        return
-    state.loadVerseCounts()
-    for k in State.verseCounts:  # look for match in bible names
-        if k == code:
-            state.addID(code)
-            return
-    report_error(f"{state.referenceString} - Invalid Code '{code}' in ID: '{id}'\n")
-
-
-def takeC(c):
-    state = State()
-    state.addChapter(c)
-    if not state.IDs:
-        report_error(f"{state.referenceString} - Missing ID before chapter\n")
-    if state.chapter < state.lastChapter:
-        report_error(f"{state.referenceString} - Chapter out of order\n")
-    elif state.chapter == state.lastChapter:
-        report_error(f"{state.referenceString} - Duplicate chapter\n")
-    elif state.chapter > state.lastChapter + 2:
-        report_error(f"{state.lastReferenceString} - Missing chapters between this and: {state.referenceString}\n")
-    elif state.chapter > state.lastChapter + 1:
-        report_error(f"{state.lastReferenceString} - Missing chapter between this and: {state.referenceString}\n")
-
-
-def takeP():
-    state = State()
-    state.addParagraph()
-
-def takeM():
-    state = State()
-    state.addMargin()
-
-
-def takeV(v):
-    state = State()
-    state.addVerses(v)
-    if state.lastVerse == 0:  # if first verse in chapter
-        if not state.IDs and state.chapter == 0:
-            report_error(f"{state.referenceString} {v} - Missing ID before verse\n")
-        if state.chapter == 0:
-            report_error(f"{state.referenceString} - Missing chapter tag\n")
-        if (state.nParagraphs == 0) and (state.nQuotes == 0) and (state.nMargins == 0):
-            report_error(f"{state.referenceString} - Missing paragraph marker (\\p), margin (\\m) or quote (\\q) before verse text\n")
-
-    missing = ""
-    if state.verse < state.lastVerse and state.addError(state.lastReferenceString):
-        report_error(f"{state.referenceString} - Verse out of order: after {state.lastReferenceString}\n")
-        state.addError(state.referenceString)
-    elif state.verse == state.lastVerse:
-        report_error(f"{state.referenceString} - Duplicated verse number\n")
-    elif state.verse == state.lastVerse + 2 and not isOptional(state.referenceString):
-        missing = " - Missing verse between this and: "
-    elif state.verse > state.lastVerse + 2:
-        missing = " - Missing verses between this and: "
-
-    if missing:
-        state.addError(state.lastReferenceString)
-        if not error_log is None:  # see if already warned for missing verses
-            gaps = False
-            for i in range(state.lastVerse+1, state.verse):
-                ref = f"{state.ID} {state.chapter}:{i}"
-                ref_len = len(ref)
-                verse_warning_found = False
-                for error in error_log:
-                    if error[:ref_len] == ref:
-                        verse_warning_found = True
-                        break
-                if not verse_warning_found:
-                    gaps = True
-            if not gaps:
-                return
-
-        report_error(state.lastReferenceString + missing + state.referenceString + '\n')
-
-
-def takeText(t):
-    state = State()
-    global lastToken
-    if not state.textOkay() and not isTextCarryingToken(lastToken):
-        if t[0] == '\\':
-            report_error(f"{state.referenceString} - Nearby uncommon or invalid marker\n")
-        else:
-            print(f"Missing verse marker before text: <{t}> around {state.referenceString}")
-            report_error(f"Missing verse marker or extra text around {state.referenceString}: <{t[:10]}>.\n")
-            report_error(f"{state.referenceString} - Missing verse marker or extra text nearby\n")
-        if lastToken:
-            report_error(f"{state.referenceString} - Preceding Token.type was '{lastToken.getType()}'\n")
-        else:
-            report_error(f"{state.referenceString} - No preceding Token\n")
-    state.addText()
-
-
-def takeUnknown(state, token):
-    value = token.getValue()
-    if (value == 'v') or (value == 'c'):
-        return  # skip malformed chapter and verses - will be caught later
-    elif value == 'p':
-        report_error(f"{state.referenceString} - Orphan paragraph marker follows")
-    else:
-        report_error(f"{state.referenceString} - Unknown USFM token: '\\{value}'")
-
-
 # Returns True if token is part of a footnote
 def isFootnote(token):
     return token.isF_S() or token.isF_E() \
@@ -680,72 +742,62 @@ def isTextCarryingToken(token):
         or isCharacterFormatting(token) # RJH added this (for \wj fields, etc.)
 
 
-def take(token):
-    state = State()
-    if isFootnote(token):
-        state.addText()     # footnote suffices for verse text
-    if state.needText() and not token.isTEXT() and not isTextCarryingToken(token):
-        # print(f"EMPTY VERSE {state.referenceString}: {token}")
-        report_error(f"{state.referenceString} - Empty verse\n")
-    if token.isID():
-        takeID(token.value)
-    elif token.isIDE():
-        takeIDE(token.value)
-    elif token.isUSFM():
-        takeUSFM(token.value)
-    elif token.isH():
-        takeH(token.value)
-    elif token.isTOC1():
-        takeTOC1(token.value)
-    elif token.isTOC2():
-        takeTOC2(token.value)
-    elif token.isTOC3():
-        takeTOC3(token.value)
-    elif token.isMT() or token.isMT1():
-        takeMT(token.value)
-    elif token.isCL():
-        takeCL(token.value)
-    elif token.isC():
-        verifyVerseCount()  # for the preceding chapter
-        takeC(token.value)
-    elif token.isP() \
-    or token.isPI() or token.isPI1() or token.isPI2() \
-    or token.isPC() or token.isNB() or token.is_ip():
-        takeP()
-    elif token.isV():
-        takeV(token.value)
-    elif token.isTEXT():
-        takeText(token.value)
-    elif token.isQ() or token.isQ1() or token.isQ2() or token.isQ3():
-        state.addQuote()
-    elif token.isM() or token.isMI() or token.is_im():
-        state.addMargin()
-    elif token.isUnknown():
-        takeUnknown(state, token)
-    global lastToken
-    lastToken = token
-# end of take(token) function
+# Token category bits (see getTokenCategories)
+TEXT, FOOTNOTE, TEXT_CARRYING = 1, 2, 4
+
+def getTokenCategories(token) -> int:
+    return (TEXT if token.isTEXT() else 0) \
+        | (FOOTNOTE if isFootnote(token) else 0) \
+        | (TEXT_CARRYING if isTextCarryingToken(token) else 0)
+
+TOKEN_CATEGORIES = parseUsfm.TokenClassTable(getTokenCategories) # Token class to category bits
+
+
+def takeChapterToken(verifier, token):
+    verifier.endChapter()  # for the preceding chapter
+    verifier.takeC(token.value)
+
+
+# What UsfmVerifier.take does with each token (after the empty verse check)
+#   as (token test, handler) pairs—only the first matching handler is used
+TAKE_RULES = (
+    (lambda token: token.isID(),    lambda verifier, token: verifier.takeID(token.value)),
+    (lambda token: token.isIDE(),   lambda verifier, token: verifier.takeIDE(token.value)),
+    (lambda token: token.isUSFM(),  lambda verifier, token: verifier.takeUSFM(token.value)),
+    (lambda token: token.isH(),     lambda verifier, token: verifier.takeH(token.value)),
+    (lambda token: token.isTOC1(),  lambda verifier, token: verifier.takeTOC1(token.value)),
+    (lambda token: token.isTOC2(),  lambda verifier, token: verifier.takeTOC2(token.value)),
+    (lambda token: token.isTOC3(),  lambda verifier, token: verifier.takeTOC3(token.value)),
+    (lambda token: token.isMT() or token.isMT1(),
+                                    lambda verifier, token: verifier.takeMT(token.value)),
+    (lambda token: token.isCL(),    lambda verifier, token: verifier.takeCL(token.value)),
+    (lambda token: token.isC(),     takeChapterToken),
+    (lambda token: token.isP() \
+                or token.isPI() or token.isPI1() or token.isPI2() \
+                or token.isPC() or token.isNB() or token.is_ip(),
+                                    lambda verifier, token: verifier.takeP()),
+    (lambda token: token.isV(),     lambda verifier, token: verifier.takeV(token.value)),
+    (lambda token: token.isTEXT(),  lambda verifier, token: verifier.takeText(token.value)),
+    (lambda token: token.isQ() or token.isQ1() or token.isQ2() or token.isQ3(),
+                                    lambda verifier, token: verifier.addQuote()),
+    (lambda token: token.isM() or token.isMI() or token.is_im(),
+                                    lambda verifier, token: verifier.addMargin()),
+    (lambda token: token.isUnknown(), lambda verifier, token: verifier.takeUnknown(token)),
+    )
+
+def getTakeHandler(token):
+    for test, handler in TAKE_RULES:
+        if test(token):
+            return handler
+    return None
+
+TAKE_HANDLERS = parseUsfm.TokenClassTable(getTakeHandler) # Token class to handler (or None)
 
 
 def verify_contents_quiet(unicodestring:str, filename:str, book_code:str,
-                                                        lang_code:str) -> Tuple[List[str],str]:
+                          lang_code:str, versification:Optional[str]=None) -> Tuple[List[str],str]:
     """
     This is called by the USFM linter.
     """
-    global error_log
-    error_log = []  # enable error logging
-    state = State()
-    state.reset_all()  # clear out previous values
-    state.set_book_code(book_code)
-    state.setLanguageCode(lang_code)
-    verifyChapterAndVerseMarkers(unicodestring, book_code)
-    for token in parseUsfm.parseString(unicodestring):
-        take(token)
-    verifyNotEmpty(filename, book_code)
-    verifyIdentification(book_code)
-    verifyVerseCount()  # for last chapter
-    verifyChapterCount()
-    errors = error_log
-    error_log = None  # turn error logging back off
-    return errors, state.ID
+    return UsfmVerifier(book_code, lang_code, versification).verify(unicodestring, filename)
 # end of verify_contents_quiet function
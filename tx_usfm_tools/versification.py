@@ -0,0 +1,123 @@
+"""
+Versification schemes, i.e., how many chapters each book has
+    and how many verses each chapter has.
+
+The built-in scheme (used for 'kjv' and 'ufw') comes from the usfm_verses table.
+Alternate schemes can be loaded from Paratext-style .vrs files
+    (lines like 'GEN 1:31 2:25 3:24 …') put in the versifications folder
+    or added with registerVersification().
+They're selected by name, i.e., Project.versification from the manifest.
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+import os
+import re
+import logging
+from array import array
+
+from tx_usfm_tools import usfm_verses
+
+
+DEFAULT_VERSIFICATION = 'kjv'
+BUILT_IN_VERSIFICATION_NAMES = ('kjv', 'ufw')
+VERSIFICATION_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'versifications')
+
+# Chapters where the last verse may validly be a different one
+#   Revelation 12 may have 17 or 18 verses
+#   3 John may have 14 or 15 verses
+BUILT_IN_ALTERNATE_LAST_VERSES = {('REV',12): 18, ('3JN',1): 14}
+
+
+class Versification:
+    """
+    The verse counts for each book, with one array('H') per book.
+
+    Unknown books and chapters have no verses
+        (rather than raising exceptions).
+    """
+    def __init__(self, name:str, bookVerseCounts:Dict[str,Sequence[int]],
+                        alternateLastVerses:Optional[Dict[Tuple[str,int],int]]=None) -> None:
+        self.name = name
+        self.verseCounts = {book_code:array('H', verseCounts) for book_code, verseCounts in bookVerseCounts.items()}
+        self.alternateLastVerses = alternateLastVerses if alternateLastVerses else {}
+
+    def nChapters(self, book_code:str) -> int:
+        verseCounts = self.verseCounts.get(book_code)
+        return 0 if verseCounts is None else len(verseCounts)
+
+    def nVerses(self, book_code:str, chapter:int) -> int:
+        verseCounts = self.verseCounts.get(book_code)
+        if verseCounts is None or not 0 < chapter <= len(verseCounts):
+            return 0
+        return verseCounts[chapter-1]
+
+    def hasChapter(self, book_code:str, chapter:int) -> bool:
+        return 0 < chapter <= self.nChapters(book_code)
+
+    def hasVerse(self, book_code:str, chapter:int, verse:int) -> bool:
+        return 0 < verse <= self.nVerses(book_code, chapter) \
+            or self.alternateLastVerses.get((book_code,chapter)) == verse
+
+    def getWrongLastVerses(self, book_code:str, chapterEnds:Sequence[Tuple[int,int]]) -> List[int]:
+        """
+        Given the (chapter, last verse) pairs found in a book,
+            returns the indexes of the ones that don't match this versification.
+        """
+        verseCounts = self.verseCounts.get(book_code, ())
+        numChapters = len(verseCounts)
+        return [n for n, (chapter, verse) in enumerate(chapterEnds)
+                    if (verseCounts[chapter-1] if 0 < chapter <= numChapters else 0) != verse
+                        and self.alternateLastVerses.get((book_code,chapter)) != verse]
+# end of Versification class
+
+
+def loadVrsFile(name:str, filepath:str) -> Versification:
+    """
+    Loads the verse counts from a Paratext-style .vrs file.
+
+    Comment lines (starting with #) and verse mapping lines (containing =) are ignored.
+    """
+    bookVerseCounts:Dict[str,List[int]] = {}
+    with open(filepath, 'rt', encoding='utf-8') as vrs_file:
+        for line in vrs_file:
+            line = line.strip()
+            if not line or line.startswith('#') or '=' in line:
+                continue
+            book_code, *chapterVerses = line.split()
+            verseCounts = bookVerseCounts.setdefault(book_code.upper(), [])
+            for chapterVerse in chapterVerses:
+                chapter, verses = chapterVerse.split(':')
+                chapter = int(chapter)
+                if chapter > len(verseCounts):
+                    verseCounts.extend([0] * (chapter - len(verseCounts)))
+                verseCounts[chapter-1] = int(verses)
+    return Versification(name, bookVerseCounts)
+# end of loadVrsFile function
+
+
+_versifications:Dict[str,Versification] = {}
+
+def registerVersification(versification:Versification) -> None:
+    _versifications[versification.name.lower()] = versification
+
+
+def getVersification(name:Optional[str]=None) -> Versification:
+    """
+    Returns the named versification (loading it the first time),
+        or the default one if the name is unknown.
+    """
+    name = (name if name else DEFAULT_VERSIFICATION).lower()
+    versification = _versifications.get(name)
+    if versification is None:
+        filepath = os.path.join(VERSIFICATION_DIR, f'{name}.vrs')
+        if name in BUILT_IN_VERSIFICATION_NAMES:
+            versification = Versification(name,
+                        {book_code:book_data['verses'] for book_code, book_data in usfm_verses.verses.items()},
+                        BUILT_IN_ALTERNATE_LAST_VERSES)
+        elif re.fullmatch(r'[\w-]+', name) and os.path.isfile(filepath):
+            versification = loadVrsFile(name, filepath)
+        else:
+            logging.warning(f"Unknown versification {name!r}—using {DEFAULT_VERSIFICATION!r} instead")
+            versification = getVersification(DEFAULT_VERSIFICATION)
+        _versifications[name] = versification
+    return versification
+# end of getVersification function
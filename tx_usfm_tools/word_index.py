@@ -0,0 +1,216 @@
+"""
+Per-verse word index of original-language USFM (e.g., UHB and UGNT)
+
+Checking the OrigQuote of every row of a full set of TSV translation notes
+    means many thousands of quote lookups,
+    so each original-language book is indexed once:
+    for each verse, its normalised words and the positions of each word,
+    so a quote (and its occurrence number) can be found
+    by only looking at the places where its first word occurs.
+
+The books are found by their book code in the filenames (e.g., 01-GEN.usfm, 41-MAT.usfm)
+    in the folder given (or in ORIGINAL_LANGUAGE_USFM_DIR).
+Book indexes are cached on disk in ORIGINAL_LANGUAGE_INDEX_CACHE_DIR
+    (default in the temp folder) keyed by the USFM file's path, size and modified time,
+    so later jobs only rebuild them when the original-language text changes.
+"""
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+import os
+import re
+import zlib
+import marshal
+import hashlib
+import logging
+import tempfile
+import unicodedata
+from bisect import bisect_left
+
+from tx_usfm_tools.alignment import strip_alignment
+
+
+WORD_INDEX_FORMAT = b'USFMWRD1' # Written at the start of every cache file
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), 'tX_word_index')
+
+BOOK_FILENAME_RE = re.compile(r'(?:^|[-_.])([1-4A-Z][A-Z0-9]{2})\.usfm$', re.IGNORECASE)
+# Chapters and verses, footnotes and cross-references (which aren't part of the verse text),
+#   milestones (e.g., \k-s | x-tw="..."\*) and any other markers
+ORIGINAL_MARKER_RE = re.compile(r'\\c\s+(\d+)|\\v\s+(\d+)[-\d]*'
+                                r'|\\(?:fe?|x)\s.*?\\(?:fe?|x)\*'
+                                r'|\\[a-z0-9]+-[se]\b[^\\]*\\\*'
+                                r'|\\\+?[a-z0-9]+\*?', re.DOTALL)
+# Spaces, maqaf, sof pasuq, paseq, Greek and other punctuation
+WORD_SEPARATOR_RE = re.compile(r'[\s\u05BE\u05C0\u05C3\u05C6\u0387\u00B7\u037E,.;:!?"\'“”‘’()\[\]⸀⸁⸂⸃]+')
+# Separates the parts of a discontinuous quote, e.g., 'ἐν … Χριστῷ'
+QUOTE_GAP_RE = re.compile(r'\s*(?:…|\.\.\.| & )\s*')
+
+
+def normalizeWord(word:str) -> str:
+    # UHB marks morpheme breaks within words with /
+    # NOTE: lower() rather than casefold() which would change final sigma and iota subscripts
+    return unicodedata.normalize('NFC', word.replace('/', '')).lower()
+
+
+def splitWords(text:str) -> List[str]:
+    return [normalizeWord(word) for word in WORD_SEPARATOR_RE.split(text) if word.replace('/', '')]
+
+
+def splitQuote(quote:str) -> List[Tuple[str,...]]:
+    """
+    Returns the normalised words of each (non-empty) part of the quote.
+    """
+    return [words for words in (tuple(splitWords(part)) for part in QUOTE_GAP_RE.split(quote)) if words]
+
+
+class VerseWords:
+    """
+    The normalised words of one verse and where each of them occurs.
+    """
+    def __init__(self, words:Sequence[str]) -> None:
+        self.words = tuple(words)
+        self.positions:Dict[str,List[int]] = {}
+        for position, word in enumerate(self.words):
+            self.positions.setdefault(word, []).append(position)
+
+    def find(self, words:Tuple[str,...], start:int=0) -> Iterator[int]:
+        """
+        Yields each position (from start on) where the words occur together.
+        """
+        positions = self.positions.get(words[0], ())
+        for position in positions[bisect_left(positions, start):]:
+            if self.words[position:position+len(words)] == words:
+                yield position
+
+    def countOccurrences(self, quoteParts:List[Tuple[str,...]]) -> int:
+        """
+        Returns how many times the quote occurs
+            (counting by its first part, with any later parts following it in order).
+        """
+        count = 0
+        for position in self.find(quoteParts[0]):
+            end = position + len(quoteParts[0])
+            for part in quoteParts[1:]:
+                partPosition = next(self.find(part, end), None)
+                if partPosition is None:
+                    break
+                end = partPosition + len(part)
+            else:
+                count += 1
+        return count
+# end of VerseWords class
+
+
+def indexBook(usfm:str) -> Dict[Tuple[int,int],List[str]]:
+    """
+    Returns the normalised words of each verse in the (possibly aligned) USFM book text.
+
+    Text before the first verse of a chapter (and in the book headers) isn't indexed.
+    """
+    usfm, _offsetMap = strip_alignment(usfm)
+    verses:Dict[Tuple[int,int],List[str]] = {}
+    verseWords:Optional[List[str]] = None
+    C = 0
+    lastEnd = 0
+    for match in ORIGINAL_MARKER_RE.finditer(usfm):
+        if verseWords is not None:
+            verseWords.extend(splitWords(usfm[lastEnd:match.start()]))
+        lastEnd = match.end()
+        chapter, verse = match.group(1), match.group(2)
+        if chapter:
+            C, verseWords = int(chapter), None
+        elif verse and C:
+            verseWords = verses.setdefault((C, int(verse)), [])
+    if verseWords is not None:
+        verseWords.extend(splitWords(usfm[lastEnd:]))
+    return verses
+# end of indexBook function
+
+
+class WordIndex:
+    """
+    The indexed original-language books in a folder, loaded as needed.
+    """
+    def __init__(self, usfmDir:str, cacheDir:Optional[str]=None) -> None:
+        self.usfmDir = usfmDir
+        self.cacheDir = cacheDir
+        self.bookFilepaths:Dict[str,str] = {}
+        for root, _dirs, files in os.walk(usfmDir):
+            for filename in sorted(files):
+                match = BOOK_FILENAME_RE.search(filename)
+                if match:
+                    self.bookFilepaths.setdefault(match.group(1).upper(), os.path.join(root, filename))
+        self.books:Dict[str,Optional[Dict[Tuple[int,int],VerseWords]]] = {}
+
+    def hasBook(self, bookCode:str) -> bool:
+        return bookCode.upper() in self.bookFilepaths
+
+    def getVerse(self, bookCode:str, chapter:int, verse:int) -> Optional[VerseWords]:
+        book = self.getBook(bookCode)
+        return book.get((chapter, verse)) if book else None
+
+    def getBook(self, bookCode:str) -> Optional[Dict[Tuple[int,int],VerseWords]]:
+        bookCode = bookCode.upper()
+        if bookCode not in self.books:
+            filepath = self.bookFilepaths.get(bookCode)
+            verses = self.loadBook(filepath) if filepath else None
+            self.books[bookCode] = None if verses is None \
+                    else {reference:VerseWords(words) for reference, words in verses.items()}
+        return self.books[bookCode]
+
+    def loadBook(self, filepath:str) -> Optional[Dict[Tuple[int,int],List[str]]]:
+        """
+        Returns the book's verse words from the cache, else indexes (and caches) it.
+        """
+        cacheFilepath = None
+        if self.cacheDir:
+            try:
+                stat = os.stat(filepath)
+            except OSError as e:
+                logging.warning(f"Unable to read original language book {filepath}: {e}")
+                return None
+            key = hashlib.sha256(f'{WORD_INDEX_FORMAT.decode()}|{os.path.realpath(filepath)}|{stat.st_size}|{stat.st_mtime_ns}'
+                                 .encode('utf-8', 'surrogatepass')).hexdigest()
+            cacheFilepath = os.path.join(self.cacheDir, key + '.words')
+            try:
+                with open(cacheFilepath, 'rb') as cache_file:
+                    data = cache_file.read()
+                if data.startswith(WORD_INDEX_FORMAT):
+                    return marshal.loads(zlib.decompress(data[len(WORD_INDEX_FORMAT):]))
+            except OSError: # Not cached yet
+                pass
+            except (zlib.error, ValueError, EOFError, TypeError) as e:
+                logging.warning(f"Ignoring corrupt word index cache file {cacheFilepath}: {e}")
+
+        try:
+            with open(filepath, 'rt', encoding='utf-8') as usfm_file:
+                verses = indexBook(usfm_file.read())
+        except (OSError, UnicodeError) as e:
+            logging.warning(f"Unable to read original language book {filepath}: {e}")
+            return None
+
+        if cacheFilepath:
+            # Write to a temporary file first so that other processes never see a partial file
+            try:
+                os.makedirs(self.cacheDir, exist_ok=True)
+                file_descriptor, temp_filepath = tempfile.mkstemp(dir=self.cacheDir, suffix='.tmp')
+                with os.fdopen(file_descriptor, 'wb') as temp_file:
+                    temp_file.write(WORD_INDEX_FORMAT + zlib.compress(marshal.dumps(verses)))
+                os.replace(temp_filepath, cacheFilepath)
+            except OSError as e:
+                logging.warning(f"Unable to save word index cache file {cacheFilepath}: {e}")
+        return verses
+# end of WordIndex class
+
+
+_wordIndexes:Dict[str,WordIndex] = {}
+
+def getWordIndex(usfmDir:Optional[str]=None) -> Optional[WordIndex]:
+    """
+    Returns the (shared) index for the folder (default ORIGINAL_LANGUAGE_USFM_DIR),
+        or None if there's no such folder.
+    """
+    usfmDir = usfmDir if usfmDir else os.getenv('ORIGINAL_LANGUAGE_USFM_DIR')
+    if not usfmDir or not os.path.isdir(usfmDir):
+        return None
+    if usfmDir not in _wordIndexes:
+        _wordIndexes[usfmDir] = WordIndex(usfmDir, os.getenv('ORIGINAL_LANGUAGE_INDEX_CACHE_DIR', DEFAULT_CACHE_DIR))
+    return _wordIndexes[usfmDir]
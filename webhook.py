@@ -13,8 +13,6 @@ import tempfile
 import json
 from datetime import datetime, timedelta, date
 from time import time
-import sys
-sys.setrecursionlimit(1500) # Default is 1,000—beautifulSoup hits this limit with UST
 import traceback
 
 # Library (PyPI) imports
@@ -41,6 +39,7 @@ from linters.lexicon_linter import LexiconLinter
 from converters.md2html_converter import Md2HtmlConverter
 from converters.tsv2html_converter import Tsv2HtmlConverter
 from converters.usfm2html_converter import Usfm2HtmlConverter
+from tx_usfm_tools import token_profile
 
 
 # NOTE: The following two tables are each scanned in order
@@ -95,6 +94,8 @@ job_handler_stats_prefix = f"{tx_stats_prefix}.job-handler"
 # Get the Graphite URL from the environment, otherwise use a local test instance
 graphite_url = os.getenv('GRAPHITE_HOSTNAME', 'localhost')
 stats_client = StatsClient(host=graphite_url, port=8125)
+# Only used if the USFM_PROFILE environment variable is set
+token_profile.setStatsClient(stats_client, f'{job_handler_stats_prefix}.usfm-profile')
 
 
 
@@ -165,7 +166,8 @@ def do_converting(param_dict:Dict[str,Any], source_dir:str, converter_name:str,
     cdn_file_key = param_dict['output'].split('cdn.door43.org/')[1] # Get the last part
     converter = converter_class( param_dict['resource_type'],
                                  source_dir=source_dir,
-                                 cdn_file_key=cdn_file_key) # Key for uploading
+                                 cdn_file_key=cdn_file_key, # Key for uploading
+                                 options=param_dict.get('options'))
     convert_result_dict = converter.run()
     converter.close() # do cleanup after run
     param_dict['converter_success'] = convert_result_dict['success']